@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Index d'adresses local : normalisation et géocodage hors ligne
+
+Construit une fois à partir d'un fichier d'adresses au format de la Base
+Adresse Nationale (CSV ';' : numero, rep, nom_voie, code_postal,
+nom_commune, lon, lat), par exemple un export départemental
+adresses-93.csv. Les extracteurs l'interrogent après extract_with_llm : les
+mêmes immeubles reviennent d'une demande à l'autre et n'ont plus besoin du
+géocodeur distant.
+
+- les voies sont cherchées par trigrammes de leur nom, parmi celles du seul
+  code postal de l'adresse (index inversé construit au premier accès à un
+  code, puis gardé en cache) ;
+- le numéro est ensuite cherché dans la voie retenue, à défaut le centre
+  de la voie est retourné ;
+- les recherches répétées (même immeuble) sont servies par un cache LRU.
+
+Usage:
+    python address_index.py adresses-93.csv [-o .cache/adresses.sqlite]
+"""
+
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from fuzzy_matcher import trigrams
+from text_normalization import fold_text
+
+DEFAULT_ADDRESS_INDEX_PATH = Path(__file__).resolve().parent / ".cache" / "adresses.sqlite"
+MIN_STREET_SCORE = 0.6
+LOOKUP_CACHE_SIZE = 8192
+STREET_CACHE_SIZE = 256  # Codes postaux dont l'index de voies reste en mémoire
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS voies (
+    id INTEGER PRIMARY KEY,
+    code_postal TEXT NOT NULL,
+    nom_voie TEXT NOT NULL,
+    nom_normalise TEXT NOT NULL,
+    commune TEXT NOT NULL,
+    lon REAL,
+    lat REAL
+);
+CREATE INDEX IF NOT EXISTS voies_code_postal ON voies (code_postal);
+CREATE TABLE IF NOT EXISTS numeros (
+    voie_id INTEGER NOT NULL,
+    numero INTEGER NOT NULL,
+    rep TEXT NOT NULL,
+    lon REAL NOT NULL,
+    lat REAL NOT NULL,
+    PRIMARY KEY (voie_id, numero, rep)
+) WITHOUT ROWID;
+"""
+
+# Abréviations courantes des types de voie et des prénoms de saints
+STREET_ABBREVIATIONS = {
+    'av': 'avenue', 'ave': 'avenue', 'bd': 'boulevard', 'bld': 'boulevard', 'blvd': 'boulevard',
+    'r': 'rue', 'pl': 'place', 'ch': 'chemin', 'che': 'chemin', 'all': 'allee', 'imp': 'impasse',
+    'rte': 'route', 'sq': 'square', 'fg': 'faubourg', 'fbg': 'faubourg', 'pass': 'passage',
+    'res': 'residence', 'rpt': 'rond point', 'prom': 'promenade', 'st': 'saint', 'ste': 'sainte',
+}
+STREET_TYPES = (
+    'rue', 'avenue', 'boulevard', 'place', 'chemin', 'allee', 'impasse', 'route', 'quai',
+    'cours', 'square', 'passage', 'sentier', 'faubourg', 'residence', 'cite', 'villa', 'voie',
+    'promenade', 'esplanade', 'rond point', 'parvis', 'mail', 'hameau', 'lieu dit',
+    'lotissement', 'clos', 'ruelle', 'montee', 'traverse', 'grande rue',
+)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_TYPES = '|'.join(sorted(STREET_TYPES, key=len, reverse=True))
+# Numéro + voie d'un type connu, suivis éventuellement du code postal et de la ville
+_TYPED_ADDRESS = re.compile(
+    rf"(?:^|\s)(?P<numero>\d{{1,4}})\s*(?P<rep>bis|ter|quater|[a-d])?\s+(?P<voie>(?:{_TYPES})\b.*?)"
+    rf"(?:\s+(?P<code_postal>\d{{5}})\b.*)?$"
+)
+_PLAIN_ADDRESS = re.compile(
+    r"^(?P<numero>\d{1,4})\s*(?P<rep>bis|ter|quater|[a-d])?\s+(?P<voie>.+?)"
+    r"(?:\s+(?P<code_postal>\d{5})\b.*)?$"
+)
+
+
+def normalize_postal_code(code_postal: Union[str, int, None]) -> str:
+    """Chiffres du code postal, zéro initial restitué (1000 ou "1000" -> "01000")"""
+    # Le LLM (ou un tableur) renvoie parfois le code postal en nombre
+    digits = "".join(c for c in str(code_postal or "") if c.isdigit())
+    return digits.zfill(5) if len(digits) == 4 else digits
+
+
+def normalize_street(name: str) -> str:
+    """Nom de voie comparable : sans casse, accents, ponctuation ni abréviations"""
+    words = _NON_ALNUM.sub(" ", fold_text(name or "")).split()
+    return " ".join(STREET_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def parse_street_address(text: str) -> Optional[Tuple[Optional[int], str, str, Optional[str]]]:
+    """
+    (numéro, indice de répétition, voie normalisée, code postal éventuel)
+
+    Le numéro et la voie sont cherchés au milieu du texte libre
+    ('BAT 2 - APT A224 LE CASTELIN 133 avenue de la République 93150 ...').
+    """
+    normalized = normalize_street(text)
+    match = _TYPED_ADDRESS.search(normalized) or _PLAIN_ADDRESS.match(normalized)
+    if match is None:
+        return (None, "", normalized, None) if normalized else None
+    return (int(match.group('numero')), match.group('rep') or "",
+            match.group('voie'), match.group('code_postal'))
+
+
+def read_ban_csv(path: Union[str, Path]) -> Iterator[Dict[str, str]]:
+    """Lignes d'un fichier d'adresses au format BAN (';', UTF-8), en flux"""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f, delimiter=";")
+
+
+def build_address_index(rows: Iterable[Dict[str, str]], path: Union[str, Path],
+                        batch_size: int = 10_000) -> Tuple[int, int]:
+    """Construit l'index SQLite ; retourne (nombre de voies, nombre de numéros)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.executescript("DROP TABLE IF EXISTS voies; DROP TABLE IF EXISTS numeros;" + _SCHEMA)
+        streets: Dict[Tuple[str, str, str], int] = {}
+        numbers = []
+
+        def flush():
+            conn.executemany("INSERT OR IGNORE INTO numeros VALUES (?, ?, ?, ?, ?)", numbers)
+            numbers.clear()
+
+        for row in rows:
+            try:
+                numero, lon, lat = int(row['numero']), float(row['lon']), float(row['lat'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            key = (normalize_postal_code(row['code_postal']), normalize_street(row['nom_voie']), row['nom_commune'])
+            street_id = streets.get(key)
+            if street_id is None:
+                street_id = streets[key] = len(streets) + 1
+                conn.execute("INSERT INTO voies (id, code_postal, nom_voie, nom_normalise, commune) "
+                             "VALUES (?, ?, ?, ?, ?)", (street_id, key[0], row['nom_voie'], key[1], key[2]))
+            numbers.append((street_id, numero, (row.get('rep') or '').lower(), lon, lat))
+            if len(numbers) >= batch_size:
+                flush()
+        flush()
+
+        # Centre de chaque voie, pour les numéros absents de la base
+        conn.execute("""
+            UPDATE voies SET
+                lon = (SELECT AVG(lon) FROM numeros WHERE voie_id = voies.id),
+                lat = (SELECT AVG(lat) FROM numeros WHERE voie_id = voies.id)
+        """)
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM numeros").fetchone()[0]
+        return len(streets), count
+    finally:
+        conn.close()
+
+
+@dataclass
+class AddressMatch:
+    """Adresse normalisée et géocodée"""
+    adresse: str
+    code_postal: str
+    ville: str
+    latitude: float
+    longitude: float
+    score: float
+    precision: str  # 'numero' ou 'voie' (centre de la voie)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AddressIndex:
+    """Index SQLite des adresses, interrogeable depuis plusieurs threads"""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_ADDRESS_INDEX_PATH,
+                 cache_size: int = LOOKUP_CACHE_SIZE):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._init_caches()
+
+    def _init_caches(self):
+        self._lookup_cache = lru_cache(maxsize=self.cache_size)(self._lookup)
+        self._streets = lru_cache(maxsize=STREET_CACHE_SIZE)(self._load_streets)
+
+    def __getstate__(self):
+        # Connexions et caches restent propres à chaque processus
+        return {'path': self.path, 'cache_size': self.cache_size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._init_caches()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def _load_streets(self, code_postal: str):
+        """Voies d'un code postal et index inversé trigramme -> voies"""
+        rows = self._connect().execute(
+            "SELECT id, nom_voie, nom_normalise, commune, lon, lat FROM voies WHERE code_postal = ?",
+            (code_postal,)
+        ).fetchall()
+        postings = defaultdict(list)
+        sizes = []
+        for i, row in enumerate(rows):
+            grams = trigrams(row[2])
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(i)
+        return rows, dict(postings), sizes
+
+    def lookup(self, adresse: str, code_postal: Union[str, int, None] = None) -> Optional[AddressMatch]:
+        """Adresse normalisée et coordonnées, ou None si la voie n'est pas trouvée"""
+        if not isinstance(adresse, str):
+            return None
+        parsed = parse_street_address(adresse)
+        if parsed is None:
+            return None
+        numero, rep, voie, found_code = parsed
+        code = normalize_postal_code(code_postal) or found_code
+        if not code or not voie:
+            return None
+        return self._lookup_cache(numero, rep, voie, code)
+
+    def cache_info(self):
+        """Statistiques du cache des recherches (hits, misses, maxsize, currsize)"""
+        return self._lookup_cache.cache_info()
+
+    def _lookup(self, numero: Optional[int], rep: str, voie: str, code_postal: str) -> Optional[AddressMatch]:
+        rows, postings, sizes = self._streets(code_postal)
+        grams = trigrams(voie)
+        shared = Counter(i for gram in grams for i in postings.get(gram, ()))
+        if not shared:
+            return None
+        # Coefficient de Dice sur les trigrammes
+        score, best = max((2 * count / (len(grams) + sizes[i]), i) for i, count in shared.items())
+        if score < MIN_STREET_SCORE:
+            return None
+
+        street_id, nom_voie, _, commune, lon, lat = rows[best]
+        precision = 'voie'
+        if numero is not None:
+            point = self._connect().execute(
+                "SELECT lon, lat FROM numeros WHERE voie_id = ? AND numero = ? "
+                "ORDER BY rep = ? DESC, rep = '' DESC LIMIT 1",
+                (street_id, numero, rep)
+            ).fetchone()
+            if point is not None:
+                lon, lat = point
+                precision = 'numero'
+        number = f"{numero}{' ' + rep if rep else ''} " if numero is not None else ""
+        return AddressMatch(f"{number}{nom_voie}", code_postal, commune, lat, lon, score, precision)
+
+    def lookup_bien(self, bien: Dict[str, Any]) -> Optional[AddressMatch]:
+        """Recherche à partir de la section `bien` d'une extraction (adresse, puis adresse complète)"""
+        for key in ('adresse', 'adresse_complete'):
+            if isinstance(bien.get(key), str):
+                match = self.lookup(bien[key], bien.get('code_postal'))
+                if match is not None:
+                    return match
+        return None
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_address_index(path: Union[str, Path] = DEFAULT_ADDRESS_INDEX_PATH) -> Optional[AddressIndex]:
+    """Index local s'il a été construit, sinon None"""
+    path = Path(path)
+    return AddressIndex(path) if path.exists() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit l'index local des adresses")
+    parser.add_argument("csv", type=Path, help="Adresses au format BAN (ex: adresses-93.csv)")
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_ADDRESS_INDEX_PATH,
+                        help=f"Fichier d'index (défaut: {DEFAULT_ADDRESS_INDEX_PATH})")
+    args = parser.parse_args()
+
+    streets, numbers = build_address_index(read_ban_csv(args.csv), args.output)
+    print(f"✅ {streets} voies, {numbers} adresses -> {args.output} "
+          f"({args.output.stat().st_size / 1024 / 1024:.1f} Mo)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Moteur de traitement par lot pour les scripts d'extraction
+
+Les appels aux providers LLM passent l'essentiel de leur temps à attendre le
+réseau : on les recouvre avec un pool de threads borné, tout en restituant les
+résultats dans l'ordre des fichiers d'entrée.
+
+Le mode pipeline sépare l'OCR (CPU, pool de processus) de l'appel LLM
+(réseau, pool de threads) : le lot est alors limité par l'étape la plus
+lente et non par la somme des deux.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+
+@dataclass
+class BatchItemResult:
+    """Résultat du traitement d'un document du lot"""
+    index: int
+    source: str
+    extracted: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchStats:
+    """Statistiques globales d'un lot"""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    def record(self, result: BatchItemResult):
+        self.total += 1
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def docs_per_minute(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.total * 60.0 / self.elapsed
+
+
+def _run_one(index: int, source: str, item: Any,
+             process: Callable[[Any], Dict[str, Any]]) -> BatchItemResult:
+    """Exécute le traitement d'un élément et capture l'erreur éventuelle"""
+    start = time.perf_counter()
+    try:
+        extracted = process(item)
+        return BatchItemResult(index=index, source=source, extracted=extracted,
+                               duration=time.perf_counter() - start)
+    except Exception as e:
+        return BatchItemResult(index=index, source=source, error=str(e),
+                               duration=time.perf_counter() - start)
+
+
+def run_concurrent(items: Iterable[Any],
+                   process: Callable[[Any], Dict[str, Any]],
+                   concurrency: int = 4,
+                   stats: Optional[BatchStats] = None) -> Iterator[BatchItemResult]:
+    """
+    Traite les éléments avec au plus `concurrency` appels simultanés.
+
+    Les résultats sont produits dans l'ordre d'entrée, au fur et à mesure.
+    Le nombre de tâches soumises est borné (2 x concurrency) : la mémoire
+    reste constante quelle que soit la taille du lot.
+    """
+    concurrency = max(1, concurrency)
+    window = concurrency * 2
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="extract") as executor:
+        for index, item in enumerate(items):
+            pending.append(executor.submit(_run_one, index, str(item), item, process))
+            if len(pending) >= window:
+                result = pending.popleft().result()
+                if stats is not None:
+                    stats.record(result)
+                yield result
+
+        while pending:
+            result = pending.popleft().result()
+            if stats is not None:
+                stats.record(result)
+            yield result
+
+    if stats is not None:
+        stats.finish()
+
+
+_END = object()
+
+
+def _call_in_worker(fn: Callable[[Any], str], item: Any) -> str:
+    """
+    Exécute `fn` dans un processus du pool.
+
+    Certaines exceptions (ex: pytesseract.TesseractNotFoundError) ne sont pas
+    re-sérialisables et casseraient le pool : on les convertit en RuntimeError.
+    """
+    try:
+        return fn(item)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def run_pipeline(items: Iterable[Any],
+                 ocr: Callable[[Any], str],
+                 extract: Callable[[str], Dict[str, Any]],
+                 ocr_workers: int = 2,
+                 llm_workers: int = 4,
+                 queue_size: int = 8,
+                 stats: Optional[BatchStats] = None) -> Iterator[BatchItemResult]:
+    """
+    Pipeline producteur/consommateur en deux étapes.
+
+    - `ocr` s'exécute dans un pool de processus (doit être sérialisable) ;
+    - `extract` s'exécute dans `llm_workers` threads ;
+    - les deux étapes sont reliées par une file bornée à `queue_size` textes :
+      si le LLM prend du retard, l'OCR se met en pause (backpressure).
+
+    Les résultats sont produits dans l'ordre d'entrée.
+    """
+    ocr_workers = max(1, ocr_workers)
+    llm_workers = max(1, llm_workers)
+    texts: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    done: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+    failures = []
+
+    def forward(entry):
+        index, item, start, future = entry
+        try:
+            job = (index, item, start, future.result(), None)
+        except Exception as e:
+            job = (index, item, start, None, str(e))
+        while not stop.is_set():
+            try:
+                texts.put(job, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def ocr_stage():
+        try:
+            with ProcessPoolExecutor(max_workers=ocr_workers) as pool:
+                in_flight = deque()
+                for index, item in enumerate(items):
+                    if stop.is_set():
+                        break
+                    future = pool.submit(_call_in_worker, ocr, item)
+                    in_flight.append((index, item, time.perf_counter(), future))
+                    if len(in_flight) >= ocr_workers * 2:
+                        forward(in_flight.popleft())
+                while in_flight and not stop.is_set():
+                    forward(in_flight.popleft())
+                for entry in in_flight:
+                    entry[3].cancel()
+        except Exception as e:
+            failures.append(e)
+        finally:
+            for _ in range(llm_workers):
+                texts.put(_END)
+
+    def llm_stage():
+        while True:
+            job = texts.get()
+            if job is _END:
+                break
+            index, item, start, text, error = job
+            extracted = None
+            if error is None and not stop.is_set():
+                try:
+                    extracted = extract(text)
+                except Exception as e:
+                    error = str(e)
+            done.put(BatchItemResult(index=index, source=str(item), extracted=extracted,
+                                     error=error, duration=time.perf_counter() - start))
+        done.put(_END)
+
+    threads = [threading.Thread(target=ocr_stage, name="ocr-stage", daemon=True)]
+    threads += [threading.Thread(target=llm_stage, name=f"llm-stage-{i}", daemon=True)
+                for i in range(llm_workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        buffered: Dict[int, BatchItemResult] = {}
+        next_index = 0
+        finished = 0
+        while finished < llm_workers:
+            result = done.get()
+            if result is _END:
+                finished += 1
+                continue
+            buffered[result.index] = result
+            while next_index in buffered:
+                result = buffered.pop(next_index)
+                next_index += 1
+                if stats is not None:
+                    stats.record(result)
+                yield result
+
+        if failures:
+            raise failures[0]
+        if stats is not None:
+            stats.finish()
+    finally:
+        stop.set()
+        # Débloque l'étape OCR si le consommateur s'est arrêté en cours de route
+        while threads[0].is_alive():
+            try:
+                texts.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for thread in threads[1:]:
+            if thread.is_alive():
+                texts.put(_END)
@@ -0,0 +1,149 @@
+"""
+Manifeste des traitements par lot : reprise d'un --batch interrompu
+
+Chaque document traité est enregistré avec son empreinte (chemin, taille,
+mtime, SHA-256 du contenu), son statut et son résultat. Relancer le même
+lot ne retraite que les documents en échec, nouveaux ou modifiés ; les
+documents terminés sont restitués depuis le manifeste.
+
+- un fichier dont la taille et le mtime n'ont pas changé n'est pas relu ;
+- sinon son contenu est haché : un fichier seulement touché, copié ou
+  renommé reste reconnu ;
+- les statuts sont séparés par travail (script, provider, modèle) : changer
+  de modèle retraite tout le lot.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from disk_cache import sha256_file
+
+DEFAULT_MANIFEST_PATH = Path(__file__).resolve().parent / ".cache" / "batch_manifest.sqlite"
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    job TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    updated REAL NOT NULL,
+    PRIMARY KEY (job, path)
+);
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (job, sha256, status);
+"""
+
+
+class BatchManifest:
+    """Statut par document d'un travail par lot (SQLite)"""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_MANIFEST_PATH, job: str = ""):
+        self.path = Path(path)
+        self.job = job
+        self._local = threading.local()
+        # Empreintes calculées par completed(), reprises par record() si le fichier n'a pas changé
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def __getstate__(self):
+        # Les connexions SQLite ne traversent pas les frontières de processus
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def completed(self, file_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """Résultat enregistré si ce document (ou un contenu identique) est terminé, sinon None"""
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT size, mtime_ns, sha256, status, result FROM documents WHERE job = ? AND path = ?",
+            (self.job, str(path))
+        ).fetchone()
+        if row is not None and row[3] == STATUS_DONE and (row[0], row[1]) == (stat.st_size, stat.st_mtime_ns):
+            return json.loads(row[4])
+
+        # Taille ou date changées, ou chemin inconnu : le contenu tranche
+        digest = sha256_file(path)
+        self._digests[str(path)] = (stat.st_size, stat.st_mtime_ns, digest)
+        found = conn.execute(
+            "SELECT result FROM documents WHERE job = ? AND sha256 = ? AND status = ? LIMIT 1",
+            (self.job, digest, STATUS_DONE)
+        ).fetchone()
+        if found is None:
+            return None
+        self._save(path, stat, digest, STATUS_DONE, found[0], None)
+        return json.loads(found[0])
+
+    def partition(self, file_paths: Sequence[Path]) -> Tuple[List[Tuple[Path, Dict[str, Any]]], List[Path]]:
+        """(documents terminés avec leur résultat, documents à traiter : en échec, nouveaux ou modifiés)"""
+        done, pending = [], []
+        for file_path in file_paths:
+            result = self.completed(file_path)
+            if result is None:
+                pending.append(file_path)
+            else:
+                done.append((file_path, result))
+        return done, pending
+
+    def record(self, file_path: Union[str, Path], extracted: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None):
+        """Enregistre l'issue du traitement d'un document"""
+        path = Path(file_path).resolve()
+        status = STATUS_FAILED if error is not None else STATUS_DONE
+        result = json.dumps(extracted, ensure_ascii=False) if error is None else None
+        stat = path.stat()
+        size, mtime_ns, digest = self._digests.pop(str(path), (None, None, None))
+        if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            digest = sha256_file(path)  # Fichier jamais haché, ou modifié depuis
+        self._save(path, stat, digest, status, result, error)
+
+    def _save(self, path: Path, stat, digest: str, status: str, result: Optional[str], error: Optional[str]):
+        self._connect().execute(
+            """
+            INSERT INTO documents (job, path, size, mtime_ns, sha256, status, result, error, updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job, path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256,
+                status = excluded.status, result = excluded.result, error = excluded.error,
+                attempts = attempts + 1, updated = excluded.updated
+            """,
+            (self.job, str(path), stat.st_size, stat.st_mtime_ns, digest, status, result, error, time.time())
+        )
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre de documents par statut pour ce travail"""
+        return dict(self._connect().execute(
+            "SELECT status, COUNT(*) FROM documents WHERE job = ? GROUP BY status", (self.job,)
+        ).fetchall())
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
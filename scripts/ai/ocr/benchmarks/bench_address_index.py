@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'index local d'adresses
+
+Mesure la construction de l'index SQLite, puis le débit des recherches
+(adresse libre + code postal) à froid et sur des adresses répétées, comme
+lors d'un lot de demandes pour les mêmes résidences.
+
+Avec --csv, utilise un export de la Base Adresse Nationale (adresses-XX.csv) ;
+sinon un jeu synthétique au même format.
+
+Usage:
+    python benchmarks/bench_address_index.py --csv adresses-93.csv --lookups 20000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from address_index import AddressIndex, build_address_index, read_ban_csv  # noqa: E402
+
+TYPES = ["Rue", "Avenue", "Boulevard", "Allée", "Impasse", "Place", "Chemin"]
+ABBREVIATED = {"Rue": "r", "Avenue": "av.", "Boulevard": "bd", "Allée": "all", "Impasse": "imp",
+               "Place": "pl", "Chemin": "ch"}
+NAMES = ["de la République", "Victor Hugo", "Jean Jaurès", "des Lilas", "du Général de Gaulle",
+         "Pasteur", "de la Gare", "des Écoles", "Gambetta", "Louis Blanc", "de Paris", "du Moulin"]
+
+
+def synthetic_rows(rng: random.Random, codes: int = 40, streets_per_code: int = 150, numbers: int = 40):
+    """Lignes au format BAN : numéros 1..n sur des voies réparties par code postal"""
+    for c in range(codes):
+        code = f"93{100 + c:03d}"
+        for s in range(streets_per_code):
+            voie = f"{TYPES[s % len(TYPES)]} {NAMES[s // len(TYPES) % len(NAMES)]} {s // 84 or ''}".strip()
+            lon, lat = 2.3 + rng.random() / 2, 48.8 + rng.random() / 5
+            for n in range(1, numbers + 1):
+                yield {"numero": str(n), "rep": "", "nom_voie": voie, "code_postal": code,
+                       "nom_commune": f"Commune {c}", "lon": f"{lon + n * 1e-5:.5f}", "lat": f"{lat:.5f}"}
+
+
+def as_written(rng: random.Random, row) -> str:
+    """Adresse telle qu'écrite dans une demande : abréviations, casse, faute de frappe"""
+    street_type, _, name = row["nom_voie"].partition(" ")
+    name = name.lower() if rng.random() < 0.5 else name.upper()
+    if rng.random() < 0.2:
+        i = rng.randrange(len(name))
+        name = name[:i] + name[i + 1:]
+    prefix = ABBREVIATED.get(street_type, street_type) if rng.random() < 0.5 else street_type
+    return f"{row['numero']} {prefix} {name}"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'index d'adresses")
+    parser.add_argument("--csv", type=Path, help="Export BAN adresses-XX.csv (défaut: jeu synthétique)")
+    parser.add_argument("--lookups", type=int, default=20_000, help="Nombre de recherches (défaut: 20000)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = list(read_ban_csv(args.csv) if args.csv else synthetic_rows(rng))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "adresses.sqlite"
+        (streets, numbers), build_s = timed(lambda: build_address_index(rows, path))
+        print(f"\n🔧 {streets} voies, {numbers} adresses indexées en {build_s:.1f} s "
+              f"({path.stat().st_size / 1024 / 1024:.1f} Mo)")
+
+        sample = [rng.choice(rows) for _ in range(args.lookups)]
+        queries = [(as_written(rng, row), row["code_postal"]) for row in sample]
+        repeated = [rng.choice(queries[:200]) for _ in range(args.lookups)]
+
+        index = AddressIndex(path)
+        cold, cold_s = timed(lambda: [index.lookup(adresse, code) for adresse, code in queries])
+        _, warm_s = timed(lambda: [index.lookup(adresse, code) for adresse, code in repeated])
+        found = sum(match is not None and match.adresse.endswith(row["nom_voie"])
+                    for match, row in zip(cold, sample))
+
+        n = len(queries)
+        print(f"\n🔎 {n} recherches")
+        print(f"  adresses variées        {n / cold_s:10.0f} /s   ({cold_s / n * 1e6:.0f} µs)")
+        print(f"  adresses répétées       {n / warm_s:10.0f} /s   ({warm_s / n * 1e6:.1f} µs)")
+        print(f"  voie retrouvée: {found / n:.0%} ; cache: {index.cache_info()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire des interventions validées : ExtractedIntervention
+(pydantic + dataclasses) face à CompactIntervention (__slots__)
+
+Garde en mémoire N interventions validées et enrichies, comme pour une
+passe de re-scoring, et mesure la mémoire retenue (tracemalloc), puis le
+coût de to_dict / JSON et du pickle (renvoi depuis un processus).
+
+Usage:
+    python benchmarks/bench_compact_intervention.py --docs 100000
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from bench_enrich_many import raw_extractions  # noqa: E402
+
+from ocr_strategy_alternative import OCRPipeline, _json_default  # noqa: E402
+
+
+def retained(build):
+    """(résultat, octets encore alloués après construction)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(fn):
+    """Durée hors ramasse-miettes (comme timeit), sensible aux gros tas d'objets"""
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mémoire des interventions compactes")
+    parser.add_argument("--docs", type=int, default=20_000, help="Nombre d'interventions (défaut: 20000)")
+    args = parser.parse_args()
+
+    raws = raw_extractions(args.docs)
+    pipeline = OCRPipeline(anthropic_api_key="bench-key")
+    pipeline.enrich_many(raws, workers=1)  # caches du mapper chauds : seules les interventions sont mesurées
+
+    models, models_bytes = retained(lambda: pipeline.enrich_many(raws, workers=1))
+    compacts, compact_bytes = retained(lambda: pipeline.enrich_many(raws, workers=1, compact=True))
+
+    n = len(raws)
+    print(f"\n🧠 {n} interventions en mémoire")
+    print(f"  ExtractedIntervention   {models_bytes / 1024 / 1024:8.1f} Mo   ({models_bytes / n:6.0f} o/intervention)")
+    print(f"  CompactIntervention     {compact_bytes / 1024 / 1024:8.1f} Mo   ({compact_bytes / n:6.0f} o/intervention)"
+          f"   (÷{models_bytes / compact_bytes:.1f})")
+
+    _, dump_s = timed(lambda: [m.model_dump() for m in models])
+    _, to_dict_s = timed(lambda: [c.to_dict() for c in compacts])
+    legacy_json, legacy_s = timed(lambda: [json.dumps(m.model_dump(), ensure_ascii=False, default=_json_default)
+                                           for m in models])
+    compact_json, compact_s = timed(lambda: [c.to_json() for c in compacts])
+    legacy_pickle, legacy_pickle_s = timed(lambda: [pickle.loads(pickle.dumps(m)) for m in models])
+    compact_pickle, compact_pickle_s = timed(lambda: [pickle.loads(pickle.dumps(c)) for c in compacts])
+
+    print("\n📦 Sérialisation")
+    print(f"  dict    model_dump {dump_s / n * 1e6:7.1f} µs   to_dict {to_dict_s / n * 1e6:7.1f} µs   "
+          f"(x{dump_s / to_dict_s:.1f})")
+    print(f"  JSON    model_dump {legacy_s / n * 1e6:7.1f} µs   to_json {compact_s / n * 1e6:7.1f} µs   "
+          f"(x{legacy_s / compact_s:.1f})")
+    print(f"  pickle  aller-retour modèle {legacy_pickle_s / n * 1e6:5.1f} µs ({len(pickle.dumps(models[0]))} o)   "
+          f"compact {compact_pickle_s / n * 1e6:5.1f} µs ({len(pickle.dumps(compacts[0]))} o)")
+    expected = json.loads(json.dumps([m.to_dict() for m in models[0].metiers]))
+    assert json.loads(compact_json[0])["metiers"] == expected
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
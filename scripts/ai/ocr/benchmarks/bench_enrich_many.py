@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark de OCRPipeline.enrich_many (validation + mapping en pool de processus)
+
+Simule la re-validation d'une année d'extractions après un changement de
+règles : mesure le débit selon le nombre de processus, face à la boucle
+dans le thread appelant. Aucun appel réseau.
+
+Usage:
+    python benchmarks/bench_enrich_many.py --docs 20000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from bench_match_metier import backfill_corpus  # noqa: E402
+
+from ocr_strategy_alternative import OCRPipeline  # noqa: E402
+
+
+def raw_extractions(count: int):
+    """Extractions brutes synthétiques (dates et codes postaux variés)"""
+    rng = random.Random(7)
+    messages = backfill_corpus(rng, count)
+    return [
+        {
+            "nom_client": {"value": "MARAUD", "confidence": 0.95},
+            "prenom_client": {"value": "Nadege", "confidence": 0.95},
+            "adresse": {"value": f"{rng.randint(1, 200)} avenue de la République", "confidence": 0.9},
+            "code_postal": {"value": rng.choice(["93150", "9300", "75011", "6000"]), "confidence": 0.95},
+            "ville": {"value": "LE BLANC MESNIL", "confidence": 0.95},
+            "date_demande": {"value": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+                             "confidence": 0.9},
+            "objet_devis": {"value": message.split(".")[0], "confidence": 0.9},
+            "message_principal": {"value": message, "confidence": 0.85},
+        }
+        for message in messages
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark enrich_many")
+    parser.add_argument("--docs", type=int, default=5000, help="Nombre d'extractions (défaut: 5000)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}),
+                        help="Nombres de processus à mesurer")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Taille des lots (défaut: auto)")
+    args = parser.parse_args()
+
+    raws = raw_extractions(args.docs)
+    pipeline = OCRPipeline(anthropic_api_key="bench-key")
+    print(f"\n📄 {len(raws)} extractions, {os.cpu_count()} cœur(s) disponibles")
+
+    baseline = None
+    for workers in args.workers:
+        pipeline.mapper.build_keyword_index()  # cache de match_metier vidé
+        start = time.perf_counter()
+        results = pipeline.enrich_many(raws, workers=workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        errors = sum(isinstance(result, Exception) for result in results)
+        print(f"  {workers:2d} processus   {elapsed:7.2f} s   {len(raws) / elapsed:8.0f} docs/s   "
+              f"(x{baseline / elapsed:.1f})   {errors} erreur(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark précision / taille de la préparation des images
+
+Pour chaque budget de pixels, mesure les octets envoyés, les tokens image
+estimés et le temps de préparation. Avec une clé Anthropic, lance aussi
+l'extraction et compare les champs obtenus à ceux de l'image pleine
+résolution (taux d'accord) ainsi que la latence moyenne (option --with-llm).
+
+Usage:
+    python benchmarks/bench_image_budget.py data/samples/intervention_docs/demande_devis/
+    ANTHROPIC_API_KEY=... python benchmarks/bench_image_budget.py ./photos --with-llm --budgets 0.3 0.6 1.15
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from statistics import mean
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from PIL import Image  # noqa: E402
+
+from image_preparation import estimate_image_tokens, prepare_image  # noqa: E402
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def field_values(extraction: dict) -> dict:
+    """Valeurs normalisées des champs extraits (pour comparaison)"""
+    values = {}
+    for key, field in extraction.items():
+        value = field.get("value") if isinstance(field, dict) else field
+        if value not in (None, "", []):
+            values[key] = str(value).strip().lower()
+    return values
+
+
+def agreement(reference: dict, candidate: dict) -> float:
+    """Part des champs de référence retrouvés à l'identique"""
+    if not reference:
+        return 1.0
+    return sum(1 for key, value in reference.items() if candidate.get(key) == value) / len(reference)
+
+
+async def extract(extractor, data: bytes):
+    start = time.perf_counter()
+    try:
+        result = await extractor.extract_from_image(data)
+    except Exception as e:
+        print(f"⚠️  Extraction échouée: {e}")
+        result = {}
+    return result, time.perf_counter() - start
+
+
+async def measure_accuracy(images, budgets, api_key):
+    from ocr_strategy_alternative import MultimodalOCRExtractor
+
+    baseline_extractor = MultimodalOCRExtractor(api_key, max_image_pixels=None)
+    references = [field_values((await extract(baseline_extractor, data))[0]) for data in images]
+    await baseline_extractor.aclose()
+
+    accuracy = {}
+    for budget in budgets:
+        extractor = MultimodalOCRExtractor(api_key, max_image_pixels=budget)
+        scores, latencies = [], []
+        for reference, data in zip(references, images):
+            result, latency = await extract(extractor, data)
+            scores.append(agreement(reference, field_values(result)))
+            latencies.append(latency)
+        await extractor.aclose()
+        accuracy[budget] = (mean(scores), mean(latencies))
+    return accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark précision/taille des images envoyées au LLM")
+    parser.add_argument("folder", type=Path, help="Dossier d'images de demandes")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.3, 0.6, 1.15, 2.0],
+                        help="Budgets en mégapixels (défaut: 0.3 0.6 1.15 2.0)")
+    parser.add_argument("--grayscale", action="store_true", help="Passer les images en niveaux de gris")
+    parser.add_argument("--with-llm", action="store_true",
+                        help="Mesurer aussi l'accord des champs via l'API (ANTHROPIC_API_KEY)")
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in args.folder.glob(pattern))
+    if not paths:
+        print(f"❌ Aucune image dans {args.folder}")
+        return 1
+    images = [p.read_bytes() for p in paths]
+    budgets = [int(mp * 1_000_000) for mp in args.budgets]
+
+    original_tokens = [estimate_image_tokens(*Image.open(io.BytesIO(d)).size) for d in images]
+    print(f"\n📁 {len(images)} images — moyenne {mean(len(d) for d in images) / 1e6:.2f} Mo, "
+          f"{mean(original_tokens):.0f} tokens image")
+
+    accuracy = {}
+    if args.with_llm:
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            print("❌ ANTHROPIC_API_KEY requis avec --with-llm")
+            return 1
+        accuracy = asyncio.run(measure_accuracy(images, budgets, api_key))
+
+    print(f"\n{'Budget':>8} {'Octets moy.':>12} {'Tokens moy.':>12} {'Prépa (ms)':>11}"
+          + (f" {'Accord':>8} {'Latence':>8}" if accuracy else ""))
+    for budget in budgets:
+        start = time.perf_counter()
+        prepared = [prepare_image(d, max_pixels=budget, grayscale=args.grayscale) for d in images]
+        prep_ms = (time.perf_counter() - start) * 1000 / len(images)
+        line = (f"{budget / 1e6:>6.2f}MP {mean(p.upload_bytes for p in prepared) / 1e3:>10.0f}ko "
+                f"{mean(p.tokens for p in prepared):>12.0f} {prep_ms:>11.1f}")
+        if accuracy:
+            score, latency = accuracy[budget]
+            line += f" {score:>7.0%} {latency:>7.1f}s"
+        print(line)
+
+    if not accuracy:
+        print("\n💡 Ajoutez --with-llm pour mesurer aussi l'accord des champs et la latence")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark de IntelligentMapper.match_metier sur des descriptions longues
+
+Compare l'ancienne boucle (test `in` par mot-clé, difflib entre le texte
+entier et chaque mot-clé absent) au mapper actuel (automate Aho–Corasick
+pour les occurrences exactes, index de trigrammes et distance d'édition
+bornée pour le matching approché), sur des `message_principal` d'environ
+1 500 caractères comme les restitutions de dépôt de garantie, et sur des
+titres courts avec fautes de frappe.
+
+Mesure aussi match_metiers_batch (scores calculés pour tout le corpus à la
+fois) sur un historique de descriptions variées, face à l'appel texte par
+texte, et vérifie que les résultats sont identiques.
+
+Usage:
+    python benchmarks/bench_match_metier.py --docs 50 --backfill 5000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from ocr_strategy_alternative import EnumFieldMatch, IntelligentMapper  # noqa: E402
+
+SENTENCES = [
+    "Suite à l'état des lieux de sortie du locataire, merci de nous transmettre un devis.",
+    "Nettoyage complet de l'entrée et de la cuisine, dégraissage de la hotte.",
+    "Robinetterie évier mal fixée, joint silicone de la baignoire à refaire.",
+    "Reprise des trous de chevilles dans le séjour et la chambre 2.",
+    "Remplacement de deux ampoules grillées dans le couloir.",
+    "Porte-fenêtre du balcon difficile à fermer, réglage des paumelles.",
+    "Traces d'humidité au plafond de la salle d'eau, vérifier l'origine.",
+    "Le locataire signale la présence de cafards sous l'évier.",
+    "Volet roulant de la chambre bloqué en position basse.",
+    "Moquette tachée à remplacer, plinthes abîmées dans le dégagement.",
+    "Merci de préciser le délai d'intervention et les conditions d'accès au logement.",
+    "Les clés sont à retirer à l'agence aux heures d'ouverture.",
+]
+
+
+def deposit_description(rng: random.Random, length: int = 1500) -> str:
+    """Description synthétique de restitution de dépôt de garantie"""
+    parts = []
+    while sum(len(p) + 1 for p in parts) < length:
+        parts.append(rng.choice(SENTENCES))
+    return " ".join(parts)[:length]
+
+
+# Titre -> métier attendu
+EXPECTED_METIERS = {
+    "Devis plombrie fuite sous évier": "PLOMBERIE",
+    "Intervention electricien tableau": "ELECTRICITE",
+    "Remplacement serure porte palière": "SERRURERIE",
+    "Debouchage canalisatoin cuisine": "PLOMBERIE",
+    "Réparation volets roulant chambre": "VOLET-STORE",
+}
+TITLES = list(EXPECTED_METIERS)
+
+
+def with_typos(rng: random.Random, text: str, rate: float = 0.05) -> str:
+    """Inverse ou supprime des lettres au hasard (saisie, OCR)"""
+    chars = list(text)
+    for i in range(len(chars) - 1):
+        if chars[i].isalpha() and rng.random() < rate:
+            if rng.random() < 0.5:
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+            else:
+                chars[i] = ""
+    return "".join(chars)
+
+
+def backfill_corpus(rng: random.Random, count: int) -> list:
+    """Historique d'interventions : titres et descriptions de 1 à 4 phrases"""
+    corpus = []
+    for _ in range(count):
+        parts = [rng.choice(TITLES)] + rng.sample(SENTENCES, rng.randint(1, 4))
+        corpus.append(with_typos(rng, " ".join(parts)))
+    return corpus
+
+
+def difflib_score(text1: str, text2: str) -> float:
+    from difflib import SequenceMatcher
+    return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+
+
+def legacy_match_metier(mapper: IntelligentMapper, extracted_text: str) -> EnumFieldMatch:
+    """Implémentation d'origine : un `in` par mot-clé, difflib pour chaque absent"""
+    extracted_lower = extracted_text.lower()
+    scores = []
+    for metier, keywords in mapper.metier_keywords.items():
+        if metier.value.lower() in extracted_lower:
+            score = 1.0
+        else:
+            keyword_scores = [
+                1.0 if kw in extracted_lower else difflib_score(extracted_lower, kw)
+                for kw in keywords
+            ]
+            score = max(keyword_scores) if keyword_scores else 0.0
+        if score > 0.3:
+            scores.append((metier.value, score))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    if scores and scores[0][1] >= 0.85:
+        return EnumFieldMatch(scores[0][0], scores[0][1], extracted_text, scores[:3], False)
+    if scores and scores[0][1] >= 0.6:
+        return EnumFieldMatch(scores[0][0], scores[0][1], extracted_text, scores[:3], True)
+    return EnumFieldMatch(None, 0.0, extracted_text, scores[:5], True)
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    results = [fn(text) for text in texts]
+    return results, (time.perf_counter() - start) * 1000 / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark match_metier sur descriptions longues")
+    parser.add_argument("--docs", type=int, default=50, help="Nombre de descriptions (défaut: 50)")
+    parser.add_argument("--length", type=int, default=1500, help="Longueur des descriptions (défaut: 1500)")
+    parser.add_argument("--backfill", type=int, default=5000,
+                        help="Taille de l'historique pour match_metiers_batch (défaut: 5000)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = [deposit_description(rng, args.length) for _ in range(args.docs)]
+
+    start = time.perf_counter()
+    mapper = IntelligentMapper()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"\n🔧 Index construit en {build_ms:.1f} ms "
+          f"({len(mapper.keyword_automaton)} états d'automate)")
+
+    for name, corpus in ((f"{args.docs} descriptions de {args.length} caractères", texts),
+                         (f"{len(TITLES)} titres courts avec fautes", TITLES * 10)):
+        legacy, legacy_ms = timed(lambda text: legacy_match_metier(mapper, text), corpus)
+        current, current_ms = timed(mapper.match_metier, corpus)
+        agree = sum(a.matched_value == b.matched_value for a, b in zip(legacy, current)) / len(corpus)
+
+        print(f"\n📄 {name}")
+        print(f"  boucle mots-clés + difflib        {legacy_ms:8.2f} ms/doc")
+        print(f"  automate + trigrammes/distance    {current_ms:8.2f} ms/doc   (x{legacy_ms / current_ms:.0f})")
+        print(f"  même métier retenu: {agree:.0%}")
+        if corpus is not texts:
+            # L'écart avec l'ancienne boucle n'est pas une erreur en soi : comparaison au métier attendu
+            for label, results in (("boucle + difflib", legacy), ("actuel", current)):
+                correct = sum(r.matched_value == EXPECTED_METIERS[r.original_text] for r in results)
+                print(f"  métier attendu retenu ({label}): {correct / len(corpus):.0%}")
+
+    info = mapper.match_cache_info()
+    print(f"\n♻️  Cache match_metier: {info.hits} hit(s), {info.misses} miss(es), "
+          f"{info.currsize}/{info.maxsize} entrées")
+
+    corpus = backfill_corpus(rng, args.backfill)
+    scalar_start = time.perf_counter()
+    scalar_mapper = IntelligentMapper()
+    scalar = [scalar_mapper.match_metier(text) for text in corpus]
+    scalar_s = time.perf_counter() - scalar_start
+    batch_start = time.perf_counter()
+    batch = IntelligentMapper().match_metiers_batch(corpus)
+    batch_s = time.perf_counter() - batch_start
+    identical = sum(a == b for a, b in zip(scalar, batch))
+
+    print(f"\n📚 Historique de {len(corpus)} descriptions ({len(set(corpus))} distinctes)")
+    print(f"  match_metier texte par texte      {scalar_s:8.2f} s")
+    print(f"  match_metiers_batch               {batch_s:8.2f} s   (x{scalar_s / batch_s:.1f})")
+    print(f"  résultats identiques: {identical}/{len(corpus)}")
+
+    print("\n🔎 Passages approchés trouvés dans les titres :")
+    for title in TITLES:
+        for metier, match in mapper.find_metier_spans(title).items():
+            if match.score < 1.0:
+                print(f"  {title!r}: {metier.value} ← '{match.span}' [{match.start}:{match.end}] "
+                      f"≈ '{match.keyword}' ({match.score:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la détection des demandes déjà extraites
+
+Rejoue un flux synthétique de demandes de devis : quelques gabarits
+d'agence, des demandes distinctes, et une part de renvois (rescan avec
+erreurs OCR, transfert avec en-tête de courriel, relance reprenant le
+numéro). Mesure le coût de find + add par document, la part des appels
+LLM évités, et les faux positifs (demande distincte prise pour un doublon).
+
+Usage:
+    python benchmarks/bench_near_duplicates.py --demandes 2000 --resend-rate 0.3 --threshold 0.9
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from near_duplicates import NearDuplicateIndex  # noqa: E402
+
+AGENCES = ["FONCIA Atlantique", "CITYA Immobilier", "Nexity Lamy", "Square Habitat", "Orpi Gestion"]
+TRAVAUX = ["NETTOYAGE ENTREE Murs, traces noires sur placard, porte non nettoyée",
+           "Fuite sous évier de la cuisine, joint à reprendre, robinet qui goutte",
+           "Remplacement du cylindre de la porte palière suite à perte de clés",
+           "Tableau électrique : disjoncteur qui saute, prise de la chambre hors service",
+           "Chaudière en panne, pas d'eau chaude, entretien annuel à prévoir",
+           "Reprise des peintures du séjour et du couloir après dégât des eaux"]
+VOIES = ["avenue de la République", "rue Victor Hugo", "boulevard Voltaire", "rue des Lilas", "allée Pasteur"]
+
+TEMPLATE = """{agence}, le {jour} septembre 2025
+Objet : Demande de devis N° {numero}
+Gestionnaire référent : {gestionnaire} +33 (0)251775356
+Mandat : N°{mandat} - M {proprietaire}
+Lot : Numéro commercial N°{lot} - Etage : {etage}
+Adresse : {rue} {voie} {code} LE BLANC MESNIL
+Devis urgent : {urgent}
+Date de demande de devis : {jour}/09/2025
+Objet du devis : {travaux}
+Merci de nous transmettre votre devis dans les meilleurs délais.
+Cordialement, le service gestion locative de {agence}"""
+
+
+def demande(rng: random.Random, numero: int) -> str:
+    return TEMPLATE.format(
+        agence=rng.choice(AGENCES), jour=rng.randint(1, 28), numero=numero,
+        gestionnaire=rng.choice(["MME Nadege MARAUD", "M Paul DURAND", "MME Léa PETIT"]),
+        mandat=rng.randint(10_000, 99_999), proprietaire=rng.choice(["GUARTA TEODORO", "MARTIN ALAIN"]),
+        lot=f"A{rng.randint(100, 999)}", etage=rng.choice(["RDC", "1er", "2nd", "3e"]),
+        rue=rng.randint(1, 200), voie=rng.choice(VOIES), code=rng.choice(["93150", "93000", "93100"]),
+        urgent=rng.choice(["Oui", "Non"]), travaux=rng.choice(TRAVAUX),
+    )
+
+
+def rescan(rng: random.Random, text: str, error_rate: float = 0.01) -> str:
+    """Erreurs OCR : confusions de caractères usuelles"""
+    confusions = {"o": "0", "l": "1", "i": "l", "e": "c", "u": "n", "m": "rn", "S": "5"}
+    return "".join(confusions.get(c, c) if rng.random() < error_rate * 5 and c in confusions else c
+                   for c in text)
+
+
+def resend(rng: random.Random, text: str, numero: int) -> str:
+    kind = rng.random()
+    if kind < 0.5:
+        return rescan(rng, text)
+    if kind < 0.8:
+        return f"TR: Demande de devis\nDe : gestion@agence.fr\nEnvoyé : lundi\n\n{text}"
+    return f"RELANCE - Demande de devis N° {numero} toujours sans réponse de votre part. Merci."
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la détection des doublons")
+    parser.add_argument("--demandes", type=int, default=2000, help="Documents du flux (défaut: 2000)")
+    parser.add_argument("--resend-rate", type=float, default=0.3, help="Part de renvois (défaut: 0.3)")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Seuil de similarité (défaut: 0.9)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    stream, sent = [], []
+    for i in range(args.demandes):
+        if sent and rng.random() < args.resend_rate:
+            numero, text = rng.choice(sent)
+            stream.append((numero, resend(rng, text, numero)))
+        else:
+            numero = 250923180000000 + i
+            text = demande(rng, numero)
+            sent.append((numero, text))
+            stream.append((numero, text))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NearDuplicateIndex(Path(tmp) / "dedup.sqlite", threshold=args.threshold)
+        llm_calls = false_positives = 0
+        start = time.perf_counter()
+        for numero, text in stream:
+            duplicate = index.find(text)
+            if duplicate is None:
+                llm_calls += 1
+                index.add(text, json.dumps({"numero_demande": str(numero)}), str(numero))
+            elif duplicate.extraction["numero_demande"] != str(numero):
+                false_positives += 1
+        elapsed = time.perf_counter() - start
+
+    n = len(stream)
+    print(f"\n🧬 {n} documents, {len(sent)} demandes distinctes, seuil {args.threshold}")
+    print(f"  find + add              {elapsed / n * 1000:6.2f} ms/document")
+    print(f"  appels LLM              {llm_calls} ({llm_calls / n:.0%}), sans détection: {n}")
+    print(f"  relances (numéro)       {index.numero_hits}")
+    print(f"  quasi-doublons          {index.similar_hits}")
+    print(f"  renvois non détectés    {llm_calls - len(sent)}")
+    print(f"  faux positifs           {false_positives}")
+    return 0 if not false_positives else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark de DataValidator.parse_date
+
+Compare l'ancienne boucle (sept formats strptime, une exception par échec)
+à l'expression régulière unique de date_parsing, texte par texte et par lot,
+sur un mélange de dates numériques, de mois en toutes lettres et de valeurs
+non reconnues. Vérifie que les dates déjà reconnues par l'ancienne boucle
+le sont toujours à l'identique.
+
+Usage:
+    python benchmarks/bench_parse_date.py --dates 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from date_parsing import parse_french_date, parse_french_dates  # noqa: E402
+
+LEGACY_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d %m %Y", "%d.%m.%Y"]
+MONTHS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+          "août", "septembre", "octobre", "novembre", "décembre"]
+
+
+def legacy_parse_date(date_str):
+    """Implémentation d'origine de DataValidator.parse_date"""
+    if not date_str:
+        return None
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(date_str.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def sample_dates(rng: random.Random, count: int) -> list:
+    """Dates telles que renvoyées par le LLM, ~10% non reconnaissables"""
+    dates = []
+    for _ in range(count):
+        day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2019, 2026)
+        dates.append(rng.choice([
+            f"{year}-{month:02d}-{day:02d}",
+            f"{day:02d}/{month:02d}/{year}",
+            f"{day:02d}-{month:02d}-{year % 100:02d}",
+            f"{day:02d}.{month:02d}.{year}",
+            f"{day} {MONTHS[month - 1]} {year}",
+            rng.choice(["", "non précisée", "dès que possible"]),
+        ]))
+    return dates
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse_date")
+    parser.add_argument("--dates", type=int, default=100_000, help="Nombre de dates (défaut: 100000)")
+    args = parser.parse_args()
+
+    dates = sample_dates(random.Random(42), args.dates)
+
+    legacy, legacy_us = timed(lambda values: [legacy_parse_date(v) for v in values], dates)
+    current, current_us = timed(lambda values: [parse_french_date(v) for v in values], dates)
+    batch, batch_us = timed(parse_french_dates, dates)
+
+    n = len(dates)
+    print(f"\n📅 {n} dates ({len(set(dates))} distinctes)")
+    print(f"  boucle strptime (7 formats)     {legacy_us / n:6.2f} µs/date")
+    print(f"  expression régulière unique     {current_us / n:6.2f} µs/date   (x{legacy_us / current_us:.1f})")
+    print(f"  parse_french_dates (lot)        {batch_us / n:6.2f} µs/date   (x{legacy_us / batch_us:.1f})")
+
+    same = all(new == old for old, new in zip(legacy, current) if old is not None)
+    print(f"\n  reconnues : {sum(d is not None for d in legacy)} avant, {sum(d is not None for d in current)} après "
+          f"(mois en lettres) ; identiques sur les anciennes : {'oui' if same else 'NON'}")
+    assert batch == current
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
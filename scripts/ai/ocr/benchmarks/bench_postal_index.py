@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'index local des codes postaux
+
+Mesure le coût de démarrage (construction, ouverture mmap, première
+recherche) face au chargement du CSV dans un dictionnaire, puis le débit
+des recherches par code et du contrôle croisé code postal / ville.
+
+Avec --csv, utilise la base officielle de La Poste (laposte_hexasmal.csv) ;
+sinon un jeu synthétique de même taille (~39 000 couples).
+
+Usage:
+    python benchmarks/bench_postal_index.py --csv laposte_hexasmal.csv --lookups 100000
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+script_dir = Path(__file__).resolve().parent
+sys.path.insert(0, str(script_dir.parent))
+
+from postal_index import PostalIndex, build_postal_index, read_laposte_csv  # noqa: E402
+
+SYLLABLES = ["ber", "mon", "ville", "court", "sur", "saint", "la", "mar", "neuf", "bois",
+             "champ", "fon", "taine", "ro", "che", "lieu", "vil", "lers", "mes", "nil"]
+
+
+def synthetic_entries(rng: random.Random, count: int = 39_000):
+    """Couples (code postal, commune) au format de la base La Poste"""
+    entries = []
+    for _ in range(count):
+        name = " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+                        for _ in range(rng.randint(1, 3))).upper()
+        entries.append((f"{rng.randint(1000, 97699):05d}", name))
+    return entries
+
+
+def with_typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'index des codes postaux")
+    parser.add_argument("--csv", type=Path, help="laposte_hexasmal.csv (défaut: jeu synthétique)")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Nombre de recherches (défaut: 100000)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    entries = read_laposte_csv(args.csv) if args.csv else synthetic_entries(rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "codes_postaux.idx"
+        count, build_s = timed(lambda: build_postal_index(entries, path))
+        print(f"\n🔧 {count} couples indexés en {build_s * 1000:.0f} ms "
+              f"({path.stat().st_size / 1024:.0f} Ko)")
+
+        def load_dict():
+            by_code = {}
+            for code, name in entries:
+                by_code.setdefault(code, []).append(name)
+            return by_code
+
+        _, dict_s = timed(load_dict)
+        index, open_s = timed(lambda: PostalIndex(path))
+        _, first_s = timed(lambda: index.communes(entries[0][0]))
+        print("\n🚀 Démarrage")
+        print(f"  dictionnaire depuis les couples lus  {dict_s * 1000:8.2f} ms (hors lecture du CSV)")
+        print(f"  PostalIndex (ouverture différée)      {open_s * 1000:8.3f} ms")
+        print(f"  première recherche (mmap)             {first_s * 1000:8.3f} ms")
+
+        sample = [rng.choice(entries) for _ in range(args.lookups)]
+        queries = []
+        for code, name in sample:
+            kind = rng.random()
+            if kind < 0.7:
+                queries.append((code, name.title()))
+            elif kind < 0.9:
+                queries.append((code, with_typo(rng, name)))
+            else:
+                queries.append((code[:2] + code[3] + code[2] + code[4:], name))  # chiffres inversés
+
+        _, code_s = timed(lambda: [index.communes(code) for code, _ in sample])
+        checks, check_s = timed(lambda: [index.check(code, name) for code, name in queries])
+        valid = sum(check.valid for check in checks)
+        corrected = sum(check.corrected for check in checks)
+
+        n = len(sample)
+        print(f"\n🔎 {n} recherches")
+        print(f"  communes(code)           {n / code_s:10.0f} /s   ({code_s / n * 1e6:.1f} µs)")
+        print(f"  check(code, ville)       {n / check_s:10.0f} /s   ({check_s / n * 1e6:.1f} µs)")
+        print(f"  valides: {valid / n:.0%}, corrigés: {corrected / n:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
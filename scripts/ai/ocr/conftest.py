@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Fixtures partagées des tests
+"""
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import BaseMessage
+
+from extract_demande_devis import DemandeDevisExtractor
+
+
+@pytest.fixture
+def fake_extractor():
+    """
+    Fabrique de DemandeDevisExtractor branchés sur un modèle factice
+
+    Réponses textuelles (FakeListChatModel, qui reboucle en fin de liste) ou
+    messages complets, par exemple avec un usage de tokens (GenericFakeChatModel).
+    """
+    def make(responses, provider="ollama", **kwargs):
+        responses = list(responses)
+
+        class FakeExtractor(DemandeDevisExtractor):
+            def _init_llm(self):
+                if responses and isinstance(responses[0], BaseMessage):
+                    return GenericFakeChatModel(messages=iter(responses))
+                return FakeListChatModel(responses=responses)
+
+        return FakeExtractor(provider=provider, **kwargs)
+
+    return make
@@ -0,0 +1,99 @@
+"""
+Analyse des dates françaises en une passe
+
+Une seule expression régulière compilée reconnaît tous les formats acceptés
+et indique lequel a correspondu, au lieu d'essayer des formats strptime les
+uns après les autres (une exception par échec) :
+
+- ISO : 2025-09-23 ;
+- numérique jour d'abord : 23/09/2025, 23-09-25, 23.09.2025, 23 09 2025 ;
+- mois en toutes lettres : 23 septembre 2025, le 1er sept. 25,
+  mardi 23 Septembre 2025 (casse et accents indifférents).
+
+Années sur 2 chiffres : même pivot que strptime (69-99 -> 19xx, 00-68 -> 20xx).
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from text_normalization import fold_text
+
+FRENCH_MONTHS = {
+    'janvier': 1, 'janv': 1, 'jan': 1,
+    'fevrier': 2, 'fevr': 2, 'fev': 2,
+    'mars': 3, 'mar': 3,
+    'avril': 4, 'avr': 4,
+    'mai': 5,
+    'juin': 6,
+    'juillet': 7, 'juil': 7,
+    'aout': 8,
+    'septembre': 9, 'sept': 9, 'sep': 9,
+    'octobre': 10, 'oct': 10,
+    'novembre': 11, 'nov': 11,
+    'decembre': 12, 'dec': 12,
+}
+
+_WEEKDAYS = 'lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche'
+_MONTHS = '|'.join(sorted(FRENCH_MONTHS, key=len, reverse=True))
+
+_DATE = re.compile(
+    rf'''
+    (?P<iso_year>\d{{4}})-(?P<iso_month>\d{{1,2}})-(?P<iso_day>\d{{1,2}})
+    |
+    (?P<day>\d{{1,2}})(?P<sep>[/.\- ])(?P<month>\d{{1,2}})(?P=sep)(?P<year>\d{{4}}|\d{{2}})
+    |
+    (?:le\s+)?(?:(?:{_WEEKDAYS})\s+)?
+    (?P<text_day>\d{{1,2}})(?:er)?\s+(?P<text_month>{_MONTHS})\.?\s+(?P<text_year>\d{{4}}|\d{{2}})
+    ''',
+    re.VERBOSE,
+)
+
+
+def _full_year(year: str) -> int:
+    if len(year) == 4:
+        return int(year)
+    short = int(year)
+    return 1900 + short if short >= 69 else 2000 + short
+
+
+def parse_french_date(value: str) -> Optional[datetime]:
+    """Date reconnue dans `value` (chaîne entière, hors espaces), ou None"""
+    if not isinstance(value, str):
+        return None
+    match = _DATE.fullmatch(fold_text(value.strip()))
+    if match is None:
+        return None
+
+    groups = match.groupdict()
+    if groups['iso_year'] is not None:
+        year, month, day = int(groups['iso_year']), int(groups['iso_month']), int(groups['iso_day'])
+    elif groups['day'] is not None:
+        year, month, day = _full_year(groups['year']), int(groups['month']), int(groups['day'])
+    else:
+        year = _full_year(groups['text_year'])
+        month, day = FRENCH_MONTHS[groups['text_month']], int(groups['text_day'])
+
+    try:
+        return datetime(year, month, day)
+    except ValueError:  # 31/02, mois 13...
+        return None
+
+
+def parse_french_dates(values: Iterable[str]) -> List[Optional[datetime]]:
+    """
+    parse_french_date pour tout un lot
+
+    Les mêmes dates reviennent souvent d'une extraction à l'autre : chaque
+    chaîne distincte n'est analysée qu'une fois.
+    """
+    parsed: Dict[str, Optional[datetime]] = {}
+    results = []
+    for value in values:
+        if not isinstance(value, str):
+            results.append(None)
+            continue
+        if value not in parsed:
+            parsed[value] = parse_french_date(value)
+        results.append(parsed[value])
+    return results
@@ -0,0 +1,155 @@
+"""
+Cache clé/valeur persistant sur disque (SQLite)
+
+- sûr entre processus (mode WAL + busy timeout) ;
+- éviction LRU quand la taille totale dépasse `max_bytes` ;
+- sérialisable : peut être passé à un pool de processus, chaque processus
+  ouvre sa propre connexion.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Écritures entre deux recalculs exacts de la taille totale (écritures des
+# autres processus partageant le cache)
+RESYNC_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def sha256_file(path: Union[str, Path]) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts: object) -> str:
+    """Construit une clé de cache stable à partir de plusieurs composants"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Cache SQLite avec éviction LRU par taille"""
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total: Optional[int] = None  # Taille totale connue, tenue à jour à chaque écriture
+        self._writes = 0
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def __getstate__(self):
+        # Les connexions SQLite ne traversent pas les frontières de processus
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Retourne la valeur en cache, ou None"""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str):
+        """Enregistre une valeur puis applique l'éviction si nécessaire"""
+        size = len(value.encode('utf-8'))
+        conn = self._connect()
+        replaced = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time())
+        )
+        # Total tenu à jour sans parcourir la table, recalculé périodiquement
+        if self._total is None or self._writes % RESYNC_EVERY == 0:
+            self._total = self._sum_sizes(conn)
+        else:
+            self._total += size - (replaced[0] if replaced else 0)
+        self._writes += 1
+        if self._total > self.max_bytes:
+            self._evict(conn)
+
+    @staticmethod
+    def _sum_sizes(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        total = self._sum_sizes(conn)  # Exact : inclut les écritures des autres processus
+        self._total = total
+        if total <= self.max_bytes:
+            return
+
+        # On redescend à 90% pour ne pas évincer à chaque écriture
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        freed = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            victims.append((key,))
+            excess -= size
+            freed += size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._total = total - freed
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._sum_sizes(self._connect())
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
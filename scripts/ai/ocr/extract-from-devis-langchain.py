@@ -15,12 +15,20 @@ Usage:
 """
 
 import argparse
+import functools
+import hashlib
 import json
 import os
 import sys
 from pathlib import Path
 from typing import Dict, Optional, List
 
+from batch_engine import BatchStats, run_concurrent, run_pipeline
+from batch_manifest import DEFAULT_MANIFEST_PATH, BatchManifest
+from disk_cache import DiskCache
+from jsonl_output import DEFAULT_FLUSH_EVERY, JSONLWriter, jsonl_to_json
+from tesseract_ocr import DEFAULT_OCR_CACHE_PATH, DEFAULT_OCR_CONFIG, DEFAULT_OCR_LANGUAGE, OCR_AVAILABLE, image_to_text
+
 # Ajouter le chemin racine au PYTHONPATH
 script_dir = Path(__file__).resolve().parent
 project_root = script_dir.parent.parent.parent
@@ -40,12 +48,7 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
     print("⚠️  LangChain non installé. Installez avec: pip install langchain langchain-core")
 
-try:
-    from PIL import Image
-    import pytesseract
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+if not OCR_AVAILABLE:
     print("⚠️  Tesseract non disponible. Installez avec: pip install pytesseract pillow")
 
 
@@ -126,16 +129,36 @@ class DevisExtractorLangChain:
     }
     
     def __init__(self, provider: str = "ollama", model: Optional[str] = None, 
-                 dataset_path: Path = DATASET_PATH):
+                 dataset_path: Path = DATASET_PATH,
+                 ocr_language: str = DEFAULT_OCR_LANGUAGE,
+                 ocr_config: str = DEFAULT_OCR_CONFIG,
+                 ocr_cache: Optional[DiskCache] = None):
         if not LANGCHAIN_AVAILABLE:
             raise RuntimeError("LangChain non disponible. Installez avec: pip install langchain langchain-core")
         
         self.provider = provider.lower()
         self.model_name = model or self.PROVIDERS[self.provider]["default_model"]
         self.dataset_path = dataset_path
+        self.ocr_language = ocr_language
+        self.ocr_config = ocr_config
+        self.ocr_cache = ocr_cache
         self.examples = self._load_examples()
         self.llm = self._init_llm()
         self.parser = JsonOutputParser(pydantic_object=DevisExtractedData)
+        
+        # Prompt few-shot et chaîne compilés une seule fois, réutilisés pour chaque document
+        self.prompt = self._build_prompt_template().partial(
+            format_instructions=self.parser.get_format_instructions()
+        )
+        self.chain = self.prompt | self.llm | self.parser
+        # Empreinte du prompt rendu (consignes, exemples few-shot du dataset)
+        self.prompt_hash = self._render_prompt_hash()
+    
+    def _render_prompt_hash(self) -> str:
+        """SHA-256 des messages du prompt hors texte OCR : change avec le dataset d'exemples"""
+        messages = self.prompt.format_messages(input="")
+        raw = json.dumps([(m.type, m.content) for m in messages], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
     
     def _load_examples(self) -> List[Dict]:
         """Charge les exemples depuis le dataset"""
@@ -267,15 +290,7 @@ Voici quelques exemples :"""),
         print(f"🤖 Extraction avec {self.provider}/{self.model_name}...")
         
         try:
-            # Construire la chaîne LangChain
-            prompt = self._build_prompt_template()
-            chain = prompt | self.llm | self.parser
-            
-            # Exécuter
-            result = chain.invoke({
-                "input": ocr_text,
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            result = self.chain.invoke({"input": ocr_text})
             
             print("✅ Extraction réussie")
             return result
@@ -284,21 +299,29 @@ Voici quelques exemples :"""),
             print(f"❌ Erreur lors de l'extraction: {e}")
             raise
     
-    def extract_from_image(self, image_path: Path) -> Dict:
-        """Extrait depuis une image (OCR + LLM)"""
+    @property
+    def ocr_function(self):
+        """Fonction OCR sérialisable (pour un pool de processus)"""
+        return functools.partial(image_to_text, lang=self.ocr_language, config=self.ocr_config,
+                                 cache=self.ocr_cache)
+    
+    def ocr_image(self, image_path: Path) -> str:
+        """Extrait le texte d'une image avec Tesseract"""
         if not OCR_AVAILABLE:
             raise RuntimeError("Tesseract non disponible")
         
         print(f"📷 Lecture de l'image: {image_path}")
-        image = Image.open(image_path)
-        
         print("🔍 Extraction OCR...")
-        ocr_text = pytesseract.image_to_string(image, lang='fra')
+        ocr_text = self.ocr_function(image_path)
         
         print(f"📄 Texte OCR extrait ({len(ocr_text)} caractères)")
         print(f"Aperçu: {ocr_text[:200]}...\n")
         
-        return self.extract_with_llm(ocr_text)
+        return ocr_text
+    
+    def extract_from_image(self, image_path: Path) -> Dict:
+        """Extrait depuis une image (OCR + LLM)"""
+        return self.extract_with_llm(self.ocr_image(image_path))
     
     @classmethod
     def list_providers(cls):
@@ -333,6 +356,12 @@ Exemples d'utilisation:
   export HUGGINGFACE_API_KEY="votre-clé"
   python extract-from-devis-langchain.py -i devis.jpg --provider huggingface
 
+  # Traitement par lot : pipeline OCR (4 processus) / LLM (8 appels simultanés)
+  python extract-from-devis-langchain.py -b ./dossier_devis/ --provider groq --concurrency 8 --ocr-workers 4
+
+  # Gros lot : un résultat par ligne dès qu'il est prêt, JSON agrégé reconstruit à la fin
+  python extract-from-devis-langchain.py -b ./dossier_devis/ --output-jsonl results.jsonl -o results.json
+
   # Liste des providers
   python extract-from-devis-langchain.py --list-providers
         """
@@ -341,11 +370,35 @@ Exemples d'utilisation:
     parser.add_argument("--image", "-i", type=Path, help="Chemin vers une image de devis")
     parser.add_argument("--text", "-t", type=str, help="Texte OCR déjà extrait")
     parser.add_argument("--batch", "-b", type=Path, help="Dossier contenant plusieurs images")
+    parser.add_argument("--concurrency", "-c", type=int, default=4,
+                       help="Nombre d'extractions simultanées en mode batch (défaut: 4)")
+    parser.add_argument("--ocr-workers", type=int,
+                       help="Active le pipeline OCR/LLM avec N processus Tesseract en mode batch")
+    parser.add_argument("--queue-size", type=int, default=8,
+                       help="Textes OCR en attente du LLM en mode pipeline (défaut: 8)")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST_PATH,
+                       help="Manifeste de reprise des lots (défaut: .cache/batch_manifest.sqlite)")
+    parser.add_argument("--no-manifest", action="store_true",
+                       help="Retraite tout le lot sans consulter ni mettre à jour le manifeste")
+    parser.add_argument("--ocr-lang", default=DEFAULT_OCR_LANGUAGE,
+                       help=f"Langue Tesseract (défaut: {DEFAULT_OCR_LANGUAGE})")
+    parser.add_argument("--ocr-config", default=DEFAULT_OCR_CONFIG,
+                       help="Options Tesseract, ex: \"--psm 6\"")
+    parser.add_argument("--ocr-cache", type=Path, default=DEFAULT_OCR_CACHE_PATH,
+                       help="Cache SQLite du texte OCR (défaut: .cache/ocr_text.sqlite)")
+    parser.add_argument("--ocr-cache-max-mb", type=int, default=512,
+                       help="Taille maximale du cache OCR en Mo (éviction LRU, défaut: 512)")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="Désactive le cache OCR")
     parser.add_argument("--provider", "-p", default="ollama", 
                        choices=["ollama", "groq", "huggingface", "openai"],
                        help="Provider LLM à utiliser (défaut: ollama)")
     parser.add_argument("--model", "-m", help="Modèle LLM spécifique à utiliser")
     parser.add_argument("--output", "-o", type=Path, help="Fichier de sortie JSON")
+    parser.add_argument("--output-jsonl", type=Path,
+                       help="Écrit chaque résultat sur une ligne dès qu'il est prêt (mémoire constante) ; "
+                            "avec --output, le JSON agrégé est reconstruit depuis ce fichier à la fin")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY,
+                       help=f"Documents entre deux écritures sur disque du JSONL (défaut: {DEFAULT_FLUSH_EVERY})")
     parser.add_argument("--list-providers", action="store_true", help="Lister les providers disponibles")
     
     args = parser.parse_args()
@@ -357,24 +410,31 @@ Exemples d'utilisation:
     
     # Initialiser l'extracteur
     try:
-        extractor = DevisExtractorLangChain(provider=args.provider, model=args.model)
+        ocr_cache = None
+        if not args.no_ocr_cache:
+            ocr_cache = DiskCache(args.ocr_cache, max_bytes=args.ocr_cache_max_mb * 1024 * 1024)
+        extractor = DevisExtractorLangChain(provider=args.provider, model=args.model,
+                                            ocr_language=args.ocr_lang, ocr_config=args.ocr_config,
+                                            ocr_cache=ocr_cache)
     except Exception as e:
         print(f"❌ Erreur d'initialisation: {e}")
         return 1
     
-    # Traitement
+    # Traitement : résultats en mémoire, ou écrits au fil de l'eau en JSONL
     results = []
+    writer = JSONLWriter(args.output_jsonl, flush_every=args.flush_every) if args.output_jsonl else None
+    emit = writer.write if writer is not None else results.append
     
     try:
         if args.text:
             # Mode texte direct
             result = extractor.extract_with_llm(args.text)
-            results.append({"text": args.text[:100], "extracted": result})
+            emit({"text": args.text[:100], "extracted": result})
         
         elif args.image:
             # Mode image unique
             result = extractor.extract_from_image(args.image)
-            results.append({"image": str(args.image), "extracted": result})
+            emit({"image": str(args.image), "extracted": result})
         
         elif args.batch:
             # Mode batch
@@ -382,17 +442,41 @@ Exemples d'utilisation:
                 print(f"❌ {args.batch} n'est pas un dossier")
                 return 1
             
-            images = list(args.batch.glob("*.jpg")) + list(args.batch.glob("*.jpeg")) + list(args.batch.glob("*.png"))
+            images = sorted(list(args.batch.glob("*.jpg")) + list(args.batch.glob("*.jpeg")) + list(args.batch.glob("*.png")))
             print(f"📁 {len(images)} images trouvées dans {args.batch}")
+            manifest = None
+            if not args.no_manifest:
+                # Documents terminés lors d'un lancement précédent : restitués sans retraitement
+                manifest = BatchManifest(args.manifest,
+                                         job=f"devis_langchain:{extractor.provider}:{extractor.model_name}:"
+                                             f"{extractor.prompt_hash[:12]}")
+                done, images = manifest.partition(images)
+                for img_path, extracted in done:
+                    emit({"image": str(img_path), "extracted": extracted})
+                if done:
+                    print(f"⏭️  {len(done)} document(s) déjà traité(s) d'après le manifeste, {len(images)} à traiter")
+            
+            stats = BatchStats()
+            if args.ocr_workers:
+                batch = run_pipeline(images, extractor.ocr_function, extractor.extract_with_llm,
+                                     ocr_workers=args.ocr_workers, llm_workers=args.concurrency,
+                                     queue_size=args.queue_size, stats=stats)
+            else:
+                batch = run_concurrent(images, extractor.extract_from_image,
+                                       concurrency=args.concurrency, stats=stats)
+            
+            for item in batch:
+                img_path = images[item.index]
+                print(f"\n--- [{item.index + 1}/{len(images)}] {img_path.name} ---")
+                if item.ok:
+                    emit({"image": str(img_path), "extracted": item.extracted})
+                else:
+                    print(f"❌ Erreur: {item.error}")
+                    emit({"image": str(img_path), "error": item.error})
+                if manifest is not None:
+                    manifest.record(img_path, item.extracted, item.error)
             
-            for i, img_path in enumerate(images, 1):
-                print(f"\n--- [{i}/{len(images)}] {img_path.name} ---")
-                try:
-                    result = extractor.extract_from_image(img_path)
-                    results.append({"image": str(img_path), "extracted": result})
-                except Exception as e:
-                    print(f"❌ Erreur: {e}")
-                    results.append({"image": str(img_path), "error": str(e)})
+            print(f"\n⏱️  {stats.total} documents en {stats.elapsed:.1f}s ({stats.docs_per_minute:.1f} docs/min)")
         
         else:
             parser.print_help()
@@ -402,10 +486,17 @@ Exemples d'utilisation:
         print("\n" + "="*80)
         print("📊 RÉSULTATS")
         print("="*80)
-        print(json.dumps(results, ensure_ascii=False, indent=2))
+        if writer is not None:
+            writer.close()
+            print(f"📝 {writer.succeeded}/{writer.written} réussis, écrits au fil de l'eau dans {args.output_jsonl}")
+        else:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
         
         # Sauvegarder si demandé
-        if args.output:
+        if args.output and writer is not None:
+            jsonl_to_json(args.output_jsonl, args.output)
+            print(f"\n💾 Résultats agrégés depuis {args.output_jsonl} dans {args.output}")
+        elif args.output:
             with open(args.output, 'w', encoding='utf-8') as f:
                 json.dump(results, f, ensure_ascii=False, indent=2)
             print(f"\n💾 Résultats sauvegardés dans {args.output}")
@@ -414,9 +505,15 @@ Exemples d'utilisation:
         
     except Exception as e:
         print(f"\n❌ Erreur fatale: {e}")
+        if writer is not None:
+            print(f"📝 {writer.written} résultat(s) déjà écrits dans {args.output_jsonl}")
         import traceback
         traceback.print_exc()
         return 1
+    
+    finally:
+        if writer is not None:
+            writer.close()
 
 
 if __name__ == "__main__":
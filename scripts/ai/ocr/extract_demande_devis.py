@@ -21,13 +21,28 @@ Configuration:
 """
 
 import argparse
+import asyncio
+import functools
+import hashlib
 import json
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Optional, List, Any
+from typing import Any, Collection, Dict, Iterator, List, Optional, Tuple
 import yaml
 
+from address_index import DEFAULT_ADDRESS_INDEX_PATH, AddressIndex, open_address_index
+from batch_engine import BatchItemResult, BatchStats, run_concurrent, run_pipeline
+from batch_manifest import DEFAULT_MANIFEST_PATH, BatchManifest
+from disk_cache import DiskCache, make_key
+from json_repair import RepairStats, parse_llm_json
+from jsonl_output import DEFAULT_FLUSH_EVERY, JSONLWriter, jsonl_to_json
+from message_batch import DEFAULT_POLL_INTERVAL, BatchRequest, MessageBatchRunner, make_custom_id
+from near_duplicates import DEFAULT_DEDUP_INDEX_PATH, DEFAULT_SIMILARITY_THRESHOLD, NearDuplicateIndex
+from prompt_cache import CACHE_CONTROL_PROVIDERS, TokenUsageStats, cacheable_text_block
+from streaming_json import iter_json_members
+from tesseract_ocr import DEFAULT_OCR_CACHE_PATH, DEFAULT_OCR_CONFIG, DEFAULT_OCR_LANGUAGE, OCR_AVAILABLE, image_to_text
+
 # Ajouter le chemin racine au PYTHONPATH
 script_dir = Path(__file__).resolve().parent
 project_root = script_dir.parent.parent.parent
@@ -35,9 +50,12 @@ sys.path.insert(0, str(project_root))
 
 # Configuration
 PROMPT_PATH = script_dir / "prompts" / "prompt_demande_de_devis.yaml"
+LLM_CACHE_PATH = script_dir / ".cache" / "llm_extractions.sqlite"
+BATCH_REQUESTS_PATH = script_dir / ".cache" / "batch_requests.jsonl"
 
 # Import conditionnel des dépendances
 try:
+    from langchain_core.messages import SystemMessage
     from langchain_core.prompts import ChatPromptTemplate
     from langchain_core.output_parsers import JsonOutputParser
     from langchain_core.pydantic_v1 import BaseModel, Field
@@ -46,12 +64,7 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
     print("⚠️  LangChain non installé. Installez avec: pip install langchain langchain-core")
 
-try:
-    from PIL import Image
-    import pytesseract
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+if not OCR_AVAILABLE:
     print("⚠️  Tesseract non disponible. Installez avec: pip install pytesseract pillow")
 
 
@@ -132,6 +145,10 @@ class DemandeDevisData(BaseModel):
     agence: Optional[AgenceInfo] = Field(None, description="Agence destinataire")
 
 
+# Sections obligatoires de DemandeDevisData (arrêt anticipé du streaming)
+REQUIRED_SECTIONS = tuple(name for name, f in DemandeDevisData.__fields__.items() if f.required)
+
+
 # ========================================
 # Configuration des providers
 # ========================================
@@ -187,7 +204,13 @@ class DemandeDevisExtractor:
     """Extracteur de demandes de devis avec support multi-LLM"""
 
     def __init__(self, provider: str = "ollama", model: Optional[str] = None,
-                 prompt_path: Path = PROMPT_PATH):
+                 prompt_path: Path = PROMPT_PATH,
+                 ocr_language: str = DEFAULT_OCR_LANGUAGE,
+                 ocr_config: str = DEFAULT_OCR_CONFIG,
+                 ocr_cache: Optional[DiskCache] = None,
+                 llm_cache: Optional[DiskCache] = None,
+                 address_index: Optional[AddressIndex] = None,
+                 dedup_index: Optional[NearDuplicateIndex] = None):
         if not LANGCHAIN_AVAILABLE:
             raise RuntimeError("LangChain non disponible. Installez avec: pip install langchain langchain-core")
 
@@ -198,17 +221,40 @@ class DemandeDevisExtractor:
         self.provider_info = PROVIDERS_CONFIG[self.provider]
         self.model_name = model or self.provider_info["default_model"]
         self.prompt_path = prompt_path
+        self.ocr_language = ocr_language
+        self.ocr_config = ocr_config
+        self.ocr_cache = ocr_cache
+        self.llm_cache = llm_cache
+        # Index d'adresses local : normalisation et coordonnées de bien.adresse
+        self.address_index = address_index
+        # Demandes déjà extraites : relances (même numéro) et rescans (MinHash)
+        self.dedup_index = dedup_index
         self.prompt_config = self._load_prompt_config()
         self.llm = self._init_llm()
         self.parser = JsonOutputParser(pydantic_object=DemandeDevisData)
 
+        self.token_usage = TokenUsageStats()
+        self.repair_stats = RepairStats()
+
+        # Prompt et chaîne compilés une seule fois, réutilisés pour chaque document
+        self.prompt = self._mark_cacheable_prefix(self._build_prompt_template().partial(
+            format_instructions=self.parser.get_format_instructions()
+        ))
+        self.llm_chain = self.prompt | self.llm
+        self.prompt_fingerprint = self._render_fingerprint()
+        temperature = self.prompt_config.get('model_config', {}).get('temperature', 0.1)
+        self.dedup_scope = make_key("demande_devis", self.provider, self.model_name, temperature,
+                                    self.prompt_hash, self.prompt_fingerprint)
+
     def _load_prompt_config(self) -> Dict:
         """Charge la configuration du prompt depuis le fichier YAML"""
         if not self.prompt_path.exists():
             raise FileNotFoundError(f"Fichier de prompt non trouvé: {self.prompt_path}")
 
-        with open(self.prompt_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        raw = self.prompt_path.read_bytes()
+        config = yaml.safe_load(raw.decode('utf-8'))
+        # Toute modification du YAML invalide le cache des extractions
+        self.prompt_hash = hashlib.sha256(raw).hexdigest()
 
         print(f"✅ Prompt chargé: {config.get('name', 'N/A')} (v{config.get('version', 'N/A')})")
         return config
@@ -303,53 +349,293 @@ class DemandeDevisExtractor:
         if examples:
             system_prompt += "\n\n## EXEMPLES\n"
             for i, example in enumerate(examples[:2], 1):  # Limiter à 2 exemples
+                # Les accolades du JSON d'exemple ne sont pas des variables du template
+                example_input = str(example['input']).replace('{', '{{').replace('}', '}}')
+                example_output = str(example['output']).replace('{', '{{').replace('}', '}}')
                 system_prompt += f"\n### Exemple {i}\n"
-                system_prompt += f"**Input:**\n{example['input']}\n\n"
-                system_prompt += f"**Output:**\n{example['output']}\n"
+                system_prompt += f"**Input:**\n{example_input}\n\n"
+                system_prompt += f"**Output:**\n{example_output}\n"
 
         return ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("human", user_prompt_template)
         ])
 
+    def _mark_cacheable_prefix(self, template: ChatPromptTemplate) -> ChatPromptTemplate:
+        """
+        Rend le prompt système une fois pour toutes et le marque `cache_control`.
+
+        Le prompt système (instructions, format, exemples) est le préfixe
+        statique de chaque requête ; le texte OCR reste dans le dernier message.
+        """
+        if self.provider not in CACHE_CONTROL_PROVIDERS:
+            return template
+        system, *others = template.messages
+        rendered = system.format(**template.partial_variables)
+        return ChatPromptTemplate.from_messages([
+            SystemMessage(content=[cacheable_text_block(rendered.content)]),
+            *others
+        ])
+
+    def _render_fingerprint(self) -> str:
+        """Empreinte du prompt rendu, hors texte OCR (calculée une seule fois)"""
+        rendered = "\n\n".join(
+            f"{message.type}: {message.content}"
+            for message in self.prompt.format_messages(ocr_text="{ocr_text}")
+        )
+        return hashlib.sha256(rendered.encode('utf-8')).hexdigest()
+
+    def _parse_response(self, message: Any) -> Dict:
+        """
+        Décode le JSON de la réponse du LLM (AIMessage ou texte brut).
+
+        Remplace JsonOutputParser, qui échoue sur la prose autour du JSON ou
+        une virgule finale : le JSON est réparé localement plutôt que de
+        relancer le document.
+        """
+        text = getattr(message, "content", message)
+        return parse_llm_json(text, self.repair_stats)
+
+    def _llm_cache_key(self, ocr_text: str) -> str:
+        """Clé de cache : provider, modèle, température, prompt rendu et texte OCR"""
+        temperature = self.prompt_config.get('model_config', {}).get('temperature', 0.1)
+        return make_key("demande_devis", self.provider, self.model_name, temperature,
+                        self.prompt_hash, self.prompt_fingerprint, ocr_text)
+
     def extract_with_llm(self, ocr_text: str) -> Dict:
         """Extrait les données avec LangChain + LLM"""
         print(f"🤖 Extraction avec {self.provider}/{self.model_name}...")
 
         try:
-            # Construire la chaîne LangChain
-            prompt = self._build_prompt_template()
-            chain = prompt | self.llm | self.parser
+            cache_key = None
+            if self.llm_cache is not None:
+                cache_key = self._llm_cache_key(ocr_text)
+                cached = self.llm_cache.get(cache_key)
+                if cached is not None:
+                    print("♻️  Extraction retrouvée dans le cache")
+                    return self.normalize_address(json.loads(cached))
+
+            duplicate = self.find_duplicate(ocr_text)
+            if duplicate is not None:
+                if cache_key is not None:
+                    self.llm_cache.set(cache_key, json.dumps(duplicate, ensure_ascii=False))
+                return self.normalize_address(duplicate)
 
             # Exécuter
-            result = chain.invoke({
-                "ocr_text": ocr_text,
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            message = self.llm_chain.invoke({"ocr_text": ocr_text})
+            self.token_usage.record_message(message)
+            result = self._parse_response(message)
+
+            if cache_key is not None:
+                self.llm_cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+            self.remember_extraction(ocr_text, result)
 
             print("✅ Extraction réussie")
-            return result
+            return self.normalize_address(result)
 
         except Exception as e:
             print(f"❌ Erreur lors de l'extraction: {e}")
             raise
 
-    def extract_from_image(self, image_path: Path) -> Dict:
-        """Extrait depuis une image (OCR + LLM)"""
+    def stream_with_llm(self, ocr_text: str,
+                        required_sections: Optional[Collection[str]] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Extrait en streaming : produit (section, valeur) dès qu'une section de
+        DemandeDevisData est complète dans la réponse du LLM.
+
+        Avec `required_sections` (par exemple REQUIRED_SECTIONS), le flux est
+        fermé dès que ces sections sont reçues. Sortir de la boucle ferme
+        aussi le flux du provider.
+        """
+        cache_key = None
+        if self.llm_cache is not None:
+            cache_key = self._llm_cache_key(ocr_text)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                yield from self.normalize_address(json.loads(cached)).items()
+                return
+
+        duplicate = self.find_duplicate(ocr_text)
+        if duplicate is not None:
+            yield from self.normalize_address(duplicate).items()
+            return
+
+        stream = self.llm_chain.stream({"ocr_text": ocr_text})
+        # Les modèles de chat produisent des AIMessageChunk, les LLM texte des str
+        chunks = (getattr(chunk, "content", chunk) for chunk in stream)
+        result = {}
+        try:
+            for section, value in iter_json_members(chunks, required=required_sections):
+                result[section] = value
+                if section == "bien" and isinstance(value, dict):
+                    # Copie : le cache LLM garde l'extraction brute
+                    value = self.normalize_address({"bien": dict(value)})["bien"]
+                yield section, value
+        finally:
+            stream.close()
+
+        if not required_sections:
+            if cache_key is not None:
+                self.llm_cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+            self.remember_extraction(ocr_text, result)
+
+    def find_duplicate(self, ocr_text: str) -> Optional[Dict]:
+        """Extraction d'une demande déjà traitée (relance ou rescan), sans appel au LLM"""
+        if self.dedup_index is None:
+            return None
+        duplicate = self.dedup_index.find(ocr_text, scope=self.dedup_scope)
+        if duplicate is None:
+            return None
+        if duplicate.reason == "numero":
+            print(f"♻️  Demande N° {duplicate.numero} déjà extraite (relance)")
+        else:
+            print(f"♻️  Quasi-doublon d'une demande déjà extraite (similarité {duplicate.similarity:.0%})")
+        return duplicate.extraction
+
+    def remember_extraction(self, ocr_text: str, result: Dict):
+        """Enregistre une extraction du LLM dans l'index des doublons"""
+        if self.dedup_index is not None and isinstance(result, dict):
+            self.dedup_index.add(ocr_text, json.dumps(result, ensure_ascii=False),
+                                 result.get("numero_demande"), scope=self.dedup_scope)
+
+    def normalize_address(self, result: Dict) -> Dict:
+        """
+        Ajoute bien.geocodage (adresse normalisée, coordonnées) depuis l'index
+        d'adresses local, sans appel à un géocodeur distant
+        """
+        bien = result.get("bien") if isinstance(result, dict) else None
+        if self.address_index is None or not isinstance(bien, dict):
+            return result
+        try:
+            match = self.address_index.lookup_bien(bien)
+        except Exception as e:
+            # Le géocodage est un complément : il ne doit jamais faire perdre l'extraction
+            print(f"⚠️  Géocodage de l'adresse impossible: {e}")
+            return result
+        if match is not None:
+            bien["geocodage"] = match.to_dict()
+        return result
+
+    def _batch_params(self, ocr_text: str) -> Dict[str, Any]:
+        """Paramètres Anthropic `messages.create` équivalents à la chaîne LangChain"""
+        messages = self.prompt.format_messages(ocr_text=ocr_text)
+        model_config = self.prompt_config.get('model_config', {})
+        return {
+            "model": self.model_name,
+            "max_tokens": model_config.get('max_tokens', 2000),
+            "temperature": model_config.get('temperature', 0.1),
+            "system": [
+                block
+                for m in messages if m.type == "system"
+                for block in (m.content if isinstance(m.content, list) else [cacheable_text_block(m.content)])
+            ],
+            "messages": [
+                {"role": "user" if m.type == "human" else "assistant", "content": m.content}
+                for m in messages if m.type != "system"
+            ],
+        }
+
+    def extract_batch_api(self, image_paths: List[Path],
+                          requests_path: Optional[Path] = None,
+                          poll_interval: float = DEFAULT_POLL_INTERVAL,
+                          timeout: Optional[float] = None,
+                          batch_ids: Optional[List[str]] = None,
+                          concurrency: int = 4) -> List[BatchItemResult]:
+        """
+        Extrait un lot d'images via l'API Message Batches d'Anthropic.
+
+        L'OCR est exécuté localement, les textes déjà en cache LLM ne sont pas
+        soumis, puis les réponses du lot sont rattachées aux images sources.
+        Avec `batch_ids`, on reprend des lots déjà soumis.
+        """
+        if self.provider != "anthropic":
+            raise ValueError("Le mode --batch-api n'est disponible qu'avec le provider anthropic")
+
+        results: List[Optional[BatchItemResult]] = [None] * len(image_paths)
+        requests: List[BatchRequest] = []
+        # Réponses rattachées par fichier source : à la reprise d'un lot, les
+        # custom_id sont ceux de la soumission, pas ceux de la liste courante
+        pending: Dict[str, Tuple[int, Optional[str], str]] = {}
+
+        print(f"🔍 OCR de {len(image_paths)} image(s)...")
+        for item in run_concurrent(image_paths, self.ocr_function, concurrency=concurrency):
+            if not item.ok:
+                results[item.index] = item
+                continue
+            ocr_text = item.extracted
+            cache_key = None
+            if self.llm_cache is not None:
+                cache_key = self._llm_cache_key(ocr_text)
+                cached = self.llm_cache.get(cache_key)
+                if cached is not None:
+                    results[item.index] = BatchItemResult(item.index, item.source,
+                                                          self.normalize_address(json.loads(cached)),
+                                                          duration=item.duration)
+                    continue
+            duplicate = self.find_duplicate(ocr_text)
+            if duplicate is not None:
+                results[item.index] = BatchItemResult(item.index, item.source, self.normalize_address(duplicate),
+                                                      duration=item.duration)
+                continue
+            requests.append(BatchRequest(make_custom_id(item.index), item.source, self._batch_params(ocr_text)))
+            pending[item.source] = (item.index, cache_key, ocr_text)
+
+        async def run_batch():
+            import anthropic
+            client = anthropic.AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+            try:
+                runner = MessageBatchRunner(client, poll_interval=poll_interval, timeout=timeout)
+                return await runner.run(requests, requests_path=requests_path, batch_ids=batch_ids)
+            finally:
+                await client.close()
+
+        outcomes = asyncio.run(run_batch()) if requests else []
+        for outcome in outcomes:
+            self.token_usage.record(outcome.usage)
+            if outcome.source not in pending:
+                continue  # Fichier soumis mais absent de cette liste (déjà traité ou retiré)
+            index, cache_key, ocr_text = pending.pop(outcome.source)
+            if outcome.ok:
+                try:
+                    extracted = self._parse_response(outcome.text)
+                except Exception as e:
+                    results[index] = BatchItemResult(index, outcome.source, error=str(e))
+                    continue
+                if cache_key is not None:
+                    self.llm_cache.set(cache_key, json.dumps(extracted, ensure_ascii=False))
+                self.remember_extraction(ocr_text, extracted)
+                results[index] = BatchItemResult(index, outcome.source, self.normalize_address(extracted))
+            else:
+                results[index] = BatchItemResult(index, outcome.source, error=outcome.error)
+        for source, (index, _, _) in pending.items():
+            results[index] = BatchItemResult(index, source, error="absent des lots repris")
+
+        return results
+
+    @property
+    def ocr_function(self):
+        """Fonction OCR sérialisable (pour un pool de processus)"""
+        return functools.partial(image_to_text, lang=self.ocr_language, config=self.ocr_config,
+                                 cache=self.ocr_cache)
+
+    def ocr_image(self, image_path: Path) -> str:
+        """Extrait le texte d'une image avec Tesseract"""
         if not OCR_AVAILABLE:
             raise RuntimeError("Tesseract non disponible. Installez avec: pip install pytesseract pillow")
 
         print(f"📷 Lecture de l'image: {image_path}")
-        image = Image.open(image_path)
-
         print("🔍 Extraction OCR avec Tesseract...")
-        ocr_text = pytesseract.image_to_string(image, lang='fra')
+        ocr_text = self.ocr_function(image_path)
 
         print(f"📄 Texte OCR extrait ({len(ocr_text)} caractères)")
         if len(ocr_text) < 50:
             print("⚠️  Attention: Texte OCR très court, vérifiez que Tesseract est correctement configuré")
 
-        return self.extract_with_llm(ocr_text)
+        return ocr_text
+
+    def extract_from_image(self, image_path: Path) -> Dict:
+        """Extrait depuis une image (OCR + LLM)"""
+        return self.extract_with_llm(self.ocr_image(image_path))
 
     def extract_from_text(self, text: str) -> Dict:
         """Extrait depuis un texte déjà extrait"""
@@ -406,6 +692,21 @@ Exemples d'utilisation:
   # Traitement par lot
   python extract_demande_devis.py -b ./dossier_devis/ --provider groq -o results.json
 
+  # Traitement par lot avec 8 appels LLM simultanés
+  python extract_demande_devis.py -b ./dossier_devis/ --provider groq --concurrency 8
+
+  # Pipeline OCR (4 processus Tesseract) / LLM (8 appels simultanés)
+  python extract_demande_devis.py -b ./dossier_devis/ --provider groq --concurrency 8 --ocr-workers 4
+
+  # Gros lot : un résultat par ligne dès qu'il est prêt, JSON agrégé reconstruit à la fin
+  python extract_demande_devis.py -b ./dossier_devis/ --provider groq --output-jsonl results.jsonl -o results.json
+
+  # Relancer un lot interrompu : seuls les documents en échec, nouveaux ou modifiés sont retraités
+  python extract_demande_devis.py -b ./dossier_devis/ --provider groq -o results.json
+
+  # Reprise de nuit via l'API Message Batches (Anthropic, moitié prix)
+  python extract_demande_devis.py -b ./dossier_devis/ --provider anthropic --batch-api -o results.json
+
   # Liste des providers
   python extract_demande_devis.py --list-providers
         """
@@ -414,11 +715,56 @@ Exemples d'utilisation:
     parser.add_argument("--image", "-i", type=Path, help="Chemin vers une image de devis")
     parser.add_argument("--text", "-t", type=str, help="Texte OCR déjà extrait")
     parser.add_argument("--batch", "-b", type=Path, help="Dossier contenant plusieurs images")
+    parser.add_argument("--concurrency", "-c", type=int, default=4,
+                       help="Nombre d'extractions simultanées en mode batch (défaut: 4)")
+    parser.add_argument("--ocr-workers", type=int,
+                       help="Active le pipeline OCR/LLM avec N processus Tesseract en mode batch")
+    parser.add_argument("--queue-size", type=int, default=8,
+                       help="Textes OCR en attente du LLM en mode pipeline (défaut: 8)")
+    parser.add_argument("--batch-api", action="store_true",
+                       help="Soumet le lot via l'API Message Batches (provider anthropic)")
+    parser.add_argument("--batch-requests", type=Path, default=BATCH_REQUESTS_PATH,
+                       help="Fichier JSONL des requêtes soumises (défaut: .cache/batch_requests.jsonl)")
+    parser.add_argument("--batch-id", action="append",
+                       help="Reprend un lot déjà soumis au lieu d'en créer un (répétable)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                       help=f"Intervalle d'interrogation du lot en secondes (défaut: {DEFAULT_POLL_INTERVAL:.0f})")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST_PATH,
+                       help="Manifeste de reprise des lots (défaut: .cache/batch_manifest.sqlite)")
+    parser.add_argument("--no-manifest", action="store_true",
+                       help="Retraite tout le lot sans consulter ni mettre à jour le manifeste")
+    parser.add_argument("--ocr-lang", default=DEFAULT_OCR_LANGUAGE,
+                       help=f"Langue Tesseract (défaut: {DEFAULT_OCR_LANGUAGE})")
+    parser.add_argument("--ocr-config", default=DEFAULT_OCR_CONFIG,
+                       help="Options Tesseract, ex: \"--psm 6\"")
+    parser.add_argument("--ocr-cache", type=Path, default=DEFAULT_OCR_CACHE_PATH,
+                       help="Cache SQLite du texte OCR (défaut: .cache/ocr_text.sqlite)")
+    parser.add_argument("--ocr-cache-max-mb", type=int, default=512,
+                       help="Taille maximale du cache OCR en Mo (éviction LRU, défaut: 512)")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="Désactive le cache OCR")
+    parser.add_argument("--llm-cache", type=Path, default=LLM_CACHE_PATH,
+                       help="Cache SQLite des extractions LLM (défaut: .cache/llm_extractions.sqlite)")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Désactive le cache des extractions LLM")
+    parser.add_argument("--address-index", type=Path, default=DEFAULT_ADDRESS_INDEX_PATH,
+                       help="Index d'adresses local (address_index.py) pour normaliser et géocoder bien.adresse")
+    parser.add_argument("--no-address-index", action="store_true", help="Désactive la normalisation des adresses")
+    parser.add_argument("--dedup-index", type=Path, default=DEFAULT_DEDUP_INDEX_PATH,
+                       help="Index des demandes déjà extraites (défaut: .cache/demandes_traitees.sqlite)")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                       help=f"Similarité à partir de laquelle une demande est un quasi-doublon "
+                            f"(défaut: {DEFAULT_SIMILARITY_THRESHOLD})")
+    parser.add_argument("--no-dedup", action="store_true",
+                       help="Désactive la détection des relances et quasi-doublons")
     parser.add_argument("--provider", "-p", default="ollama",
                        choices=list(PROVIDERS_CONFIG.keys()),
                        help="Provider LLM à utiliser (défaut: ollama)")
     parser.add_argument("--model", "-m", help="Modèle LLM spécifique à utiliser")
     parser.add_argument("--output", "-o", type=Path, help="Fichier de sortie JSON")
+    parser.add_argument("--output-jsonl", type=Path,
+                       help="Écrit chaque résultat sur une ligne dès qu'il est prêt (mémoire constante) ; "
+                            "avec --output, le JSON agrégé est reconstruit depuis ce fichier à la fin")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY,
+                       help=f"Documents entre deux écritures sur disque du JSONL (défaut: {DEFAULT_FLUSH_EVERY})")
     parser.add_argument("--prompt", type=Path, help="Fichier de prompt YAML personnalisé")
     parser.add_argument("--list-providers", action="store_true", help="Lister les providers disponibles")
     parser.add_argument("--verbose", "-v", action="store_true", help="Mode verbeux")
@@ -439,28 +785,51 @@ Exemples d'utilisation:
     # Initialiser l'extracteur
     try:
         prompt_path = args.prompt or PROMPT_PATH
+        ocr_cache = None
+        if not args.no_ocr_cache:
+            ocr_cache = DiskCache(args.ocr_cache, max_bytes=args.ocr_cache_max_mb * 1024 * 1024)
+        llm_cache = None if args.no_llm_cache else DiskCache(args.llm_cache)
+        address_index = None if args.no_address_index else open_address_index(args.address_index)
+        dedup_index = None if args.no_dedup else NearDuplicateIndex(args.dedup_index, threshold=args.dedup_threshold)
         extractor = DemandeDevisExtractor(
             provider=args.provider,
             model=args.model,
-            prompt_path=prompt_path
+            prompt_path=prompt_path,
+            ocr_language=args.ocr_lang,
+            ocr_config=args.ocr_config,
+            ocr_cache=ocr_cache,
+            llm_cache=llm_cache,
+            address_index=address_index,
+            dedup_index=dedup_index
         )
     except Exception as e:
         print(f"❌ Erreur d'initialisation: {e}")
         return 1
 
-    # Traitement
+    # Traitement : résultats en mémoire, ou écrits au fil de l'eau en JSONL
     results = []
+    writer = JSONLWriter(args.output_jsonl, flush_every=args.flush_every) if args.output_jsonl else None
+    geocoded = 0
+
+    def emit(record: Dict[str, Any]):
+        nonlocal geocoded
+        if ((record.get("extracted") or {}).get("bien") or {}).get("geocodage"):
+            geocoded += 1
+        if writer is not None:
+            writer.write(record)
+        else:
+            results.append(record)
 
     try:
         if args.text:
             # Mode texte direct
             result = extractor.extract_from_text(args.text)
-            results.append({"source": "text", "extracted": result})
+            emit({"source": "text", "extracted": result})
 
         elif args.image:
             # Mode image unique
             result = extractor.extract_from_image(args.image)
-            results.append({"source": str(args.image), "extracted": result})
+            emit({"source": str(args.image), "extracted": result})
 
         elif args.batch:
             # Mode batch
@@ -468,22 +837,54 @@ Exemples d'utilisation:
                 print(f"❌ {args.batch} n'est pas un dossier")
                 return 1
 
-            images = list(args.batch.glob("*.jpg")) + \
-                    list(args.batch.glob("*.jpeg")) + \
-                    list(args.batch.glob("*.png"))
-
-            print(f"\n📁 {len(images)} images trouvées dans {args.batch}\n")
-
-            for i, img_path in enumerate(images, 1):
-                print(f"\n{'='*80}")
-                print(f"[{i}/{len(images)}] {img_path.name}")
-                print(f"{'='*80}")
-                try:
-                    result = extractor.extract_from_image(img_path)
-                    results.append({"source": str(img_path), "extracted": result})
-                except Exception as e:
-                    print(f"❌ Erreur: {e}")
-                    results.append({"source": str(img_path), "error": str(e)})
+            images = sorted(list(args.batch.glob("*.jpg")) +
+                            list(args.batch.glob("*.jpeg")) +
+                            list(args.batch.glob("*.png")))
+
+            print(f"\n📁 {len(images)} images trouvées dans {args.batch}")
+            manifest = None
+            if not args.no_manifest:
+                manifest = BatchManifest(args.manifest, job=f"demande_devis:{extractor.provider}:"
+                                                            f"{extractor.model_name}:{extractor.prompt_hash[:12]}")
+                done, images = manifest.partition(images)
+                for img_path, extracted in done:
+                    emit({"source": str(img_path), "extracted": extracted})
+                if done:
+                    print(f"⏭️  {len(done)} document(s) déjà traité(s) d'après le manifeste, "
+                          f"{len(images)} à traiter")
+            stats = BatchStats()
+            if args.batch_api:
+                print(f"📦 API Message Batches (interrogation toutes les {args.poll_interval:.0f}s)\n")
+                batch = extractor.extract_batch_api(images, requests_path=args.batch_requests,
+                                                    poll_interval=args.poll_interval,
+                                                    batch_ids=args.batch_id,
+                                                    concurrency=args.concurrency)
+                for item in batch:
+                    stats.record(item)
+                stats.finish()
+            elif args.ocr_workers:
+                print(f"⚡ Pipeline: {args.ocr_workers} processus OCR → {args.concurrency} appel(s) LLM simultané(s)\n")
+                batch = run_pipeline(images, extractor.ocr_function, extractor.extract_with_llm,
+                                     ocr_workers=args.ocr_workers, llm_workers=args.concurrency,
+                                     queue_size=args.queue_size, stats=stats)
+            else:
+                print(f"⚡ Concurrence: {args.concurrency} extraction(s) simultanée(s)\n")
+                batch = run_concurrent(images, extractor.extract_from_image,
+                                       concurrency=args.concurrency, stats=stats)
+
+            for item in batch:
+                img_path = images[item.index]
+                if item.ok:
+                    print(f"[{item.index + 1}/{len(images)}] ✅ {img_path.name} ({item.duration:.1f}s)")
+                    emit({"source": str(img_path), "extracted": item.extracted})
+                else:
+                    print(f"[{item.index + 1}/{len(images)}] ❌ {img_path.name}: {item.error}")
+                    emit({"source": str(img_path), "error": item.error})
+                if manifest is not None:
+                    manifest.record(img_path, item.extracted, item.error)
+
+            print(f"\n⏱️  {stats.total} documents en {stats.elapsed:.1f}s "
+                  f"({stats.docs_per_minute:.1f} docs/min)")
 
         # Afficher résultats
         print("\n" + "="*80)
@@ -499,12 +900,35 @@ Exemples d'utilisation:
                 if args.verbose:
                     print(json.dumps(result['extracted'], ensure_ascii=False, indent=2))
 
+        if writer is not None:
+            writer.close()
+            print(f"\n📝 {writer.written} résultat(s) écrits au fil de l'eau dans {args.output_jsonl}")
+            succeeded, total = writer.succeeded, writer.written
+        else:
+            succeeded, total = len([r for r in results if 'error' not in r]), len(results)
+
         print("\n" + "="*80)
-        print(f"📈 Résumé: {len([r for r in results if 'error' not in r])}/{len(results)} réussis")
+        print(f"📈 Résumé: {succeeded}/{total} réussis")
+        if llm_cache is not None:
+            print(f"♻️  Cache LLM: {llm_cache.hits} hit(s), {llm_cache.misses} miss(es) "
+                  f"({llm_cache.hit_rate:.0%})")
+        if dedup_index is not None and dedup_index.hits:
+            print(f"🧬 Doublons: {dedup_index.numero_hits} relance(s) (même numéro), "
+                  f"{dedup_index.similar_hits} quasi-doublon(s) — appel(s) LLM évité(s)")
+        if address_index is not None:
+            info = address_index.cache_info()
+            print(f"🏠 Adresses: {geocoded} normalisée(s) hors ligne, cache {info.hits} hit(s) / {info.misses} miss(es)")
+        if extractor.token_usage.calls:
+            print(f"🧮 Tokens: {extractor.token_usage.summary()}")
+        if extractor.repair_stats.repaired or extractor.repair_stats.failed:
+            print(f"🩹 JSON: {extractor.repair_stats.summary()}")
         print("="*80)
 
         # Sauvegarder si demandé
-        if args.output:
+        if args.output and writer is not None:
+            jsonl_to_json(args.output_jsonl, args.output)
+            print(f"\n💾 Résultats agrégés depuis {args.output_jsonl} dans {args.output}")
+        elif args.output:
             with open(args.output, 'w', encoding='utf-8') as f:
                 json.dump(results, f, ensure_ascii=False, indent=2)
             print(f"\n💾 Résultats sauvegardés dans {args.output}")
@@ -513,11 +937,17 @@ Exemples d'utilisation:
 
     except Exception as e:
         print(f"\n❌ Erreur fatale: {e}")
+        if writer is not None:
+            print(f"📝 {writer.written} résultat(s) déjà écrits dans {args.output_jsonl}")
         if args.verbose:
             import traceback
             traceback.print_exc()
         return 1
 
+    finally:
+        if writer is not None:
+            writer.close()
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Matching approché de mots-clés dans un texte long
+
+Remplace `difflib.SequenceMatcher(texte_entier, mot_cle)`, lent et sans
+signification sur un texte de plusieurs centaines de caractères : chaque
+mot-clé est comparé aux fenêtres de mots du texte ayant le même nombre de
+mots, et le meilleur passage est retourné avec sa position.
+
+- index des trigrammes des mots-clés construit une seule fois ;
+- préfiltres bon marché : écart de longueur puis nombre de trigrammes
+  communs (une édition détruit au plus 3 trigrammes) ;
+- distance d'édition bornée (Levenshtein en bande diagonale, avec abandon
+  anticipé) pour les seuls candidats restants ;
+- résultats mémorisés par fenêtre de mots, qui se répètent d'un document à
+  l'autre ;
+- score_matrix (numpy) : tout un corpus à la fois, trigrammes communs
+  comptés par un produit de matrices creuses fenêtres × mots-clés.
+
+Score = 1 - distance / longueur max, 0 au-delà de la distance autorisée
+(aucune édition sous 5 lettres, une seule sous 8).
+"""
+
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_MIN_SCORE = 0.75
+# Mots-clés courts : distance d'édition autorisée limitée par la longueur
+# ('sous' ne doit pas valoir 'souris', ni 'roulant' valoir 'courant')
+EXACT_BELOW_LENGTH = 5  # En dessous : aucune édition
+ONE_EDIT_BELOW_LENGTH = 8  # En dessous : une seule édition
+WINDOW_CACHE_SIZE = 100_000
+SCORE_MATRIX_CHUNK = 2048  # Textes traités ensemble par score_matrix
+
+# L'apostrophe sépare les mots : "d'electricite" donne "d" et "electricite"
+_TOKEN = re.compile(r"\w+")
+
+
+@dataclass
+class FuzzyMatch:
+    """Meilleur passage du texte pour un mot-clé"""
+    label: Hashable
+    keyword: str
+    score: float
+    start: int
+    end: int
+    span: str
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrammes d'une chaîne bordée d'espaces (un mot de n lettres en a n)"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Distance d'édition, ou max_distance + 1 dès qu'elle est dépassée.
+
+    Seule la bande diagonale |i - j| <= max_distance est calculée.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) < len(b):
+        a, b = b, a
+    beyond = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        current = [beyond] * (len(b) + 1)
+        current[0] = i if i <= max_distance else beyond
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return beyond
+        previous = current
+    return min(previous[-1], beyond)
+
+
+def _char_codes(strings: Sequence[str]) -> "np.ndarray":
+    """Tableau (chaînes × longueur max) des points de code, complété par des 0"""
+    width = max(1, max((len(string) for string in strings), default=1))
+    return np.array(strings, dtype=f"U{width}").view(np.uint32).reshape(len(strings), width)
+
+
+def levenshtein_many(a: "np.ndarray", a_lengths: "np.ndarray",
+                     b: "np.ndarray", b_lengths: "np.ndarray") -> "np.ndarray":
+    """
+    Distances d'édition de paires de chaînes (points de code, voir _char_codes)
+
+    Les paires sont groupées par longueur de la première chaîne ; dans un
+    groupe, chaque ligne de la programmation dynamique est calculée pour
+    toutes les paires à la fois, les insertions se ramenant à un minimum
+    cumulé le long de la ligne.
+    """
+    distances = np.empty(len(a_lengths), dtype=np.int64)
+    for length in np.unique(a_lengths).tolist():
+        group = np.flatnonzero(a_lengths == length)
+        width = int(b_lengths[group].max())
+        left, right = a[group, :length], b[group, :width]
+        columns = np.arange(width + 1, dtype=np.int16)
+        row = np.broadcast_to(columns, (len(group), width + 1)).copy()
+        for i in range(1, length + 1):
+            substitution = row[:, :-1] + (left[:, i - 1:i] != right)
+            row[:, 1:] = np.minimum(substitution, row[:, 1:] + 1)
+            row[:, 0] = i
+            row = np.minimum.accumulate(row - columns, axis=1) + columns
+        distances[group] = row[np.arange(len(group)), b_lengths[group]]
+    return distances
+
+
+class FuzzyKeywordMatcher:
+    """Index de trigrammes de mots-clés étiquetés, interrogeable sur des textes longs"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Hashable]], min_score: float = DEFAULT_MIN_SCORE):
+        self.min_score = min_score
+        self._keywords: List[Tuple[str, Hashable, int]] = []
+        # Index par nombre de mots : trigramme -> identifiants de mots-clés
+        self._index: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        self._trigram_counts: List[int] = []
+        # Fenêtre de texte -> candidats : les mots d'un corpus se répètent
+        self._window_cache: Dict[Tuple[int, str], List[Tuple[int, float]]] = {}
+
+        seen = set()
+        for keyword, label in keywords:
+            normalized = " ".join(_TOKEN.findall(keyword))
+            if not normalized or (normalized, label) in seen:
+                continue
+            seen.add((normalized, label))
+            keyword_id = len(self._keywords)
+            size = normalized.count(" ") + 1
+            grams = trigrams(normalized)
+            self._keywords.append((normalized, label, self.max_distance(normalized)))
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._index[size][gram].append(keyword_id)
+        # Dictionnaires simples : l'index reste sérialisable (pool de processus)
+        self._index = {size: dict(grams) for size, grams in self._index.items()}
+        self._keyword_matrix = None
+
+    def max_distance(self, keyword: str) -> int:
+        """Distance d'édition maximale : celle de `min_score`, bornée pour les mots-clés courts"""
+        if len(keyword) < EXACT_BELOW_LENGTH:
+            return 0
+        if len(keyword) < ONE_EDIT_BELOW_LENGTH:
+            return 1
+        return int(len(keyword) * (1 - self.min_score))
+
+    def _score_window(self, size: int, window: str) -> List[Tuple[int, float]]:
+        """Mots-clés de `size` mots proches de la fenêtre, avec leur score"""
+        candidates = self._window_cache.get((size, window))
+        if candidates is not None:
+            return candidates
+
+        shared = Counter(
+            keyword_id
+            for gram in trigrams(window)
+            for keyword_id in self._index[size].get(gram, ())
+        )
+        candidates = []
+        for keyword_id, common in shared.items():
+            keyword, _, max_distance = self._keywords[keyword_id]
+            # Préfiltres : écart de longueur, puis trigrammes communs
+            if abs(len(window) - len(keyword)) > max_distance:
+                continue
+            if common < self._trigram_counts[keyword_id] - 3 * max_distance:
+                continue
+            distance = bounded_levenshtein(window, keyword, max_distance)
+            if distance <= max_distance:
+                candidates.append((keyword_id, 1 - distance / max(len(window), len(keyword))))
+
+        if len(self._window_cache) >= WINDOW_CACHE_SIZE:
+            self._window_cache.clear()
+        self._window_cache[(size, window)] = candidates
+        return candidates
+
+    def best_matches(self, text: str,
+                     exclude: Optional[Set[Hashable]] = None) -> Dict[Hashable, FuzzyMatch]:
+        """Meilleur passage par étiquette (score >= min_score), hors étiquettes `exclude`"""
+        exclude = exclude or set()
+        tokens = [(m.group(), m.start(), m.end()) for m in _TOKEN.finditer(text)]
+        best: Dict[Hashable, FuzzyMatch] = {}
+
+        for size in self._index:
+            for i in range(len(tokens) - size + 1):
+                window = " ".join(token for token, _, _ in tokens[i:i + size])
+                for keyword_id, score in self._score_window(size, window):
+                    keyword, label, _ = self._keywords[keyword_id]
+                    if score < self.min_score or label in exclude:
+                        continue
+                    current = best.get(label)
+                    if current is None or score > current.score:
+                        start, end = tokens[i][1], tokens[i + size - 1][2]
+                        best[label] = FuzzyMatch(label, keyword, score, start, end, text[start:end])
+        return best
+
+    def best_match(self, text: str, label: Hashable) -> Optional[FuzzyMatch]:
+        """Meilleur passage pour une seule étiquette"""
+        return self.best_matches(text).get(label)
+
+    def _build_keyword_matrix(self):
+        """Matrice creuse trigrammes × mots-clés (CSR) et attributs des mots-clés"""
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for grams in self._index.values():
+            for gram, keyword_ids in grams.items():
+                postings[gram].extend(keyword_ids)
+        gram_ids = {gram: i for i, gram in enumerate(postings)}
+        indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(ids) for ids in postings.values()])
+        indices = np.fromiter((k for ids in postings.values() for k in ids), dtype=np.int64, count=indptr[-1])
+        keywords = self._keywords
+        return {
+            'gram_ids': gram_ids,
+            'indptr': indptr,
+            'indices': indices,
+            'size': np.array([keyword.count(" ") + 1 for keyword, _, _ in keywords]),
+            'length': np.array([len(keyword) for keyword, _, _ in keywords]),
+            'max_distance': np.array([max_distance for _, _, max_distance in keywords]),
+            'trigrams': np.array(self._trigram_counts),
+            'codes': _char_codes([keyword for keyword, _, _ in keywords]),
+        }
+
+    def _window_scores(self, windows: List[Tuple[int, str]], column: Dict[Hashable, int]) -> "np.ndarray":
+        """Meilleur score par (fenêtre, étiquette) pour des fenêtres distinctes"""
+        if self._keyword_matrix is None:
+            self._keyword_matrix = self._build_keyword_matrix()
+        matrix = self._keyword_matrix
+        gram_ids, indptr = matrix['gram_ids'], matrix['indptr']
+        scores = np.zeros((len(windows), len(column)))
+
+        # Matrice creuse fenêtres × trigrammes (COO)
+        window_grams = [[gram_ids[gram] for gram in trigrams(window) if gram in gram_ids]
+                        for _, window in windows]
+        cols = np.fromiter(chain.from_iterable(window_grams), dtype=np.int64)
+        if not len(cols):
+            return scores
+        rows = np.repeat(np.arange(len(windows)), [len(grams) for grams in window_grams])
+
+        # Produit fenêtres × trigrammes × mots-clés : chaque entrée se
+        # déploie sur la ligne du trigramme, puis les paires sont comptées
+        counts = indptr[cols + 1] - indptr[cols]
+        starts = np.repeat(indptr[cols] - (np.cumsum(counts) - counts), counts)
+        keyword_ids = matrix['indices'][starts + np.arange(counts.sum())]
+        n_keywords = len(self._keywords)
+        pairs, shared = np.unique(np.repeat(rows, counts) * n_keywords + keyword_ids, return_counts=True)
+        window_ids, keyword_ids = pairs // n_keywords, pairs % n_keywords
+
+        # Préfiltres de best_matches, vectorisés : même nombre de mots,
+        # écart de longueur, trigrammes communs
+        sizes = np.array([size for size, _ in windows])
+        lengths = np.array([len(window) for _, window in windows])
+        max_distance = matrix['max_distance'][keyword_ids]
+        keep = ((sizes[window_ids] == matrix['size'][keyword_ids])
+                & (np.abs(lengths[window_ids] - matrix['length'][keyword_ids]) <= max_distance)
+                & (shared >= matrix['trigrams'][keyword_ids] - 3 * max_distance))
+
+        # Distance d'édition pour les seules paires restantes, toutes à la fois
+        label_column = np.array([column.get(label, -1) for _, label, _ in self._keywords])
+        keep &= label_column[keyword_ids] >= 0
+        window_ids, keyword_ids = window_ids[keep], keyword_ids[keep]
+        if not len(window_ids):
+            return scores
+        window_codes = _char_codes([windows[window_id][1] for window_id in window_ids.tolist()])
+        keyword_lengths = matrix['length'][keyword_ids]
+        distances = levenshtein_many(window_codes, lengths[window_ids],
+                                     matrix['codes'][keyword_ids], keyword_lengths)
+        pair_scores = 1 - distances / np.maximum(lengths[window_ids], keyword_lengths)
+        close = (distances <= matrix['max_distance'][keyword_ids]) & (pair_scores >= self.min_score)
+        np.maximum.at(scores, (window_ids[close], label_column[keyword_ids[close]]), pair_scores[close])
+        return scores
+
+    def score_matrix(self, texts: Sequence[str], labels: Sequence[Hashable]) -> "np.ndarray":
+        """
+        Meilleur score approché de chaque étiquette dans chaque texte
+
+        Tableau (textes × étiquettes), 0 sous min_score : mêmes scores que
+        best_matches, calculés pour tout le corpus à la fois (fenêtres
+        distinctes mises en commun, préfiltres vectorisés).
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy est requis pour score_matrix (pip install numpy)")
+        column = {label: j for j, label in enumerate(labels)}
+        result = np.zeros((len(texts), len(labels)))
+
+        for offset in range(0, len(texts), SCORE_MATRIX_CHUNK):
+            # Fenêtres distinctes du lot, et fenêtres de chaque texte
+            window_ids: Dict[Tuple[int, str], int] = {}
+            text_of, window_of = [], []
+            for i, text in enumerate(texts[offset:offset + SCORE_MATRIX_CHUNK], offset):
+                words = _TOKEN.findall(text)
+                for size in self._index:
+                    for start in range(len(words) - size + 1):
+                        window = (size, " ".join(words[start:start + size]))
+                        text_of.append(i)
+                        window_of.append(window_ids.setdefault(window, len(window_ids)))
+            if not window_ids:
+                continue
+
+            scores = self._window_scores(list(window_ids), column)
+            # Maximum par texte, sur les seules fenêtres ayant un score
+            text_of, window_of = np.array(text_of), np.array(window_of)
+            hit = scores.any(axis=1)[window_of]
+            np.maximum.at(result, text_of[hit], scores[window_of[hit]])
+        return result
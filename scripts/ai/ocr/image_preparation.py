@@ -0,0 +1,179 @@
+"""
+Préparation des images avant envoi à un LLM multimodal
+
+Les photos de téléphone (8-12 Mo) sont décodées, éventuellement recadrées et
+passées en niveaux de gris, réduites à un budget de pixels puis ré-encodées
+dans le format le plus compact. On mesure les octets envoyés et les tokens
+image économisés.
+"""
+
+import io
+import math
+import threading
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from PIL import Image, ImageChops, ImageOps
+
+# Au-delà de ~1,15 mégapixel, l'API Anthropic redimensionne elle-même l'image
+DEFAULT_MAX_PIXELS = 1_150_000
+API_MAX_PIXELS = 1_150_000
+API_MAX_EDGE = 1568
+PIXELS_PER_TOKEN = 750
+
+DEFAULT_FORMATS = ("JPEG", "WEBP", "PNG")
+MEDIA_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Tokens image facturés (après le redimensionnement appliqué par l'API)"""
+    scale = min(1.0, API_MAX_EDGE / max(width, height, 1),
+                math.sqrt(API_MAX_PIXELS / max(width * height, 1)))
+    return math.ceil(int(width * scale) * int(height * scale) / PIXELS_PER_TOKEN)
+
+
+@dataclass
+class PreparedImage:
+    """Image prête à l'envoi, avec les métriques avant/après"""
+    data: bytes
+    media_type: str
+    width: int
+    height: int
+    original_bytes: int
+    original_width: int
+    original_height: int
+
+    @property
+    def upload_bytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.upload_bytes
+
+    @property
+    def tokens(self) -> int:
+        return estimate_image_tokens(self.width, self.height)
+
+    @property
+    def original_tokens(self) -> int:
+        return estimate_image_tokens(self.original_width, self.original_height)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+class PreparationStats:
+    """Cumul des octets et tokens économisés sur un lot (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.original_bytes = 0
+        self.upload_bytes = 0
+        self.original_tokens = 0
+        self.tokens = 0
+
+    def record(self, prepared: PreparedImage):
+        with self._lock:
+            self.images += 1
+            self.original_bytes += prepared.original_bytes
+            self.upload_bytes += prepared.upload_bytes
+            self.original_tokens += prepared.original_tokens
+            self.tokens += prepared.tokens
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.upload_bytes
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+    def summary(self) -> str:
+        if not self.images:
+            return "aucune image préparée"
+        return (f"{self.images} image(s): {self.original_bytes / 1e6:.1f} Mo → {self.upload_bytes / 1e6:.1f} Mo, "
+                f"{self.original_tokens} → {self.tokens} tokens image")
+
+
+def _autocrop(image: Image.Image, threshold: int = 16) -> Image.Image:
+    """Supprime les marges uniformes (fond blanc d'un scan, bord de table d'une photo)"""
+    gray = image.convert("L")
+    background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    diff = ImageChops.difference(gray, background).point(lambda p: 255 if p > threshold else 0)
+    bbox = diff.getbbox()
+    return image.crop(bbox) if bbox else image
+
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def prepare_image(image_data: bytes,
+                  max_pixels: int = DEFAULT_MAX_PIXELS,
+                  crop: Optional[Tuple[int, int, int, int]] = None,
+                  autocrop: bool = False,
+                  grayscale: bool = False,
+                  quality: int = 85,
+                  formats: Sequence[str] = DEFAULT_FORMATS) -> PreparedImage:
+    """
+    Décode, recadre, réduit et ré-encode une image.
+
+    - `crop` : boîte (gauche, haut, droite, bas) en pixels de l'image d'origine
+    - `autocrop` : supprime les marges uniformes
+    - `max_pixels` : budget de pixels (largeur x hauteur) après réduction
+    - `formats` : encodages essayés, le plus compact est retenu
+    """
+    with Image.open(io.BytesIO(image_data)) as source:
+        original_width, original_height = source.size
+        image = ImageOps.exif_transpose(source)
+
+        if crop is not None:
+            image = image.crop(crop)
+        if autocrop:
+            image = _autocrop(image)
+
+        image = image.convert("L") if grayscale else image.convert("RGB")
+
+        pixels = image.width * image.height
+        if max_pixels and pixels > max_pixels:
+            scale = math.sqrt(max_pixels / pixels)
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        candidates = []
+        for fmt in formats:
+            try:
+                candidates.append((fmt, _encode(image, fmt, quality)))
+            except (OSError, KeyError):
+                continue  # encodeur absent de cette build de Pillow
+        fmt, data = min(candidates, key=lambda candidate: len(candidate[1]))
+
+        # L'original reste préférable s'il est déjà plus petit, dans le budget
+        # et sans transformation à appliquer
+        source_format = (source.format or "").upper()
+        untouched = (crop is None and not autocrop and not grayscale
+                     and source.getexif().get(0x0112, 1) == 1
+                     and original_width * original_height <= max_pixels)
+        if untouched and source_format in MEDIA_TYPES and len(image_data) <= len(data):
+            fmt, data = source_format, image_data
+            width, height = original_width, original_height
+        else:
+            width, height = image.size
+
+    return PreparedImage(
+        data=data,
+        media_type=MEDIA_TYPES[fmt],
+        width=width,
+        height=height,
+        original_bytes=len(image_data),
+        original_width=original_width,
+        original_height=original_height,
+    )
@@ -0,0 +1,157 @@
+"""
+Extraction robuste du JSON d'une réponse LLM et réparation locale
+
+Chemin rapide : l'objet JSON le plus externe est décodé en une passe par le
+décodeur C de la bibliothèque standard (`raw_decode`) à partir de la première
+accolade, ce qui ignore la prose et les balises ```json autour.
+
+Si ce décodage échoue, une seconde passe réécrit le fragment en corrigeant
+les défauts les plus fréquents des modèles : virgules finales, chaînes entre
+apostrophes, True/False/None, retours à la ligne dans les chaînes, réponse
+tronquée (chaîne, membre et accolades fermantes manquants). Chaque réparation
+réussie évite de relancer l'appel au LLM.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+_DECODER = json.JSONDecoder()
+
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+# Membre tronqué en fin de fragment : `, "cle":` ou `, "cle"` (position de clé)
+_DANGLING_VALUE = re.compile(r'(?:,\s*|(?<=\{)\s*)"(?:[^"\\]|\\.)*"\s*:\s*$')
+_DANGLING_KEY = re.compile(r'(?:,\s*|(?<=\{)\s*)"(?:[^"\\]|\\.)*"\s*$')
+
+
+class RepairStats:
+    """Compteurs de décodage : direct, réparé (appel LLM évité), échoué (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    @property
+    def round_trips_avoided(self) -> int:
+        return self.repaired
+
+    def summary(self) -> str:
+        return (f"{self.parsed} JSON direct(s), {self.repaired} réparé(s) localement "
+                f"(appel LLM évité), {self.failed} échec(s)")
+
+
+def _strip_trailing_comma(out: List[str]):
+    """Retire une virgule finale (hors espaces) avant un crochet fermant"""
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ',':
+        del out[i]
+
+
+def repair_json(fragment: str) -> str:
+    """Réécrit un fragment JSON mal formé en une passe"""
+    out: List[str] = []
+    closers: List[str] = []
+    quote: Optional[str] = None
+    i, n = 0, len(fragment)
+
+    while i < n:
+        char = fragment[i]
+
+        if quote is not None:
+            if char == '\\' and i + 1 < n:
+                escaped = fragment[i + 1]
+                # \' n'est pas un échappement JSON valide
+                out.append("'" if escaped == "'" else char + escaped)
+                i += 2
+                continue
+            if char == quote:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')
+            elif char == '\n':
+                out.append('\\n')
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char in '"\'':
+            quote = char
+            out.append('"')
+        elif char in '{[':
+            closers.append('}' if char == '{' else ']')
+            out.append(char)
+        elif char in '}]':
+            _strip_trailing_comma(out)
+            if closers:
+                closers.pop()
+            out.append(char)
+            if not closers:
+                break
+        elif char.isalpha():
+            end = i
+            while end < n and fragment[end].isalpha():
+                end += 1
+            word = fragment[i:end]
+            out.append(_PYTHON_LITERALS.get(word, word))
+            i = end
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    # Réponse tronquée : fermer la chaîne, retirer le membre incomplet, fermer les accolades
+    if quote is not None:
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    if closers:
+        if closers[-1] == '}':
+            repaired = _DANGLING_VALUE.sub('', repaired)
+            repaired = _DANGLING_KEY.sub('', repaired)
+        repaired = repaired.rstrip().rstrip(',')
+        repaired += "".join(reversed(closers))
+    return repaired
+
+
+def parse_llm_json(text: str, stats: Optional[RepairStats] = None) -> Dict[str, Any]:
+    """
+    Retourne l'objet JSON le plus externe de `text`.
+
+    Essaie d'abord un décodage direct, puis une réparation locale. Lève
+    ValueError si aucun objet n'est récupérable.
+    """
+    start = text.find('{')
+    if start < 0:
+        if stats is not None:
+            stats.record("failed")
+        raise ValueError("Aucun objet JSON dans la réponse")
+
+    try:
+        result, _ = _DECODER.raw_decode(text, start)
+        if stats is not None:
+            stats.record("parsed")
+        return result
+    except json.JSONDecodeError as e:
+        error = e
+
+    try:
+        result = json.loads(repair_json(text[start:]))
+    except json.JSONDecodeError:
+        if stats is not None:
+            stats.record("failed")
+        raise ValueError(f"JSON invalide et non réparable: {error}") from error
+
+    if stats is not None:
+        stats.record("repaired")
+    return result
@@ -0,0 +1,103 @@
+"""
+Sortie JSONL au fil de l'eau pour les traitements par lot
+
+Chaque document terminé est écrit sur une ligne JSON, sans garder les
+résultats en mémoire : un arrêt au document 900 sur 1000 conserve les 899
+premiers, et la mémoire ne dépend plus de la taille du lot.
+
+- le fichier est vidé sur disque tous les `flush_every` documents et au
+  plus tard toutes les `flush_interval` secondes ;
+- une dernière ligne tronquée (arrêt brutal pendant l'écriture) est
+  ignorée à la relecture ;
+- jsonl_to_json reconstruit, en flux, le JSON agrégé historique
+  (identique à json.dump(results, indent=2)).
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Union
+
+DEFAULT_FLUSH_EVERY = 10
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+class JSONLWriter:
+    """Écrit un résultat par ligne et le rend durable périodiquement"""
+
+    def __init__(self, path: Union[str, Path], flush_every: int = DEFAULT_FLUSH_EVERY,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, append: bool = False):
+        self.path = Path(path)
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a' if append else 'w', encoding='utf-8')
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self) -> 'JSONLWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record: Dict[str, Any]):
+        """Ajoute un résultat ({source, extracted} ou {source, error})"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.written += 1
+        if "error" in record:
+            self.failed += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Vide le tampon jusqu'au disque (survit à un arrêt du processus)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def succeeded(self) -> int:
+        return self.written - self.failed
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def iter_jsonl(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Relit les résultats un à un ; une dernière ligne incomplète est ignorée"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith("\n"):
+                    raise
+                # Ligne en cours d'écriture lors de l'arrêt : abandonnée
+
+
+def jsonl_to_json(jsonl_path: Union[str, Path], json_path: Union[str, Path], indent: int = 2) -> int:
+    """
+    Écrit le JSON agrégé (liste indentée) à partir du JSONL, en flux ;
+    retourne le nombre de résultats
+    """
+    count = 0
+    pad = " " * indent
+    with open(json_path, 'w', encoding='utf-8') as out:
+        for record in iter_jsonl(jsonl_path):
+            out.write(",\n" if count else "[\n")
+            # split("\n") et non splitlines() : U+2028 et consorts restent dans les chaînes
+            text = json.dumps(record, ensure_ascii=False, indent=indent)
+            out.write("\n".join(pad + line for line in text.split("\n")))
+            count += 1
+        out.write("\n]" if count else "[]")
+    return count
@@ -0,0 +1,89 @@
+"""
+Automate Aho–Corasick pour la recherche simultanée de mots-clés
+
+Tous les mots-clés (avec l'étiquette qui leur est associée, ex: un métier)
+sont compilés une fois en un automate déterministe : une seule passe sur le
+texte suffit ensuite pour trouver toutes les occurrences, chevauchantes
+comprises, quel que soit le nombre de mots-clés.
+"""
+
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, Iterable, Iterator, List, Set, Tuple
+
+
+class KeywordAutomaton:
+    """Recherche multi-motifs en une passe (sous-chaînes, sensible à la casse)"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Hashable]]):
+        transitions: List[Dict[str, int]] = [{}]
+        outputs: List[Set[Hashable]] = [set()]
+        patterns: List[Set[str]] = [set()]
+
+        # Trie des mots-clés
+        for keyword, label in keywords:
+            if not keyword:
+                continue
+            node = 0
+            for char in keyword:
+                child = transitions[node].get(char)
+                if child is None:
+                    child = len(transitions)
+                    transitions[node][char] = child
+                    transitions.append({})
+                    outputs.append(set())
+                    patterns.append(set())
+                node = child
+            outputs[node].add(label)
+            patterns[node].add(keyword)
+
+        # Liens d'échec (parcours en largeur), sorties héritées du suffixe
+        fail = [0] * len(transitions)
+        order = []
+        todo = deque(transitions[0].values())
+        while todo:
+            node = todo.popleft()
+            order.append(node)
+            for char, child in transitions[node].items():
+                state = fail[node]
+                while state and char not in transitions[state]:
+                    state = fail[state]
+                fallback = transitions[state].get(char, 0)
+                fail[child] = fallback if fallback != child else 0
+                outputs[child] |= outputs[fail[child]]
+                patterns[child] |= patterns[fail[child]]
+                todo.append(child)
+
+        # Automate déterministe : chaque état connaît sa transition pour tout
+        # caractère présent dans les mots-clés (les autres ramènent à la racine)
+        delta = [dict(transitions[0])]
+        delta.extend({} for _ in range(len(transitions) - 1))
+        for node in order:
+            delta[node] = {**delta[fail[node]], **transitions[node]}
+
+        self._delta = delta
+        self._outputs: List[FrozenSet[Hashable]] = [frozenset(labels) for labels in outputs]
+        self._patterns: List[FrozenSet[str]] = [frozenset(found) for found in patterns]
+
+    def __len__(self) -> int:
+        """Nombre d'états de l'automate"""
+        return len(self._delta)
+
+    def find_labels(self, text: str) -> Set[Hashable]:
+        """Étiquettes de tous les mots-clés présents dans `text`"""
+        delta, outputs = self._delta, self._outputs
+        found: Set[Hashable] = set()
+        node = 0
+        for char in text:
+            node = delta[node].get(char, 0)
+            if outputs[node]:
+                found |= outputs[node]
+        return found
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Produit (position de début, mot-clé) pour chaque occurrence"""
+        delta, patterns = self._delta, self._patterns
+        node = 0
+        for end, char in enumerate(text):
+            node = delta[node].get(char, 0)
+            for keyword in patterns[node]:
+                yield end - len(keyword) + 1, keyword
@@ -0,0 +1,184 @@
+"""
+Soumission d'extractions via l'API Message Batches d'Anthropic
+
+Pour les reprises de nuit, la latence interactive est inutile : les requêtes
+sont écrites dans un fichier JSONL, soumises en un ou plusieurs lots, puis le
+lot est interrogé jusqu'à la fin du traitement. Les réponses arrivent dans un
+ordre quelconque et sont rattachées aux fichiers sources via `custom_id`.
+
+Un lot est facturé à moitié prix et ne consomme pas la limite de débit des
+appels `messages.create`.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+# Limites de l'API par lot
+MAX_BATCH_REQUESTS = 100_000
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+
+DEFAULT_POLL_INTERVAL = 60.0
+
+
+@dataclass
+class BatchRequest:
+    """Requête d'un lot, rattachée à son fichier source"""
+    custom_id: str
+    source: str
+    params: Dict[str, Any]
+
+    def to_api(self) -> Dict[str, Any]:
+        return {"custom_id": self.custom_id, "params": self.params}
+
+
+@dataclass
+class BatchOutcome:
+    """Réponse d'une requête du lot"""
+    custom_id: str
+    source: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    usage: Optional[Any] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def make_custom_id(index: int) -> str:
+    """Identifiant de requête (1 à 64 caractères [a-zA-Z0-9_-])"""
+    return f"doc-{index:06d}"
+
+
+def write_requests_file(requests: Iterable[BatchRequest], path: Union[str, Path]) -> Path:
+    """Écrit les requêtes au format JSONL (une requête par ligne)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for request in requests:
+            f.write(json.dumps({"custom_id": request.custom_id, "source": request.source,
+                                "params": request.params}, ensure_ascii=False))
+            f.write("\n")
+    return path
+
+
+def read_requests_file(path: Union[str, Path]) -> List[BatchRequest]:
+    """Relit un fichier de requêtes (pour rattacher les résultats d'un lot déjà soumis)"""
+    with open(path, encoding='utf-8') as f:
+        return [BatchRequest(**json.loads(line)) for line in f if line.strip()]
+
+
+def split_requests(requests: Sequence[BatchRequest],
+                   max_requests: int = MAX_BATCH_REQUESTS,
+                   max_bytes: int = MAX_BATCH_BYTES) -> List[List[BatchRequest]]:
+    """Découpe les requêtes en lots respectant les limites de nombre et de taille"""
+    chunks: List[List[BatchRequest]] = []
+    current: List[BatchRequest] = []
+    current_bytes = 0
+    for request in requests:
+        size = len(json.dumps(request.to_api()).encode('utf-8'))
+        if current and (len(current) >= max_requests or current_bytes + size > max_bytes):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(request)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _result_outcome(custom_id: str, source: str, result: Any) -> BatchOutcome:
+    """Convertit le résultat d'une requête (succeeded / errored / canceled / expired)"""
+    if result.type == "succeeded":
+        text = "".join(block.text for block in result.message.content if block.type == "text")
+        return BatchOutcome(custom_id, source, text=text, usage=result.message.usage)
+    if result.type == "errored":
+        error = result.error.error
+        return BatchOutcome(custom_id, source, error=f"{error.type}: {error.message}")
+    return BatchOutcome(custom_id, source, error=f"requête {result.type}")
+
+
+class MessageBatchRunner:
+    """Soumet, surveille et collecte des lots de messages (client AsyncAnthropic)"""
+
+    def __init__(self, client, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 timeout: Optional[float] = None,
+                 max_requests: int = MAX_BATCH_REQUESTS,
+                 max_bytes: int = MAX_BATCH_BYTES,
+                 on_poll: Optional[Callable[[Any], None]] = None):
+        self.batches = client.beta.messages.batches
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.on_poll = on_poll
+
+    async def submit(self, requests: Sequence[BatchRequest]) -> List[str]:
+        """Soumet les requêtes (découpées si nécessaire) et retourne les identifiants de lot"""
+        batch_ids = []
+        for chunk in split_requests(requests, self.max_requests, self.max_bytes):
+            batch = await self.batches.create(requests=[request.to_api() for request in chunk])
+            batch_ids.append(batch.id)
+        return batch_ids
+
+    async def wait(self, batch_ids: Sequence[str]):
+        """Interroge les lots jusqu'à la fin de leur traitement"""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        pending = list(batch_ids)
+        while pending:
+            still_running = []
+            for batch_id in pending:
+                batch = await self.batches.retrieve(batch_id)
+                if self.on_poll is not None:
+                    self.on_poll(batch)
+                if batch.processing_status != "ended":
+                    still_running.append(batch_id)
+            pending = still_running
+            if not pending:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Lot(s) toujours en cours: {', '.join(pending)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def results(self, batch_ids: Sequence[str],
+                      requests: Sequence[BatchRequest]) -> List[BatchOutcome]:
+        """Collecte les réponses et les restitue dans l'ordre des requêtes"""
+        sources = {request.custom_id: request.source for request in requests}
+        outcomes: Dict[str, BatchOutcome] = {}
+        for batch_id in batch_ids:
+            async for response in await self.batches.results(batch_id):
+                if response.custom_id in sources:
+                    outcomes[response.custom_id] = _result_outcome(
+                        response.custom_id, sources[response.custom_id], response.result
+                    )
+        return [
+            outcomes.get(request.custom_id)
+            or BatchOutcome(request.custom_id, request.source, error="aucun résultat dans le lot")
+            for request in requests
+        ]
+
+    async def run(self, requests: Sequence[BatchRequest],
+                  requests_path: Optional[Union[str, Path]] = None,
+                  batch_ids: Optional[Sequence[str]] = None) -> List[BatchOutcome]:
+        """
+        Exécute un lot complet : fichier de requêtes, soumission, attente, collecte.
+
+        Avec `batch_ids`, les lots déjà soumis sont seulement attendus puis collectés :
+        le fichier de requêtes de la soumission est relu (et non réécrit), car les
+        `custom_id` ne désignent plus les mêmes fichiers si la liste a changé depuis.
+        """
+        if batch_ids is not None and requests_path is not None and Path(requests_path).exists():
+            requests = read_requests_file(requests_path)
+        elif requests and requests_path is not None:
+            write_requests_file(requests, requests_path)
+        if not requests:
+            return []
+        if batch_ids is None:
+            batch_ids = await self.submit(requests)
+            print(f"📤 {len(requests)} requête(s) soumise(s) en {len(batch_ids)} lot(s): {', '.join(batch_ids)}")
+        await self.wait(batch_ids)
+        return await self.results(batch_ids, requests)
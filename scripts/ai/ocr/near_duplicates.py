@@ -0,0 +1,246 @@
+"""
+Détection des demandes de devis déjà traitées (doublons et quasi-doublons)
+
+Les agences renvoient souvent la même demande : nouveau scan, transfert,
+relance. Le cache LLM ne reconnaît que le texte OCR identique ; cet index
+retrouve aussi :
+
+- le même numéro de demande, lu dans le texte OCR (relance) ;
+- un texte très proche (rescan, transfert) : signature MinHash des
+  5-grammes de caractères, candidats trouvés par LSH (bandes de la
+  signature), similarité de Jaccard estimée comparée au seuil.
+
+Deux demandes d'une même agence partagent tout le gabarit du courrier :
+un candidat dont le numéro de demande diffère de celui lu dans le texte
+n'est jamais retenu.
+
+Les extractions sont stockées en SQLite (sûr entre processus, comme
+DiskCache), par périmètre (provider, modèle, prompt).
+"""
+
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from text_normalization import fold_text
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_DEDUP_INDEX_PATH = Path(__file__).resolve().parent / ".cache" / "demandes_traitees.sqlite"
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32  # 32 bandes de 4 lignes : candidats dès ~45% de similarité
+SHINGLE_SIZE = 5
+MIN_SHINGLES = 100  # En dessous, texte trop court pour conclure à un quasi-doublon
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+_rng = random.Random(20250923)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# "Demande de devis N° 250923180018907", "Numéro de demande : 2509...", "Nº" replié en "no"
+_NUMERO_DEMANDE = re.compile(
+    r"(?:demande[^\n\d]{0,40}?\bn(?:°|o|umero)?|\bn(?:°|o|umero)\s*(?:de\s+)?(?:la\s+)?demande)"
+    r"\s*[:.]?\s*(\d[\d ]{4,}\d)"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS demandes (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    numero TEXT,
+    signature BLOB,
+    extraction TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS demandes_numero ON demandes (scope, numero);
+CREATE TABLE IF NOT EXISTS bandes (
+    scope TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    key BLOB NOT NULL,
+    demande_id INTEGER NOT NULL,
+    PRIMARY KEY (scope, band, key, demande_id)
+) WITHOUT ROWID;
+"""
+
+
+def find_numero_demande(text: str) -> Optional[str]:
+    """Numéro de demande lu dans le texte OCR, ou None"""
+    match = _NUMERO_DEMANDE.search(fold_text(text or ""))
+    return match.group(1).replace(" ", "") if match else None
+
+
+def shingle_hashes(text: str) -> List[int]:
+    """Empreintes (CRC32) des 5-grammes de caractères du texte replié"""
+    normalized = _NON_ALNUM.sub(" ", fold_text(text or "")).strip()
+    return list({zlib.crc32(normalized[i:i + SHINGLE_SIZE].encode("utf-8"))
+                 for i in range(len(normalized) - SHINGLE_SIZE + 1)})
+
+
+def minhash_signature(hashes: List[int]) -> array:
+    """
+    Signature MinHash (NUM_PERMUTATIONS minima de (a·x + b) mod 2^61-1)
+
+    Le produit est tronqué à 64 bits, comme en numpy : les deux chemins
+    donnent la même signature, qui peut donc être stockée.
+    """
+    if NUMPY_AVAILABLE and hashes:
+        x = np.asarray(hashes, dtype=np.uint64)
+        a = np.array([p[0] for p in _PERMUTATIONS], dtype=np.uint64)[:, None]
+        b = np.array([p[1] for p in _PERMUTATIONS], dtype=np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            values = (a * x + b) % np.uint64(_MERSENNE_PRIME)
+        return array("Q", values.min(axis=1).tolist())
+    return array("Q", [min((((a * x) & _MASK64) + b & _MASK64) % _MERSENNE_PRIME for x in hashes)
+                       if hashes else _MERSENNE_PRIME for a, b in _PERMUTATIONS])
+
+
+def signature_similarity(a: array, b: array) -> float:
+    """Similarité de Jaccard estimée : part des minima identiques"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _band_keys(signature: array) -> List[bytes]:
+    rows = len(signature) // LSH_BANDS
+    return [signature[i * rows:(i + 1) * rows].tobytes() for i in range(LSH_BANDS)]
+
+
+@dataclass
+class Duplicate:
+    """Extraction déjà obtenue pour une demande identique ou très proche"""
+    extraction: Dict[str, Any]
+    numero: Optional[str]
+    similarity: float
+    reason: str  # "numero" ou "similarite"
+
+
+class NearDuplicateIndex:
+    """Index SQLite des demandes déjà extraites (MinHash/LSH + numéro)"""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_DEDUP_INDEX_PATH,
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Seuil de similarité invalide: {threshold} (attendu dans ]0, 1])")
+        self.path = Path(path)
+        self.threshold = threshold
+        self.numero_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def __getstate__(self):
+        # Les connexions SQLite ne traversent pas les frontières de processus
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _fingerprint(ocr_text: str) -> Tuple[Optional[str], Optional[array]]:
+        """(numéro lu dans le texte, signature MinHash ou None si texte trop court)"""
+        hashes = shingle_hashes(ocr_text)
+        signature = minhash_signature(hashes) if len(hashes) >= MIN_SHINGLES else None
+        return find_numero_demande(ocr_text), signature
+
+    def find(self, ocr_text: str, scope: str = "") -> Optional[Duplicate]:
+        """Extraction d'une demande déjà traitée (même numéro ou texte proche), ou None"""
+        numero, signature = self._fingerprint(ocr_text)
+        conn = self._connect()
+
+        if numero:
+            row = conn.execute(
+                "SELECT extraction FROM demandes WHERE scope = ? AND numero = ? ORDER BY id DESC LIMIT 1",
+                (scope, numero)
+            ).fetchone()
+            if row is not None:
+                self.numero_hits += 1
+                return Duplicate(json.loads(row[0]), numero, 1.0, "numero")
+
+        if signature is not None:
+            candidates = set()
+            for band, key in enumerate(_band_keys(signature)):
+                candidates.update(demande_id for demande_id, in conn.execute(
+                    "SELECT demande_id FROM bandes WHERE scope = ? AND band = ? AND key = ?",
+                    (scope, band, key)
+                ))
+            best = None
+            for demande_id in candidates:
+                found_numero, blob, extraction = conn.execute(
+                    "SELECT numero, signature, extraction FROM demandes WHERE id = ?", (demande_id,)
+                ).fetchone()
+                if numero and found_numero and found_numero != numero:
+                    continue  # Même gabarit d'agence, autre demande
+                similarity = signature_similarity(signature, array("Q", blob))
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, found_numero, extraction)
+            if best is not None:
+                self.similar_hits += 1
+                return Duplicate(json.loads(best[2]), best[1], best[0], "similarite")
+
+        self.misses += 1
+        return None
+
+    def add(self, ocr_text: str, extraction_json: str, numero_demande: Optional[str] = None,
+            scope: str = "") -> int:
+        """
+        Enregistre l'extraction d'une demande ; retourne son identifiant
+
+        Le numéro extrait par le LLM est préféré à celui lu dans le texte.
+        """
+        numero, signature = self._fingerprint(ocr_text)
+        numero = "".join(str(numero_demande or "").split()) or numero
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN")
+            demande_id = conn.execute(
+                "INSERT INTO demandes (scope, numero, signature, extraction, created) VALUES (?, ?, ?, ?, ?)",
+                (scope, numero, signature.tobytes() if signature is not None else None,
+                 extraction_json, time.time())
+            ).lastrowid
+            if signature is not None:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO bandes (scope, band, key, demande_id) VALUES (?, ?, ?, ?)",
+                    [(scope, band, key, demande_id) for band, key in enumerate(_band_keys(signature))]
+                )
+        return demande_id
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM demandes").fetchone()[0]
+
+    @property
+    def hits(self) -> int:
+        return self.numero_hits + self.similar_hits
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -3,13 +3,34 @@ Système OCR intelligent pour extraction de devis/demandes d'intervention
 Architecture en 3 couches avec validation et mapping automatique
 """
 
-from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any, Literal
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import AsyncIterator, Collection, Iterable, List, Optional, Dict, Any, Literal, Sequence, Tuple, Union
 from enum import Enum
 from datetime import datetime
+from pathlib import Path
 from pydantic import BaseModel, Field, validator
 import anthropic
+import asyncio
+import hashlib
+import httpx
 import json
+import math
+import os
+import re
+
+from date_parsing import parse_french_date, parse_french_dates
+from disk_cache import DiskCache, make_key, sha256_file
+from fuzzy_matcher import NUMPY_AVAILABLE, FuzzyKeywordMatcher, FuzzyMatch
+from image_preparation import DEFAULT_MAX_PIXELS, PreparationStats, prepare_image
+from json_repair import RepairStats, parse_llm_json
+from keyword_automaton import KeywordAutomaton
+from message_batch import DEFAULT_POLL_INTERVAL, BatchRequest, MessageBatchRunner, make_custom_id
+from postal_index import PostalIndex, open_postal_index
+from prompt_cache import TokenUsageStats, cacheable_text_block
+from streaming_json import IncrementalJSONObjectParser
+from text_normalization import fold_text, fold_with_offsets
 
 
 # ============================================================================
@@ -66,12 +87,27 @@ class ExtractedField:
     
     @property
     def confidence_level(self) -> ConfidenceLevel:
-        if self.confidence >= 0.9:
-            return ConfidenceLevel.HIGH
-        elif self.confidence >= 0.7:
-            return ConfidenceLevel.MEDIUM
-        else:
-            return ConfidenceLevel.LOW
+        return confidence_level(self.confidence)
+
+
+def confidence_level(confidence: float) -> ConfidenceLevel:
+    """Niveau de confiance correspondant à un score 0-1"""
+    if confidence >= 0.9:
+        return ConfidenceLevel.HIGH
+    elif confidence >= 0.7:
+        return ConfidenceLevel.MEDIUM
+    else:
+        return ConfidenceLevel.LOW
+
+
+def make_extracted_field(field_data: Dict) -> ExtractedField:
+    """Convertit un dict {value, confidence, ...} en ExtractedField"""
+    return ExtractedField(
+        value=field_data.get('value'),
+        confidence=field_data.get('confidence', 0.5),
+        source_text=field_data.get('source_text'),
+        alternatives=field_data.get('alternatives', [])
+    )
 
 
 @dataclass
@@ -134,19 +170,237 @@ class ExtractedIntervention(BaseModel):
         arbitrary_types_allowed = True
 
 
+# Champs sans lesquels une intervention ne peut pas être créée
+REQUIRED_EXTRACTION_FIELDS = (
+    "nom_client", "prenom_client", "adresse", "code_postal", "ville",
+    "date_demande", "objet_devis", "message_principal",
+)
+
+
+# ----------------------------------------------------------------------------
+# Variantes compactes (__slots__) pour garder en mémoire de gros volumes
+# d'interventions validées, par exemple pour une passe de re-scoring :
+# pas de __dict__ par instance, listes vides remplacées par le tuple vide
+# partagé, sérialisation directe sans dataclasses.asdict ni pydantic.
+# Les slots sont picklés tels quels (protocole 2+).
+# ----------------------------------------------------------------------------
+
+def _json_default(value: Any):
+    """Valeurs non JSON des champs extraits (dates parsées, enums)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Type non sérialisable en JSON: {type(value).__name__}")
+
+
+class CompactExtractedField:
+    """ExtractedField sans __dict__ ; alternatives en tuple"""
+    __slots__ = ('value', 'confidence', 'source_text', 'bbox', 'alternatives')
+
+    def __init__(self, value: Any, confidence: float, source_text: Optional[str] = None,
+                 bbox: Optional[tuple] = None, alternatives: Sequence[Any] = ()):
+        self.value = value
+        self.confidence = confidence
+        self.source_text = source_text
+        self.bbox = bbox
+        self.alternatives = tuple(alternatives)
+
+    @classmethod
+    def from_field(cls, extracted: ExtractedField) -> 'CompactExtractedField':
+        return cls(extracted.value, extracted.confidence, extracted.source_text,
+                   extracted.bbox, extracted.alternatives)
+
+    def to_field(self) -> ExtractedField:
+        return ExtractedField(self.value, self.confidence, self.source_text, self.bbox, list(self.alternatives))
+
+    @property
+    def confidence_level(self) -> ConfidenceLevel:
+        return confidence_level(self.confidence)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "value": self.value,
+            "confidence": self.confidence,
+            "source_text": self.source_text,
+            "bbox": self.bbox,
+            "alternatives": list(self.alternatives),
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactExtractedField):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"CompactExtractedField(value={self.value!r}, confidence={self.confidence!r})"
+
+
+class CompactEnumFieldMatch:
+    """EnumFieldMatch sans __dict__ ; suggestions en tuple"""
+    __slots__ = ('matched_value', 'confidence', 'original_text', 'suggestions', 'requires_validation')
+
+    def __init__(self, matched_value: Optional[str], confidence: float, original_text: str,
+                 suggestions: Sequence[Tuple[str, float]], requires_validation: bool):
+        self.matched_value = matched_value
+        self.confidence = confidence
+        self.original_text = original_text
+        self.suggestions = tuple(suggestions)
+        self.requires_validation = requires_validation
+
+    @classmethod
+    def from_match(cls, match: EnumFieldMatch) -> 'CompactEnumFieldMatch':
+        return cls(match.matched_value, match.confidence, match.original_text,
+                   match.suggestions, match.requires_validation)
+
+    def to_match(self) -> EnumFieldMatch:
+        return EnumFieldMatch(self.matched_value, self.confidence, self.original_text,
+                              list(self.suggestions), self.requires_validation)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Même format que EnumFieldMatch.to_dict"""
+        return {
+            "matched": self.matched_value,
+            "confidence": self.confidence,
+            "original": self.original_text,
+            "suggestions": list(self.suggestions),
+            "needs_review": self.requires_validation
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactEnumFieldMatch):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"CompactEnumFieldMatch(matched_value={self.matched_value!r}, confidence={self.confidence!r})"
+
+
+class CompactIntervention:
+    """
+    ExtractedIntervention sans modèle pydantic : un objet à slots par
+    intervention, champs et métiers compacts
+    """
+    FIELDS = ('nom_client', 'prenom_client', 'adresse', 'code_postal', 'ville', 'lot', 'etage',
+              'telephone', 'email', 'numero_devis', 'date_demande', 'date_reponse_souhaitee',
+              'objet_devis', 'message_principal')
+    __slots__ = FIELDS + ('metiers', 'agence', 'extraction_date', 'overall_confidence')
+
+    def __init__(self, fields: Dict[str, Optional[CompactExtractedField]],
+                 metiers: Sequence[CompactEnumFieldMatch] = (),
+                 agence: Optional[CompactEnumFieldMatch] = None,
+                 extraction_date: Optional[datetime] = None,
+                 overall_confidence: float = 0.0):
+        for name in self.FIELDS:
+            setattr(self, name, fields.get(name))
+        self.metiers = tuple(metiers)
+        self.agence = agence
+        self.extraction_date = extraction_date or datetime.now()
+        self.overall_confidence = overall_confidence
+
+    @classmethod
+    def from_model(cls, extracted: ExtractedIntervention) -> 'CompactIntervention':
+        fields = {}
+        for name in cls.FIELDS:
+            value = getattr(extracted, name)
+            fields[name] = CompactExtractedField.from_field(value) if value is not None else None
+        return cls(
+            fields,
+            [CompactEnumFieldMatch.from_match(match) for match in extracted.metiers],
+            CompactEnumFieldMatch.from_match(extracted.agence) if extracted.agence is not None else None,
+            extracted.extraction_date,
+            extracted.overall_confidence,
+        )
+
+    def to_model(self) -> ExtractedIntervention:
+        """ExtractedIntervention équivalente (inverse de from_model)"""
+        fields = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                fields[name] = value.to_field()
+        return ExtractedIntervention(
+            **fields,
+            metiers=[match.to_match() for match in self.metiers],
+            agence=self.agence.to_match() if self.agence is not None else None,
+            extraction_date=self.extraction_date,
+            overall_confidence=self.overall_confidence,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            result[name] = value.to_dict() if value is not None else None
+        result["metiers"] = [match.to_dict() for match in self.metiers]
+        result["agence"] = self.agence.to_dict() if self.agence is not None else None
+        result["extraction_date"] = self.extraction_date
+        result["overall_confidence"] = self.overall_confidence
+        return result
+
+    def to_json(self) -> str:
+        """JSON d'une intervention (dates en ISO 8601)"""
+        return json.dumps(self.to_dict(), ensure_ascii=False, default=_json_default)
+
+
 # ============================================================================
 # NIVEAU 1 : EXTRACTION OCR AVEC LLM MULTIMODAL
 # ============================================================================
 
+DEFAULT_PDF_DPI = 200
+DEFAULT_PDF_MEMORY_MB = 256  # Taille maximale d'une page rasterisée (une seule à la fois)
+DEFAULT_PDF_PAGES_IN_FLIGHT = 4  # Pages d'un PDF envoyées simultanément au LLM
+MIN_PDF_DPI = 100
+
+IMAGE_MEDIA_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png",
+                     ".webp": "image/webp", ".gif": "image/gif"}
+
+
 class MultimodalOCRExtractor:
     """
     Extraction via LLM multimodal (Claude Sonnet 4)
     Meilleure compréhension du contexte et de la structure
     """
     
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self, api_key: str, cache: Optional[DiskCache] = None,
+                 max_connections: int = 10,
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 max_pdf_memory_mb: int = DEFAULT_PDF_MEMORY_MB,
+                 max_pdf_pages_in_flight: int = DEFAULT_PDF_PAGES_IN_FLIGHT,
+                 max_image_pixels: Optional[int] = DEFAULT_MAX_PIXELS,
+                 grayscale_images: bool = False,
+                 autocrop_images: bool = False):
+        # Client asynchrone partagé : un seul pool de connexions keep-alive
+        # pour tous les documents traités en parallèle
+        if http_client is None:
+            http_client = anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=30.0
+                )
+            )
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client)
         self.model = "claude-sonnet-4-20250514"
+        self.cache = cache
+        self.max_pdf_memory_mb = max_pdf_memory_mb
+        self.max_pdf_pages_in_flight = max_pdf_pages_in_flight
+        # Préparation des images : None désactive la réduction
+        self.max_image_pixels = max_image_pixels
+        self.grayscale_images = grayscale_images
+        self.autocrop_images = autocrop_images
+        self.preparation_stats = PreparationStats()
+        self.token_usage = TokenUsageStats()
+        self.repair_stats = RepairStats()
+    
+    async def aclose(self):
+        """Ferme le pool de connexions HTTP"""
+        await self.client.close()
+    
+    def _cache_key(self, kind: str, content_hash: str, *options: Any) -> str:
+        """Clé de cache : contenu du document + modèle + prompt d'extraction"""
+        prompt_hash = hashlib.sha256(self._build_extraction_prompt().encode('utf-8')).hexdigest()
+        return make_key(kind, content_hash, self.model, prompt_hash, *options)
     
     def _build_extraction_prompt(self) -> str:
         """Construit le prompt d'extraction structuré"""
@@ -213,17 +467,38 @@ FORMAT DE RÉPONSE JSON :
 Réponds UNIQUEMENT avec le JSON, sans texte avant ou après.
 """
     
-    async def extract_from_image(self, image_data: bytes, 
-                                  media_type: str = "image/jpeg") -> Dict[str, Any]:
-        """Extrait les données d'une image"""
+    def _image_cache_key(self, image_data: bytes, media_type: str) -> str:
+        """Clé de cache d'une image : contenu + options de préparation"""
+        return self._cache_key("image", hashlib.sha256(image_data).hexdigest(), media_type,
+                               self.max_image_pixels, self.grayscale_images, self.autocrop_images)
+    
+    async def _prepare_upload(self, image_data: bytes, media_type: str) -> Tuple[str, str]:
+        """Réduit/ré-encode l'image si besoin et retourne (base64, media_type)"""
+        if self.max_image_pixels:
+            prepared = await asyncio.to_thread(
+                prepare_image, image_data,
+                max_pixels=self.max_image_pixels,
+                grayscale=self.grayscale_images,
+                autocrop=self.autocrop_images
+            )
+            self.preparation_stats.record(prepared)
+            image_data, media_type = prepared.data, prepared.media_type
         
         import base64
-        image_b64 = base64.b64encode(image_data).decode('utf-8')
+        return base64.b64encode(image_data).decode('utf-8'), media_type
+    
+    def _message_params(self, image_b64: str, media_type: str) -> Dict[str, Any]:
+        """
+        Paramètres de `messages.create` pour une image (appel direct ou lot).
         
-        message = self.client.messages.create(
-            model=self.model,
-            max_tokens=4096,
-            messages=[
+        Les instructions statiques forment le préfixe mis en cache (système),
+        l'image propre au document vient en dernier.
+        """
+        return {
+            "model": self.model,
+            "max_tokens": 4096,
+            "system": [cacheable_text_block(self._build_extraction_prompt())],
+            "messages": [
                 {
                     "role": "user",
                     "content": [
@@ -234,45 +509,313 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après.
                                 "media_type": media_type,
                                 "data": image_b64
                             }
-                        },
-                        {
-                            "type": "text",
-                            "text": self._build_extraction_prompt()
                         }
                     ]
                 }
             ]
-        )
+        }
+    
+    def _parse_response(self, response_text: str) -> Dict[str, Any]:
+        """Parse la réponse JSON du modèle (prose, balises et défauts courants tolérés)"""
+        return parse_llm_json(response_text, self.repair_stats)
+    
+    async def extract_from_image(self, image_data: bytes, 
+                                  media_type: str = "image/jpeg") -> Dict[str, Any]:
+        """Extrait les données d'une image"""
         
-        # Parse la réponse JSON
-        response_text = message.content[0].text
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._image_cache_key(image_data, media_type)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+        
+        image_b64, media_type = await self._prepare_upload(image_data, media_type)
+        message = await self.client.messages.create(**self._message_params(image_b64, media_type))
+        self.token_usage.record(message.usage)
+        
+        result = self._parse_response(message.content[0].text)
+        if cache_key is not None:
+            self.cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+        return result
+    
+    async def stream_from_image(self, image_data: bytes,
+                                media_type: str = "image/jpeg",
+                                required_fields: Optional[Collection[str]] = None
+                                ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Extrait une image en streaming : chaque champ est produit dès qu'il est complet.
+        
+        Les champs {value, confidence, ...} sont produits en ExtractedField, les
+        autres (ex: metiers_detectes) tels quels. Avec `required_fields` (par
+        exemple REQUIRED_EXTRACTION_FIELDS), la génération est interrompue dès
+        que ces champs sont reçus ; l'appelant peut aussi sortir de la boucle
+        à tout moment, ce qui ferme le flux.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._image_cache_key(image_data, media_type)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                for name, value in json.loads(cached).items():
+                    yield name, make_extracted_field(value) if _is_field(value) else value
+                return
+        
+        image_b64, media_type = await self._prepare_upload(image_data, media_type)
+        parser = IncrementalJSONObjectParser()
+        missing = set(required_fields or ())
+        
+        async with self.client.messages.stream(**self._message_params(image_b64, media_type)) as stream:
+            async for text in stream.text_stream:
+                for name, value in parser.feed(text):
+                    yield name, make_extracted_field(value) if _is_field(value) else value
+                    missing.discard(name)
+                    if required_fields and not missing:
+                        return
+                if parser.done:
+                    break
+            message = await stream.get_final_message()
+        
+        self.token_usage.record(message.usage)
+        if not parser.done:
+            raise ValueError("Réponse JSON incomplète")
+        if cache_key is not None:
+            self.cache.set(cache_key, json.dumps(parser.result, ensure_ascii=False))
+    
+    async def extract_batch(self, image_paths: Sequence[Union[str, Path]],
+                            requests_path: Optional[Union[str, Path]] = None,
+                            poll_interval: float = DEFAULT_POLL_INTERVAL,
+                            timeout: Optional[float] = None,
+                            batch_ids: Optional[Sequence[str]] = None) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extrait un lot d'images via l'API Message Batches (reprises de nuit).
         
-        # Nettoie le JSON si wrapped dans des backticks
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0]
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0]
+        Les images déjà en cache ne sont pas soumises. Les résultats sont
+        retournés dans l'ordre des chemins, une exception remplaçant le
+        résultat d'une image en échec (comme `OCRPipeline.process_many`).
+        """
+        results: List[Union[Dict[str, Any], Exception, None]] = [None] * len(image_paths)
+        requests: List[BatchRequest] = []
+        cache_keys: Dict[str, Tuple[int, Optional[str]]] = {}  # Par fichier source (stable à la reprise)
+        
+        for index, path in enumerate(image_paths):
+            image_data = Path(path).read_bytes()
+            media_type = IMAGE_MEDIA_TYPES.get(Path(path).suffix.lower(), "image/jpeg")
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self._image_cache_key(image_data, media_type)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    results[index] = json.loads(cached)
+                    continue
+            
+            image_b64, upload_type = await self._prepare_upload(image_data, media_type)
+            requests.append(BatchRequest(make_custom_id(index), str(path), self._message_params(image_b64, upload_type)))
+            cache_keys[str(path)] = (index, cache_key)
+        
+        runner = MessageBatchRunner(self.client, poll_interval=poll_interval, timeout=timeout)
+        for outcome in await runner.run(requests, requests_path=requests_path, batch_ids=batch_ids):
+            self.token_usage.record(outcome.usage)
+            if outcome.source not in cache_keys:
+                continue  # Image soumise mais absente de cette liste
+            index, cache_key = cache_keys.pop(outcome.source)
+            if not outcome.ok:
+                results[index] = RuntimeError(outcome.error)
+                continue
+            try:
+                result = self._parse_response(outcome.text)
+            except ValueError as e:
+                results[index] = e
+                continue
+            if cache_key is not None:
+                self.cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+            results[index] = result
+        for source, (index, _) in cache_keys.items():
+            results[index] = RuntimeError(f"{source}: absent des lots repris")
         
-        return json.loads(response_text.strip())
+        return results
     
     async def extract_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """Extrait les données d'un PDF (converti en images)"""
         
-        # Conversion PDF -> Images
-        from pdf2image import convert_from_path
-        images = convert_from_path(pdf_path, dpi=200)
-        
-        # Pour l'instant, on traite la première page
-        # TODO: gérer multi-pages et merger les résultats
-        if not images:
+        # Un PDF déjà traité évite la rasterisation et l'appel au modèle
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key("pdf", sha256_file(pdf_path), DEFAULT_PDF_DPI)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+        
+        pages = [page async for page in self.iter_pdf_extractions(pdf_path)]
+        page_results = [result for _, result in sorted(pages, key=lambda p: p[0])
+                        if not isinstance(result, BaseException)]
+        if not page_results:
+            raise next(result for _, result in pages if isinstance(result, BaseException))
+        
+        result = merge_page_extractions(page_results)
+        if cache_key is not None:
+            self.cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+        return result
+    
+    async def iter_pdf_extractions(
+        self, pdf_path: str, dpi: int = DEFAULT_PDF_DPI
+    ) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        """
+        Extrait un PDF page par page, en mémoire bornée.
+        
+        Chaque page est rasterisée seule, encodée en JPEG puis libérée avant la
+        suivante : une seule image décodée existe à la fois, et sa résolution
+        est réduite si elle dépasse `max_pdf_memory_mb`. Seules les pages
+        encodées (JPEG) attendent leur requête ; `max_pdf_pages_in_flight`
+        borne le nombre de requêtes simultanées. Un PDF de 40 pages consomme
+        donc autant qu'un PDF de quelques pages. Les pages sont produites dans
+        l'ordre de complétion, sous la forme (numéro de page, résultat ou
+        exception).
+        """
+        page_count, raster_bytes = await asyncio.to_thread(pdf_page_layout, pdf_path, dpi)
+        if page_count == 0:
             raise ValueError("PDF vide ou illisible")
         
-        import io
-        img_byte_arr = io.BytesIO()
-        images[0].save(img_byte_arr, format='JPEG', quality=95)
-        img_byte_arr = img_byte_arr.getvalue()
+        budget = self.max_pdf_memory_mb * 1024 * 1024
+        if raster_bytes > budget and dpi > MIN_PDF_DPI:
+            # Une seule page dépasse le budget : on réduit la résolution
+            dpi = max(MIN_PDF_DPI, int(dpi * math.sqrt(budget / raster_bytes)))
+        
+        semaphore = asyncio.Semaphore(max(1, self.max_pdf_pages_in_flight))
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = []
+        
+        async def extract_page(page_number: int, image_data: bytes):
+            try:
+                result = await self.extract_from_image(image_data)
+            except Exception as e:
+                result = e
+            finally:
+                semaphore.release()
+            await results.put((page_number, result))
+        
+        async def render_pages():
+            for page_number in range(1, page_count + 1):
+                await semaphore.acquire()
+                try:
+                    image_data = await asyncio.to_thread(render_pdf_page, pdf_path, page_number, dpi)
+                except Exception as e:
+                    semaphore.release()
+                    await results.put((page_number, e))
+                    continue
+                tasks.append(asyncio.create_task(extract_page(page_number, image_data)))
+        
+        producer = asyncio.create_task(render_pages())
+        try:
+            for _ in range(page_count):
+                yield await results.get()
+        finally:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
+
+
+_PAGE_SIZE_PATTERN = re.compile(r'([\d.]+)\s*x\s*([\d.]+)\s*pts')
+
+
+def pdf_page_layout(pdf_path: str, dpi: int = DEFAULT_PDF_DPI) -> Tuple[int, int]:
+    """Nombre de pages et taille estimée (octets RGB) d'une page rasterisée"""
+    from pdf2image import pdfinfo_from_path
+    info = pdfinfo_from_path(pdf_path)
+    page_count = int(info.get("Pages", 0))
+    
+    # A4 par défaut si pdfinfo ne donne pas la taille
+    width_pt, height_pt = 595.0, 842.0
+    match = _PAGE_SIZE_PATTERN.search(str(info.get("Page size", "")))
+    if match:
+        width_pt, height_pt = float(match.group(1)), float(match.group(2))
+    
+    raster_bytes = int(width_pt * dpi / 72) * int(height_pt * dpi / 72) * 3
+    return page_count, raster_bytes
+
+
+def render_pdf_page(pdf_path: str, page_number: int, dpi: int = DEFAULT_PDF_DPI) -> bytes:
+    """Rasterise une page et retourne son encodage JPEG (l'image décodée est libérée)"""
+    from pdf2image import convert_from_path
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    if not images:
+        raise ValueError(f"Page {page_number} illisible")
+    try:
+        return _encode_jpeg(images[0])
+    finally:
+        for image in images:
+            image.close()
+
+
+def _encode_jpeg(image, quality: int = 95) -> bytes:
+    """Encode une page rasterisée en JPEG"""
+    import io
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def _is_field(value: Any) -> bool:
+    return isinstance(value, dict) and 'value' in value
+
+
+def merge_page_extractions(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fusionne les extractions de plusieurs pages d'un même document.
+    
+    Pour chaque champ, la valeur non nulle de plus forte confiance l'emporte ;
+    les autres valeurs distinctes sont conservées dans `alternatives`. Les
+    listes (ex: metiers_detectes) sont unies en conservant l'ordre des pages.
+    """
+    if len(pages) == 1:
+        return pages[0]
+    
+    merged: Dict[str, Any] = {}
+    keys = list(dict.fromkeys(key for page in pages for key in page))
+    
+    for key in keys:
+        candidates = [(page_number, page[key]) for page_number, page in enumerate(pages, 1)
+                      if page.get(key) is not None]
+        if not candidates:
+            merged[key] = pages[0].get(key)
+            continue
+        
+        if all(_is_field(value) for _, value in candidates):
+            present = [(page_number, value) for page_number, value in candidates
+                       if value.get('value') not in (None, '', [])]
+            if not present:
+                merged[key] = candidates[0][1]
+                continue
+            
+            if all(isinstance(value['value'], list) for _, value in present):
+                union = []
+                for _, value in present:
+                    union.extend(item for item in value['value'] if item not in union)
+                best = dict(max(present, key=lambda c: c[1].get('confidence', 0.0))[1])
+                best['value'] = union
+                merged[key] = best
+                continue
+            
+            best_page, best = max(present, key=lambda c: c[1].get('confidence', 0.0))
+            best = dict(best)
+            alternatives = list(best.get('alternatives') or [])
+            for _, value in present:
+                if value['value'] != best['value'] and value['value'] not in alternatives:
+                    alternatives.append(value['value'])
+            best['alternatives'] = alternatives
+            best['source_page'] = best_page
+            merged[key] = best
+        
+        elif all(isinstance(value, list) for _, value in candidates):
+            union = []
+            for _, value in candidates:
+                union.extend(item for item in value if item not in union)
+            merged[key] = union
         
-        return await self.extract_from_image(img_byte_arr)
+        else:
+            merged[key] = candidates[0][1]
+    
+    return merged
 
 
 # ============================================================================
@@ -282,6 +825,10 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après.
 class DataValidator:
     """Valide et normalise les données extraites"""
     
+    def __init__(self, postal_index: Optional[PostalIndex] = None):
+        # Index local code postal -> communes (contrôle croisé code / ville)
+        self.postal_index = postal_index
+    
     @staticmethod
     def validate_postal_code(code: str) -> tuple[bool, str]:
         """Valide et normalise un code postal français"""
@@ -309,54 +856,78 @@ class DataValidator:
         # Patterns acceptés pour numéros français
         patterns = [
             # Format français standard : 06 12 34 56 78 ou 0612345678
-            "(r'^0[1-9](?:[\s\.\-]?\d{2}){4}"
-    
-    @staticmethod
-    def parse_date(date_str: str) -> tuple[bool, Optional[datetime]]:
-        """Parse différents formats de dates françaises"""
-        if not date_str:
-            return False, None
-        
-        formats = [
-            "%Y-%m-%d",
-            "%d/%m/%Y",
-            "%d-%m-%Y",
-            "%d/%m/%y",
-            "%d-%m-%y",
-            "%d %m %Y",
-            "%d.%m.%Y"
+            (r'^0[1-9](?:[\s\.\-]?\d{2}){4}$',
+             lambda p: re.sub(r'[\s\.\-]', '', p)),
+            
+            # Format international avec + : +33 6 12 34 56 78
+            (r'^\+33\s*[1-9](?:[\s\.\-]?\d{2}){4}$',
+             lambda p: '0' + re.sub(r'[\s\.\-]', '', p)[3:]),
+            
+            # Format international sans + : 33 6 12 34 56 78
+            # (mais pas 03 36 40 87 89 qui serait un numéro valide commençant par 03)
+            (r'^33\s*[1-9](?:[\s\.\-]?\d{2}){4}$',
+             lambda p: '0' + re.sub(r'[\s\.\-]', '', p)[2:]),
         ]
         
-        for fmt in formats:
-            try:
-                return True, datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
+        phone_stripped = phone.strip()
+        
+        for pattern, normalizer in patterns:
+            if re.match(pattern, phone_stripped):
+                normalized = normalizer(phone_stripped)
+                # Nettoie et vérifie longueur finale
+                clean = ''.join(c for c in normalized if c.isdigit())
+                if len(clean) == 10 and clean.startswith('0'):
+                    return True, clean
         
-        return False, None
+        return False, phone
+    
+    @staticmethod
+    def parse_date(date_str: str) -> tuple[bool, Optional[datetime]]:
+        """Parse différents formats de dates françaises (voir date_parsing)"""
+        parsed = parse_french_date(date_str)
+        return parsed is not None, parsed
+    
+    @staticmethod
+    def parse_dates(date_strs: Sequence[str]) -> List[Optional[datetime]]:
+        """parse_date pour un lot de dates (None si non reconnue)"""
+        return parse_french_dates(date_strs)
+    
+    def cross_check_postal(self, validated: ExtractedIntervention):
+        """Corrige ou pénalise un couple code postal / ville incohérent"""
+        code_field, ville_field = validated.code_postal, validated.ville
+        if not code_field.value or not ville_field.value:
+            return  # Rien à recouper : l'absence de ville n'invalide pas le code postal
+        check = self.postal_index.check(code_field.value, ville_field.value)
+        
+        if not check.valid:
+            code_field.confidence *= 0.5
+            ville_field.confidence *= 0.5
+            ville_field.alternatives.extend(f"{code} {name}" for code, name in check.suggestions)
+            return
+        
+        if check.code_postal != code_field.value:
+            # Code d'une autre commune : chiffre probablement mal lu
+            code_field.alternatives.append(code_field.value)
+            code_field.value = check.code_postal
+            code_field.confidence *= 0.8
+        if check.ville != ville_field.value:
+            ville_field.alternatives.append(ville_field.value)
+            ville_field.value = check.ville
+            ville_field.confidence *= check.score
     
     def validate_extraction(self, raw_data: Dict[str, Any]) -> ExtractedIntervention:
         """Valide et structure les données brutes"""
         
-        def make_field(field_data: Dict) -> ExtractedField:
-            """Convertit un dict en ExtractedField"""
-            return ExtractedField(
-                value=field_data.get('value'),
-                confidence=field_data.get('confidence', 0.5),
-                source_text=field_data.get('source_text'),
-                alternatives=field_data.get('alternatives', [])
-            )
-        
         # Validation des champs obligatoires
         validated = ExtractedIntervention(
-            nom_client=make_field(raw_data['nom_client']),
-            prenom_client=make_field(raw_data['prenom_client']),
-            adresse=make_field(raw_data['adresse']),
-            code_postal=make_field(raw_data['code_postal']),
-            ville=make_field(raw_data['ville']),
-            date_demande=make_field(raw_data['date_demande']),
-            objet_devis=make_field(raw_data['objet_devis']),
-            message_principal=make_field(raw_data['message_principal'])
+            nom_client=make_extracted_field(raw_data['nom_client']),
+            prenom_client=make_extracted_field(raw_data['prenom_client']),
+            adresse=make_extracted_field(raw_data['adresse']),
+            code_postal=make_extracted_field(raw_data['code_postal']),
+            ville=make_extracted_field(raw_data['ville']),
+            date_demande=make_extracted_field(raw_data['date_demande']),
+            objet_devis=make_extracted_field(raw_data['objet_devis']),
+            message_principal=make_extracted_field(raw_data['message_principal'])
         )
         
         # Validation code postal
@@ -368,9 +939,13 @@ class DataValidator:
         else:
             validated.code_postal.confidence *= 0.5
         
+        # Contrôle croisé code postal / ville (index local)
+        if self.postal_index is not None and is_valid:
+            self.cross_check_postal(validated)
+        
         # Validation téléphone
         if 'telephone' in raw_data and raw_data['telephone']['value']:
-            validated.telephone = make_field(raw_data['telephone'])
+            validated.telephone = make_extracted_field(raw_data['telephone'])
             is_valid, normalized = self.validate_phone(
                 validated.telephone.value
             )
@@ -410,6 +985,8 @@ class IntelligentMapper:
     Système à 2 niveaux : matching exact + suggestions
     """
     
+    MATCH_CACHE_SIZE = 4096
+    
     def __init__(self):
         # Mappings pour améliorer la détection
         self.metier_keywords = {
@@ -473,38 +1050,122 @@ class IntelligentMapper:
                 'montage', 'installation'
             ]
         }
+        
+        # Tous les mots-clés compilés en un automate : les métiers présents
+        # mot pour mot sont trouvés en une seule passe sur le texte.
+        # À reconstruire (build_keyword_index) si metier_keywords est modifié.
+        self.build_keyword_index()
+    
+    def __getstate__(self):
+        # Le cache LRU (fonction locale) n'est pas sérialisable
+        state = self.__dict__.copy()
+        del state['_match_cache']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._match_cache = lru_cache(maxsize=self.MATCH_CACHE_SIZE)(self._match_normalized)
+    
+    def build_keyword_index(self):
+        """
+        Compile les noms de métiers et leurs mots-clés, sans casse ni accents :
+        automate Aho–Corasick pour les occurrences exactes, index de trigrammes
+        pour le matching approché. Vide le cache de match_metier.
+        """
+        keywords = [
+            (fold_text(keyword), metier)
+            for metier, metier_keywords in self.metier_keywords.items()
+            for keyword in [metier.value, *metier_keywords]
+        ]
+        self.keyword_automaton = KeywordAutomaton(keywords)
+        self.fuzzy_matcher = FuzzyKeywordMatcher(keywords)
+        # Les mêmes titres (objet_devis) reviennent d'une agence à l'autre
+        self._match_cache = lru_cache(maxsize=self.MATCH_CACHE_SIZE)(self._match_normalized)
+    
+    def match_cache_info(self):
+        """Statistiques du cache de match_metier (hits, misses, maxsize, currsize)"""
+        return self._match_cache.cache_info()
     
     def fuzzy_match_score(self, text1: str, text2: str) -> float:
-        """Score de similarité entre deux chaînes"""
-        from difflib import SequenceMatcher
-        return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+        """Score du passage de text1 le plus proche de text2 (0 sous le seuil)"""
+        keyword = fold_text(text2)
+        match = FuzzyKeywordMatcher([(keyword, text2)]).best_match(fold_text(text1), text2)
+        return match.score if match else 0.0
+    
+    def find_metier_spans(self, extracted_text: str) -> Dict[MetierEnum, FuzzyMatch]:
+        """Meilleur passage approché (mot-clé, score, position) pour chaque métier"""
+        normalized, offsets = fold_with_offsets(extracted_text)
+        spans = {}
+        for metier, match in self.fuzzy_matcher.best_matches(normalized).items():
+            # Positions ramenées au texte d'origine
+            start, end = offsets[match.start], offsets[match.end]
+            spans[metier] = replace(match, start=start, end=end, span=extracted_text[start:end])
+        return spans
     
     def match_metier(self, extracted_text: str) -> EnumFieldMatch:
         """
         Matching intelligent d'un métier
         Retourne soit une valeur exacte, soit des suggestions
+        
+        Mémorisé sur le texte normalisé : voir match_cache_info()
         """
-        extracted_lower = extracted_text.lower()
-        scores = []
+        match = self._match_cache(fold_text(extracted_text))
+        # Copie : le résultat mémorisé ne doit pas être modifié par l'appelant
+        return replace(match, original_text=extracted_text, suggestions=list(match.suggestions))
+    
+    def _match_normalized(self, extracted_lower: str) -> EnumFieldMatch:
+        """match_metier sur un texte déjà normalisé (fold_text)"""
+        # Matching exact du nom ou d'un mot-clé : une passe pour tous les métiers
+        exact_hits = self.keyword_automaton.find_labels(extracted_lower)
         
-        # Recherche par mots-clés
-        for metier, keywords in self.metier_keywords.items():
-            score = 0.0
-            
-            # Matching exact du nom
-            if metier.value.lower() in extracted_lower:
+        # Matching approché, limité aux métiers sans occurrence exacte
+        fuzzy_matches = self.fuzzy_matcher.best_matches(extracted_lower, exclude=exact_hits)
+        
+        metier_scores = []
+        for metier in self.metier_keywords:
+            if metier in exact_hits:
                 score = 1.0
+            elif metier in fuzzy_matches:
+                score = fuzzy_matches[metier].score
             else:
-                # Matching des mots-clés
-                keyword_scores = [
-                    1.0 if kw in extracted_lower else 
-                    self.fuzzy_match_score(extracted_lower, kw)
-                    for kw in keywords
-                ]
-                score = max(keyword_scores) if keyword_scores else 0.0
-            
-            if score > 0.3:  # Seuil minimum
-                scores.append((metier.value, score))
+                score = 0.0
+            metier_scores.append((metier, score))
+        
+        return self._decide_metier(extracted_lower, metier_scores)
+    
+    def match_metiers_batch(self, texts: Sequence[str]) -> List[EnumFieldMatch]:
+        """
+        match_metier pour tout un corpus (reprises d'historique)
+        
+        Mêmes résultats que l'appel texte par texte : les scores approchés
+        de tous les textes distincts sont calculés ensemble (numpy, voir
+        FuzzyKeywordMatcher.score_matrix). Sans numpy, boucle sur match_metier.
+        """
+        if not NUMPY_AVAILABLE:
+            return [self.match_metier(text) for text in texts]
+        
+        normalized = [fold_text(text) for text in texts]
+        unique = list(dict.fromkeys(normalized))
+        metiers = list(self.metier_keywords)
+        scores = self.fuzzy_matcher.score_matrix(unique, metiers)
+        
+        # Les occurrences exactes l'emportent sur le score approché
+        column = {metier: j for j, metier in enumerate(metiers)}
+        for i, text in enumerate(unique):
+            for metier in self.keyword_automaton.find_labels(text):
+                scores[i, column[metier]] = 1.0
+        
+        row = {text: i for i, text in enumerate(unique)}
+        return [
+            self._decide_metier(text, zip(metiers, scores[row[lower]].tolist()))
+            for text, lower in zip(texts, normalized)
+        ]
+    
+    def _decide_metier(self, extracted_text: str,
+                       metier_scores: Iterable[Tuple[MetierEnum, float]]) -> EnumFieldMatch:
+        """Décision de matching à partir du score de chaque métier"""
+        scores = [(metier.value, score) for metier, score in metier_scores
+                  if score > 0.3]  # Seuil minimum
         
         # Tri par score décroissant
         scores.sort(key=lambda x: x[1], reverse=True)
@@ -577,12 +1238,51 @@ class IntelligentMapper:
 # ORCHESTRATEUR PRINCIPAL
 # ============================================================================
 
+# Lots par processus pour enrich_many : assez pour équilibrer la charge,
+# assez peu pour amortir la sérialisation des extractions
+ENRICH_CHUNKS_PER_WORKER = 4
+
+_enrich_stages: Optional[Tuple[DataValidator, IntelligentMapper, bool]] = None
+
+EnrichedIntervention = Union[ExtractedIntervention, CompactIntervention]
+
+
+def _init_enrich_worker(data_validator: DataValidator, mapper: IntelligentMapper, compact: bool = False):
+    """Reçoit une seule fois par processus le validateur et le mapper"""
+    global _enrich_stages
+    _enrich_stages = (data_validator, mapper, compact)
+
+
+def _enrich_one(data_validator: DataValidator, mapper: IntelligentMapper, compact: bool,
+                raw_data: Dict[str, Any]) -> Union[EnrichedIntervention, Exception]:
+    """Validation puis mapping d'une extraction ; l'erreur éventuelle est retournée"""
+    try:
+        enriched = mapper.enrich_intervention_data(data_validator.validate_extraction(raw_data))
+        return CompactIntervention.from_model(enriched) if compact else enriched
+    except Exception as e:
+        return e
+
+
+def _enrich_in_worker(raw_data: Dict[str, Any]) -> Union[EnrichedIntervention, Exception]:
+    result = _enrich_one(*_enrich_stages, raw_data)
+    if isinstance(result, Exception):
+        # Toutes les exceptions ne sont pas re-sérialisables (ex: KeyError de pydantic)
+        return RuntimeError(f"{type(result).__name__}: {result}")
+    return result
+
+
 class OCRPipeline:
     """Pipeline complet d'extraction et mapping"""
     
-    def __init__(self, anthropic_api_key: str):
-        self.extractor = MultimodalOCRExtractor(anthropic_api_key)
-        self.validator = DataValidator()
+    def __init__(self, anthropic_api_key: str, cache: Optional[DiskCache] = None,
+                 max_connections: int = 10,
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 postal_index: Optional[PostalIndex] = None):
+        self.extractor = MultimodalOCRExtractor(anthropic_api_key, cache=cache,
+                                                max_connections=max_connections,
+                                                http_client=http_client)
+        # Sans index (None), seul le format du code postal est vérifié
+        self.validator = DataValidator(postal_index=postal_index)
         self.mapper = IntelligentMapper()
     
     async def process_document(self, 
@@ -613,6 +1313,59 @@ class OCRPipeline:
         
         return enriched
     
+    async def process_many(self,
+                           documents: List[Tuple[str, Literal['pdf', 'image']]],
+                           concurrency: int = 5) -> List[Union[ExtractedIntervention, Exception]]:
+        """
+        Traite plusieurs documents en parallèle (au plus `concurrency` à la fois).
+        
+        Les résultats sont dans l'ordre des documents ; un document en erreur
+        est représenté par son exception sans interrompre les autres.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def process_one(file_path: str, file_type: Literal['pdf', 'image']):
+            async with semaphore:
+                return await self.process_document(file_path, file_type)
+        
+        return await asyncio.gather(
+            *(process_one(file_path, file_type) for file_path, file_type in documents),
+            return_exceptions=True
+        )
+    
+    def enrich_many(self,
+                    raw_extractions: Sequence[Dict[str, Any]],
+                    workers: Optional[int] = None,
+                    chunk_size: Optional[int] = None,
+                    compact: bool = False) -> List[Union[EnrichedIntervention, Exception]]:
+        """
+        Validation + mapping d'un grand nombre d'extractions brutes (CPU pur)
+        
+        Les extractions sont réparties par lots de `chunk_size` sur un pool
+        de `workers` processus (par défaut : un par cœur), qui reçoivent une
+        seule fois le validateur et le mapper du pipeline. Les résultats sont
+        dans l'ordre des extractions ; une extraction en erreur est
+        représentée par son exception (RuntimeError si traitée dans le pool).
+        
+        Avec `compact`, les interventions sont retournées en
+        CompactIntervention : moins de mémoire pour les gros volumes, et
+        moins de données à renvoyer depuis les processus.
+        """
+        raw_extractions = list(raw_extractions)
+        workers = min(workers or os.cpu_count() or 1, len(raw_extractions))
+        if workers <= 1:
+            return [_enrich_one(self.validator, self.mapper, compact, raw) for raw in raw_extractions]
+        
+        if chunk_size is None:
+            chunk_size = math.ceil(len(raw_extractions) / (workers * ENRICH_CHUNKS_PER_WORKER))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_enrich_worker,
+                                 initargs=(self.validator, self.mapper, compact)) as pool:
+            return list(pool.map(_enrich_in_worker, raw_extractions, chunksize=max(1, chunk_size)))
+    
+    async def aclose(self):
+        """Libère les connexions HTTP du pipeline"""
+        await self.extractor.aclose()
+    
     def generate_validation_report(self, 
                                    extracted: ExtractedIntervention) -> Dict[str, Any]:
         """
@@ -669,7 +1422,7 @@ async def main():
     """Exemple d'utilisation du pipeline"""
     
     # Initialisation
-    pipeline = OCRPipeline(anthropic_api_key="your-api-key")
+    pipeline = OCRPipeline(anthropic_api_key="your-api-key", postal_index=open_postal_index())
     
     # Process un document
     result = await pipeline.process_document(
@@ -679,12 +1432,14 @@ async def main():
     
     # Génère le rapport de validation
     report = pipeline.generate_validation_report(result)
+    await pipeline.aclose()
     
     print("\n" + "="*60)
     print("RAPPORT D'EXTRACTION")
     print("="*60)
     print(f"\nConfiance globale : {report['overall_confidence']:.1%}")
     print(f"Insertion auto possible : {'OUI' if report['ready_for_auto_insert'] else 'NON'}")
+    print(f"Tokens : {pipeline.extractor.token_usage.summary()}")
     
     if report['fields_needing_review']:
         print("\n⚠️  Champs nécessitant une revue :")
@@ -705,1214 +1460,3 @@ async def main():
 if __name__ == "__main__":
     import asyncio
     asyncio.run(main())
-, 
-             lambda p: re.sub(r'[\s\.\-]', '', p)),
-            
-            # Format international avec + : +33 6 12 34 56 78
-            "(r'^\+33\s*[1-9](?:[\s\.\-]?\d{2}){4}"
-    
-    @staticmethod
-    def parse_date(date_str: str) -> tuple[bool, Optional[datetime]]:
-        """Parse différents formats de dates françaises"""
-        if not date_str:
-            return False, None
-        
-        formats = [
-            "%Y-%m-%d",
-            "%d/%m/%Y",
-            "%d-%m-%Y",
-            "%d/%m/%y",
-            "%d-%m-%y",
-            "%d %m %Y",
-            "%d.%m.%Y"
-        ]
-        
-        for fmt in formats:
-            try:
-                return True, datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
-        
-        return False, None
-    
-    def validate_extraction(self, raw_data: Dict[str, Any]) -> ExtractedIntervention:
-        """Valide et structure les données brutes"""
-        
-        def make_field(field_data: Dict) -> ExtractedField:
-            """Convertit un dict en ExtractedField"""
-            return ExtractedField(
-                value=field_data.get('value'),
-                confidence=field_data.get('confidence', 0.5),
-                source_text=field_data.get('source_text'),
-                alternatives=field_data.get('alternatives', [])
-            )
-        
-        # Validation des champs obligatoires
-        validated = ExtractedIntervention(
-            nom_client=make_field(raw_data['nom_client']),
-            prenom_client=make_field(raw_data['prenom_client']),
-            adresse=make_field(raw_data['adresse']),
-            code_postal=make_field(raw_data['code_postal']),
-            ville=make_field(raw_data['ville']),
-            date_demande=make_field(raw_data['date_demande']),
-            objet_devis=make_field(raw_data['objet_devis']),
-            message_principal=make_field(raw_data['message_principal'])
-        )
-        
-        # Validation code postal
-        is_valid, normalized = self.validate_postal_code(
-            validated.code_postal.value
-        )
-        if is_valid:
-            validated.code_postal.value = normalized
-        else:
-            validated.code_postal.confidence *= 0.5
-        
-        # Validation téléphone
-        if 'telephone' in raw_data and raw_data['telephone']['value']:
-            validated.telephone = make_field(raw_data['telephone'])
-            is_valid, normalized = self.validate_phone(
-                validated.telephone.value
-            )
-            if is_valid:
-                validated.telephone.value = normalized
-            else:
-                validated.telephone.confidence *= 0.5
-        
-        # Parse dates
-        is_valid, parsed_date = self.parse_date(validated.date_demande.value)
-        if is_valid:
-            validated.date_demande.value = parsed_date
-        else:
-            validated.date_demande.confidence *= 0.3
-        
-        # Calcul confiance globale
-        fields = [
-            validated.nom_client,
-            validated.prenom_client,
-            validated.adresse,
-            validated.code_postal,
-            validated.ville,
-            validated.date_demande
-        ]
-        validated.overall_confidence = sum(f.confidence for f in fields) / len(fields)
-        
-        return validated
-
-
-# ============================================================================
-# NIVEAU 3 : MAPPING INTELLIGENT AVEC BDD
-# ============================================================================
-
-class IntelligentMapper:
-    """
-    Mapping intelligent avec les énumérations de la BDD
-    Système à 2 niveaux : matching exact + suggestions
-    """
-    
-    def __init__(self):
-        # Mappings pour améliorer la détection
-        self.metier_keywords = {
-            MetierEnum.PLOMBERIE: [
-                'plomberie', 'plombier', 'fuite', 'eau', 'robinet', 
-                'chasse d\'eau', 'wc', 'lavabo', 'évier', 'canalisation',
-                'tuyau', 'sanitaire', 'salle de bain'
-            ],
-            MetierEnum.ELECTRICITE: [
-                'électricité', 'électricien', 'panne', 'courant',
-                'disjoncteur', 'tableau électrique', 'prise', 'interrupteur',
-                'lumière', 'éclairage', 'installation électrique'
-            ],
-            MetierEnum.SERRURERIE: [
-                'serrurerie', 'serrurier', 'porte', 'clé', 'serrure',
-                'verrou', 'cylindre', 'ouverture de porte', 'claquée',
-                'fermeture', 'sécurité'
-            ],
-            MetierEnum.CHAUFFAGE: [
-                'chauffage', 'chaudière', 'radiateur', 'thermostat',
-                'ballon d\'eau chaude', 'température', 'froid', 'chauffe'
-            ],
-            MetierEnum.CLIMATISATION: [
-                'climatisation', 'clim', 'climatiseur', 'ventilation',
-                'vmc', 'rafraîchissement', 'air conditionné'
-            ],
-            MetierEnum.MENUISIER: [
-                'menuiserie', 'menuisier', 'bois', 'parquet',
-                'porte en bois', 'placard', 'étagère', 'meuble'
-            ],
-            MetierEnum.PEINTURE: [
-                'peinture', 'peintre', 'repeindre', 'ravalement',
-                'mur', 'plafond', 'enduit', 'tapisserie'
-            ],
-            MetierEnum.VITRERIE: [
-                'vitrerie', 'vitrier', 'vitre', 'fenêtre', 'double vitrage',
-                'carreau', 'bris de glace', 'verre'
-            ],
-            MetierEnum.VOLET_STORE: [
-                'volet', 'store', 'persienne', 'rideau métallique',
-                'motorisation', 'manivelle'
-            ],
-            MetierEnum.JARDINAGE: [
-                'jardinage', 'jardinier', 'jardin', 'espaces verts',
-                'tonte', 'pelouse', 'haie', 'taille', 'élagage'
-            ],
-            MetierEnum.MENAGE: [
-                'ménage', 'nettoyage', 'nettoyer', 'entretien',
-                'propreté', 'fin de chantier'
-            ],
-            MetierEnum.NUISIBLE: [
-                'nuisible', 'rat', 'souris', 'cafard', 'punaise',
-                'insecte', 'dératisation', 'désinsectisation'
-            ],
-            MetierEnum.RENOVATION: [
-                'rénovation', 'travaux', 'réfection', 'modernisation',
-                'aménagement', 'transformation'
-            ],
-            MetierEnum.BRICOLAGE: [
-                'bricolage', 'petit travaux', 'divers', 'fixation',
-                'montage', 'installation'
-            ]
-        }
-    
-    def fuzzy_match_score(self, text1: str, text2: str) -> float:
-        """Score de similarité entre deux chaînes"""
-        from difflib import SequenceMatcher
-        return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-    
-    def match_metier(self, extracted_text: str) -> EnumFieldMatch:
-        """
-        Matching intelligent d'un métier
-        Retourne soit une valeur exacte, soit des suggestions
-        """
-        extracted_lower = extracted_text.lower()
-        scores = []
-        
-        # Recherche par mots-clés
-        for metier, keywords in self.metier_keywords.items():
-            score = 0.0
-            
-            # Matching exact du nom
-            if metier.value.lower() in extracted_lower:
-                score = 1.0
-            else:
-                # Matching des mots-clés
-                keyword_scores = [
-                    1.0 if kw in extracted_lower else 
-                    self.fuzzy_match_score(extracted_lower, kw)
-                    for kw in keywords
-                ]
-                score = max(keyword_scores) if keyword_scores else 0.0
-            
-            if score > 0.3:  # Seuil minimum
-                scores.append((metier.value, score))
-        
-        # Tri par score décroissant
-        scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # Décision de matching
-        if scores and scores[0][1] >= 0.85:
-            # Match de haute confiance
-            return EnumFieldMatch(
-                matched_value=scores[0][0],
-                confidence=scores[0][1],
-                original_text=extracted_text,
-                suggestions=scores[:3],
-                requires_validation=False
-            )
-        elif scores and scores[0][1] >= 0.6:
-            # Match moyen - proposer validation
-            return EnumFieldMatch(
-                matched_value=scores[0][0],
-                confidence=scores[0][1],
-                original_text=extracted_text,
-                suggestions=scores[:3],
-                requires_validation=True
-            )
-        else:
-            # Pas de match clair - proposer suggestions
-            return EnumFieldMatch(
-                matched_value=None,
-                confidence=0.0,
-                original_text=extracted_text,
-                suggestions=scores[:5],
-                requires_validation=True
-            )
-    
-    def match_multiple_metiers(self, descriptions: List[str]) -> List[EnumFieldMatch]:
-        """Match plusieurs métiers depuis différentes descriptions"""
-        all_matches = []
-        seen_metiers = set()
-        
-        for desc in descriptions:
-            match = self.match_metier(desc)
-            
-            # Évite les doublons
-            if match.matched_value and match.matched_value not in seen_metiers:
-                all_matches.append(match)
-                seen_metiers.add(match.matched_value)
-            elif not match.matched_value:
-                # Garde les suggestions pour validation manuelle
-                all_matches.append(match)
-        
-        return all_matches
-    
-    def enrich_intervention_data(self, 
-                                  extracted: ExtractedIntervention) -> ExtractedIntervention:
-        """
-        Enrichit les données extraites avec le mapping intelligent
-        """
-        
-        # Détecte les métiers depuis objet + message
-        metier_sources = [
-            extracted.objet_devis.value,
-            extracted.message_principal.value
-        ]
-        
-        extracted.metiers = self.match_multiple_metiers(metier_sources)
-        
-        return extracted
-
-
-# ============================================================================
-# ORCHESTRATEUR PRINCIPAL
-# ============================================================================
-
-class OCRPipeline:
-    """Pipeline complet d'extraction et mapping"""
-    
-    def __init__(self, anthropic_api_key: str):
-        self.extractor = MultimodalOCRExtractor(anthropic_api_key)
-        self.validator = DataValidator()
-        self.mapper = IntelligentMapper()
-    
-    async def process_document(self, 
-                               file_path: str,
-                               file_type: Literal['pdf', 'image']) -> ExtractedIntervention:
-        """
-        Process complet : extraction -> validation -> mapping
-        """
-        
-        # Niveau 1 : Extraction OCR
-        print("📄 Extraction des données...")
-        if file_type == 'pdf':
-            raw_data = await self.extractor.extract_from_pdf(file_path)
-        else:
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
-            raw_data = await self.extractor.extract_from_image(image_data)
-        
-        # Niveau 2 : Validation
-        print("✓ Validation et normalisation...")
-        validated = self.validator.validate_extraction(raw_data)
-        
-        # Niveau 3 : Mapping
-        print("🔗 Mapping avec base de données...")
-        enriched = self.mapper.enrich_intervention_data(validated)
-        
-        print(f"✅ Extraction terminée - Confiance globale: {enriched.overall_confidence:.1%}")
-        
-        return enriched
-    
-    def generate_validation_report(self, 
-                                   extracted: ExtractedIntervention) -> Dict[str, Any]:
-        """
-        Génère un rapport de validation pour l'utilisateur
-        """
-        
-        fields_needing_review = []
-        
-        # Check confiance par champ
-        all_fields = {
-            'Nom client': extracted.nom_client,
-            'Prénom client': extracted.prenom_client,
-            'Adresse': extracted.adresse,
-            'Code postal': extracted.code_postal,
-            'Ville': extracted.ville,
-            'Date demande': extracted.date_demande,
-            'Objet': extracted.objet_devis
-        }
-        
-        for name, field in all_fields.items():
-            if field.confidence_level != ConfidenceLevel.HIGH:
-                fields_needing_review.append({
-                    'field': name,
-                    'value': field.value,
-                    'confidence': field.confidence,
-                    'level': field.confidence_level.value
-                })
-        
-        # Check métiers
-        metiers_validated = []
-        metiers_suggested = []
-        
-        for metier_match in extracted.metiers:
-            if metier_match.requires_validation:
-                metiers_suggested.append(metier_match.to_dict())
-            else:
-                metiers_validated.append(metier_match.to_dict())
-        
-        return {
-            'overall_confidence': extracted.overall_confidence,
-            'ready_for_auto_insert': extracted.overall_confidence >= 0.85,
-            'fields_needing_review': fields_needing_review,
-            'metiers_detected': metiers_validated,
-            'metiers_suggested': metiers_suggested,
-            'extraction_date': extracted.extraction_date.isoformat()
-        }
-
-
-# ============================================================================
-# EXEMPLE D'UTILISATION
-# ============================================================================
-
-async def main():
-    """Exemple d'utilisation du pipeline"""
-    
-    # Initialisation
-    pipeline = OCRPipeline(anthropic_api_key="your-api-key")
-    
-    # Process un document
-    result = await pipeline.process_document(
-        file_path="demande_intervention.pdf",
-        file_type="pdf"
-    )
-    
-    # Génère le rapport de validation
-    report = pipeline.generate_validation_report(result)
-    
-    print("\n" + "="*60)
-    print("RAPPORT D'EXTRACTION")
-    print("="*60)
-    print(f"\nConfiance globale : {report['overall_confidence']:.1%}")
-    print(f"Insertion auto possible : {'OUI' if report['ready_for_auto_insert'] else 'NON'}")
-    
-    if report['fields_needing_review']:
-        print("\n⚠️  Champs nécessitant une revue :")
-        for field in report['fields_needing_review']:
-            print(f"  - {field['field']}: {field['value']} (confiance: {field['confidence']:.1%})")
-    
-    print("\n✅ Métiers détectés avec certitude :")
-    for metier in report['metiers_detected']:
-        print(f"  - {metier['matched']} (confiance: {metier['confidence']:.1%})")
-    
-    if report['metiers_suggested']:
-        print("\n💡 Métiers suggérés (à valider) :")
-        for metier in report['metiers_suggested']:
-            print(f"  - Texte: '{metier['original']}'")
-            print(f"    Suggestions: {', '.join([f'{s[0]} ({s[1]:.1%})' for s in metier['suggestions'][:3]])}")
-
-
-if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
-, 
-             lambda p: '0' + re.sub(r'[\s\.\-]', '', p)[3:]),
-            
-            # Format international sans + : 33 6 12 34 56 78
-            "# (mais pas 03 36 40 87 89 qui serait un numéro valide commençant par 03)
-            "(r'^33\s*[1-9](?:[\s\.\-]?\d{2}){4}"
-    
-    @staticmethod
-    def parse_date(date_str: str) -> tuple[bool, Optional[datetime]]:
-        """Parse différents formats de dates françaises"""
-        if not date_str:
-            return False, None
-        
-        formats = [
-            "%Y-%m-%d",
-            "%d/%m/%Y",
-            "%d-%m-%Y",
-            "%d/%m/%y",
-            "%d-%m-%y",
-            "%d %m %Y",
-            "%d.%m.%Y"
-        ]
-        
-        for fmt in formats:
-            try:
-                return True, datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
-        
-        return False, None
-    
-    def validate_extraction(self, raw_data: Dict[str, Any]) -> ExtractedIntervention:
-        """Valide et structure les données brutes"""
-        
-        def make_field(field_data: Dict) -> ExtractedField:
-            """Convertit un dict en ExtractedField"""
-            return ExtractedField(
-                value=field_data.get('value'),
-                confidence=field_data.get('confidence', 0.5),
-                source_text=field_data.get('source_text'),
-                alternatives=field_data.get('alternatives', [])
-            )
-        
-        # Validation des champs obligatoires
-        validated = ExtractedIntervention(
-            nom_client=make_field(raw_data['nom_client']),
-            prenom_client=make_field(raw_data['prenom_client']),
-            adresse=make_field(raw_data['adresse']),
-            code_postal=make_field(raw_data['code_postal']),
-            ville=make_field(raw_data['ville']),
-            date_demande=make_field(raw_data['date_demande']),
-            objet_devis=make_field(raw_data['objet_devis']),
-            message_principal=make_field(raw_data['message_principal'])
-        )
-        
-        # Validation code postal
-        is_valid, normalized = self.validate_postal_code(
-            validated.code_postal.value
-        )
-        if is_valid:
-            validated.code_postal.value = normalized
-        else:
-            validated.code_postal.confidence *= 0.5
-        
-        # Validation téléphone
-        if 'telephone' in raw_data and raw_data['telephone']['value']:
-            validated.telephone = make_field(raw_data['telephone'])
-            is_valid, normalized = self.validate_phone(
-                validated.telephone.value
-            )
-            if is_valid:
-                validated.telephone.value = normalized
-            else:
-                validated.telephone.confidence *= 0.5
-        
-        # Parse dates
-        is_valid, parsed_date = self.parse_date(validated.date_demande.value)
-        if is_valid:
-            validated.date_demande.value = parsed_date
-        else:
-            validated.date_demande.confidence *= 0.3
-        
-        # Calcul confiance globale
-        fields = [
-            validated.nom_client,
-            validated.prenom_client,
-            validated.adresse,
-            validated.code_postal,
-            validated.ville,
-            validated.date_demande
-        ]
-        validated.overall_confidence = sum(f.confidence for f in fields) / len(fields)
-        
-        return validated
-
-
-# ============================================================================
-# NIVEAU 3 : MAPPING INTELLIGENT AVEC BDD
-# ============================================================================
-
-class IntelligentMapper:
-    """
-    Mapping intelligent avec les énumérations de la BDD
-    Système à 2 niveaux : matching exact + suggestions
-    """
-    
-    def __init__(self):
-        # Mappings pour améliorer la détection
-        self.metier_keywords = {
-            MetierEnum.PLOMBERIE: [
-                'plomberie', 'plombier', 'fuite', 'eau', 'robinet', 
-                'chasse d\'eau', 'wc', 'lavabo', 'évier', 'canalisation',
-                'tuyau', 'sanitaire', 'salle de bain'
-            ],
-            MetierEnum.ELECTRICITE: [
-                'électricité', 'électricien', 'panne', 'courant',
-                'disjoncteur', 'tableau électrique', 'prise', 'interrupteur',
-                'lumière', 'éclairage', 'installation électrique'
-            ],
-            MetierEnum.SERRURERIE: [
-                'serrurerie', 'serrurier', 'porte', 'clé', 'serrure',
-                'verrou', 'cylindre', 'ouverture de porte', 'claquée',
-                'fermeture', 'sécurité'
-            ],
-            MetierEnum.CHAUFFAGE: [
-                'chauffage', 'chaudière', 'radiateur', 'thermostat',
-                'ballon d\'eau chaude', 'température', 'froid', 'chauffe'
-            ],
-            MetierEnum.CLIMATISATION: [
-                'climatisation', 'clim', 'climatiseur', 'ventilation',
-                'vmc', 'rafraîchissement', 'air conditionné'
-            ],
-            MetierEnum.MENUISIER: [
-                'menuiserie', 'menuisier', 'bois', 'parquet',
-                'porte en bois', 'placard', 'étagère', 'meuble'
-            ],
-            MetierEnum.PEINTURE: [
-                'peinture', 'peintre', 'repeindre', 'ravalement',
-                'mur', 'plafond', 'enduit', 'tapisserie'
-            ],
-            MetierEnum.VITRERIE: [
-                'vitrerie', 'vitrier', 'vitre', 'fenêtre', 'double vitrage',
-                'carreau', 'bris de glace', 'verre'
-            ],
-            MetierEnum.VOLET_STORE: [
-                'volet', 'store', 'persienne', 'rideau métallique',
-                'motorisation', 'manivelle'
-            ],
-            MetierEnum.JARDINAGE: [
-                'jardinage', 'jardinier', 'jardin', 'espaces verts',
-                'tonte', 'pelouse', 'haie', 'taille', 'élagage'
-            ],
-            MetierEnum.MENAGE: [
-                'ménage', 'nettoyage', 'nettoyer', 'entretien',
-                'propreté', 'fin de chantier'
-            ],
-            MetierEnum.NUISIBLE: [
-                'nuisible', 'rat', 'souris', 'cafard', 'punaise',
-                'insecte', 'dératisation', 'désinsectisation'
-            ],
-            MetierEnum.RENOVATION: [
-                'rénovation', 'travaux', 'réfection', 'modernisation',
-                'aménagement', 'transformation'
-            ],
-            MetierEnum.BRICOLAGE: [
-                'bricolage', 'petit travaux', 'divers', 'fixation',
-                'montage', 'installation'
-            ]
-        }
-    
-    def fuzzy_match_score(self, text1: str, text2: str) -> float:
-        """Score de similarité entre deux chaînes"""
-        from difflib import SequenceMatcher
-        return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-    
-    def match_metier(self, extracted_text: str) -> EnumFieldMatch:
-        """
-        Matching intelligent d'un métier
-        Retourne soit une valeur exacte, soit des suggestions
-        """
-        extracted_lower = extracted_text.lower()
-        scores = []
-        
-        # Recherche par mots-clés
-        for metier, keywords in self.metier_keywords.items():
-            score = 0.0
-            
-            # Matching exact du nom
-            if metier.value.lower() in extracted_lower:
-                score = 1.0
-            else:
-                # Matching des mots-clés
-                keyword_scores = [
-                    1.0 if kw in extracted_lower else 
-                    self.fuzzy_match_score(extracted_lower, kw)
-                    for kw in keywords
-                ]
-                score = max(keyword_scores) if keyword_scores else 0.0
-            
-            if score > 0.3:  # Seuil minimum
-                scores.append((metier.value, score))
-        
-        # Tri par score décroissant
-        scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # Décision de matching
-        if scores and scores[0][1] >= 0.85:
-            # Match de haute confiance
-            return EnumFieldMatch(
-                matched_value=scores[0][0],
-                confidence=scores[0][1],
-                original_text=extracted_text,
-                suggestions=scores[:3],
-                requires_validation=False
-            )
-        elif scores and scores[0][1] >= 0.6:
-            # Match moyen - proposer validation
-            return EnumFieldMatch(
-                matched_value=scores[0][0],
-                confidence=scores[0][1],
-                original_text=extracted_text,
-                suggestions=scores[:3],
-                requires_validation=True
-            )
-        else:
-            # Pas de match clair - proposer suggestions
-            return EnumFieldMatch(
-                matched_value=None,
-                confidence=0.0,
-                original_text=extracted_text,
-                suggestions=scores[:5],
-                requires_validation=True
-            )
-    
-    def match_multiple_metiers(self, descriptions: List[str]) -> List[EnumFieldMatch]:
-        """Match plusieurs métiers depuis différentes descriptions"""
-        all_matches = []
-        seen_metiers = set()
-        
-        for desc in descriptions:
-            match = self.match_metier(desc)
-            
-            # Évite les doublons
-            if match.matched_value and match.matched_value not in seen_metiers:
-                all_matches.append(match)
-                seen_metiers.add(match.matched_value)
-            elif not match.matched_value:
-                # Garde les suggestions pour validation manuelle
-                all_matches.append(match)
-        
-        return all_matches
-    
-    def enrich_intervention_data(self, 
-                                  extracted: ExtractedIntervention) -> ExtractedIntervention:
-        """
-        Enrichit les données extraites avec le mapping intelligent
-        """
-        
-        # Détecte les métiers depuis objet + message
-        metier_sources = [
-            extracted.objet_devis.value,
-            extracted.message_principal.value
-        ]
-        
-        extracted.metiers = self.match_multiple_metiers(metier_sources)
-        
-        return extracted
-
-
-# ============================================================================
-# ORCHESTRATEUR PRINCIPAL
-# ============================================================================
-
-class OCRPipeline:
-    """Pipeline complet d'extraction et mapping"""
-    
-    def __init__(self, anthropic_api_key: str):
-        self.extractor = MultimodalOCRExtractor(anthropic_api_key)
-        self.validator = DataValidator()
-        self.mapper = IntelligentMapper()
-    
-    async def process_document(self, 
-                               file_path: str,
-                               file_type: Literal['pdf', 'image']) -> ExtractedIntervention:
-        """
-        Process complet : extraction -> validation -> mapping
-        """
-        
-        # Niveau 1 : Extraction OCR
-        print("📄 Extraction des données...")
-        if file_type == 'pdf':
-            raw_data = await self.extractor.extract_from_pdf(file_path)
-        else:
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
-            raw_data = await self.extractor.extract_from_image(image_data)
-        
-        # Niveau 2 : Validation
-        print("✓ Validation et normalisation...")
-        validated = self.validator.validate_extraction(raw_data)
-        
-        # Niveau 3 : Mapping
-        print("🔗 Mapping avec base de données...")
-        enriched = self.mapper.enrich_intervention_data(validated)
-        
-        print(f"✅ Extraction terminée - Confiance globale: {enriched.overall_confidence:.1%}")
-        
-        return enriched
-    
-    def generate_validation_report(self, 
-                                   extracted: ExtractedIntervention) -> Dict[str, Any]:
-        """
-        Génère un rapport de validation pour l'utilisateur
-        """
-        
-        fields_needing_review = []
-        
-        # Check confiance par champ
-        all_fields = {
-            'Nom client': extracted.nom_client,
-            'Prénom client': extracted.prenom_client,
-            'Adresse': extracted.adresse,
-            'Code postal': extracted.code_postal,
-            'Ville': extracted.ville,
-            'Date demande': extracted.date_demande,
-            'Objet': extracted.objet_devis
-        }
-        
-        for name, field in all_fields.items():
-            if field.confidence_level != ConfidenceLevel.HIGH:
-                fields_needing_review.append({
-                    'field': name,
-                    'value': field.value,
-                    'confidence': field.confidence,
-                    'level': field.confidence_level.value
-                })
-        
-        # Check métiers
-        metiers_validated = []
-        metiers_suggested = []
-        
-        for metier_match in extracted.metiers:
-            if metier_match.requires_validation:
-                metiers_suggested.append(metier_match.to_dict())
-            else:
-                metiers_validated.append(metier_match.to_dict())
-        
-        return {
-            'overall_confidence': extracted.overall_confidence,
-            'ready_for_auto_insert': extracted.overall_confidence >= 0.85,
-            'fields_needing_review': fields_needing_review,
-            'metiers_detected': metiers_validated,
-            'metiers_suggested': metiers_suggested,
-            'extraction_date': extracted.extraction_date.isoformat()
-        }
-
-
-# ============================================================================
-# EXEMPLE D'UTILISATION
-# ============================================================================
-
-async def main():
-    """Exemple d'utilisation du pipeline"""
-    
-    # Initialisation
-    pipeline = OCRPipeline(anthropic_api_key="your-api-key")
-    
-    # Process un document
-    result = await pipeline.process_document(
-        file_path="demande_intervention.pdf",
-        file_type="pdf"
-    )
-    
-    # Génère le rapport de validation
-    report = pipeline.generate_validation_report(result)
-    
-    print("\n" + "="*60)
-    print("RAPPORT D'EXTRACTION")
-    print("="*60)
-    print(f"\nConfiance globale : {report['overall_confidence']:.1%}")
-    print(f"Insertion auto possible : {'OUI' if report['ready_for_auto_insert'] else 'NON'}")
-    
-    if report['fields_needing_review']:
-        print("\n⚠️  Champs nécessitant une revue :")
-        for field in report['fields_needing_review']:
-            print(f"  - {field['field']}: {field['value']} (confiance: {field['confidence']:.1%})")
-    
-    print("\n✅ Métiers détectés avec certitude :")
-    for metier in report['metiers_detected']:
-        print(f"  - {metier['matched']} (confiance: {metier['confidence']:.1%})")
-    
-    if report['metiers_suggested']:
-        print("\n💡 Métiers suggérés (à valider) :")
-        for metier in report['metiers_suggested']:
-            print(f"  - Texte: '{metier['original']}'")
-            print(f"    Suggestions: {', '.join([f'{s[0]} ({s[1]:.1%})' for s in metier['suggestions'][:3]])}")
-
-
-if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
-, 
-             lambda p: '0' + re.sub(r'[\s\.\-]', '', p)[2:]),
-        ]
-        
-        phone_stripped = phone.strip()
-        
-        for pattern, normalizer in patterns:
-            if re.match(pattern, phone_stripped):
-                normalized = normalizer(phone_stripped)
-                # Nettoie et vérifie longueur finale
-                clean = ''.join(c for c in normalized if c.isdigit())
-                if len(clean) == 10 and clean.startswith('0'):
-                    return True, clean
-        
-        return False, phone
-    
-    @staticmethod
-    def parse_date(date_str: str) -> tuple[bool, Optional[datetime]]:
-        """Parse différents formats de dates françaises"""
-        if not date_str:
-            return False, None
-        
-        formats = [
-            "%Y-%m-%d",
-            "%d/%m/%Y",
-            "%d-%m-%Y",
-            "%d/%m/%y",
-            "%d-%m-%y",
-            "%d %m %Y",
-            "%d.%m.%Y"
-        ]
-        
-        for fmt in formats:
-            try:
-                return True, datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
-        
-        return False, None
-    
-    def validate_extraction(self, raw_data: Dict[str, Any]) -> ExtractedIntervention:
-        """Valide et structure les données brutes"""
-        
-        def make_field(field_data: Dict) -> ExtractedField:
-            """Convertit un dict en ExtractedField"""
-            return ExtractedField(
-                value=field_data.get('value'),
-                confidence=field_data.get('confidence', 0.5),
-                source_text=field_data.get('source_text'),
-                alternatives=field_data.get('alternatives', [])
-            )
-        
-        # Validation des champs obligatoires
-        validated = ExtractedIntervention(
-            nom_client=make_field(raw_data['nom_client']),
-            prenom_client=make_field(raw_data['prenom_client']),
-            adresse=make_field(raw_data['adresse']),
-            code_postal=make_field(raw_data['code_postal']),
-            ville=make_field(raw_data['ville']),
-            date_demande=make_field(raw_data['date_demande']),
-            objet_devis=make_field(raw_data['objet_devis']),
-            message_principal=make_field(raw_data['message_principal'])
-        )
-        
-        # Validation code postal
-        is_valid, normalized = self.validate_postal_code(
-            validated.code_postal.value
-        )
-        if is_valid:
-            validated.code_postal.value = normalized
-        else:
-            validated.code_postal.confidence *= 0.5
-        
-        # Validation téléphone
-        if 'telephone' in raw_data and raw_data['telephone']['value']:
-            validated.telephone = make_field(raw_data['telephone'])
-            is_valid, normalized = self.validate_phone(
-                validated.telephone.value
-            )
-            if is_valid:
-                validated.telephone.value = normalized
-            else:
-                validated.telephone.confidence *= 0.5
-        
-        # Parse dates
-        is_valid, parsed_date = self.parse_date(validated.date_demande.value)
-        if is_valid:
-            validated.date_demande.value = parsed_date
-        else:
-            validated.date_demande.confidence *= 0.3
-        
-        # Calcul confiance globale
-        fields = [
-            validated.nom_client,
-            validated.prenom_client,
-            validated.adresse,
-            validated.code_postal,
-            validated.ville,
-            validated.date_demande
-        ]
-        validated.overall_confidence = sum(f.confidence for f in fields) / len(fields)
-        
-        return validated
-
-
-# ============================================================================
-# NIVEAU 3 : MAPPING INTELLIGENT AVEC BDD
-# ============================================================================
-
-class IntelligentMapper:
-    """
-    Mapping intelligent avec les énumérations de la BDD
-    Système à 2 niveaux : matching exact + suggestions
-    """
-    
-    def __init__(self):
-        # Mappings pour améliorer la détection
-        self.metier_keywords = {
-            MetierEnum.PLOMBERIE: [
-                'plomberie', 'plombier', 'fuite', 'eau', 'robinet', 
-                'chasse d\'eau', 'wc', 'lavabo', 'évier', 'canalisation',
-                'tuyau', 'sanitaire', 'salle de bain'
-            ],
-            MetierEnum.ELECTRICITE: [
-                'électricité', 'électricien', 'panne', 'courant',
-                'disjoncteur', 'tableau électrique', 'prise', 'interrupteur',
-                'lumière', 'éclairage', 'installation électrique'
-            ],
-            MetierEnum.SERRURERIE: [
-                'serrurerie', 'serrurier', 'porte', 'clé', 'serrure',
-                'verrou', 'cylindre', 'ouverture de porte', 'claquée',
-                'fermeture', 'sécurité'
-            ],
-            MetierEnum.CHAUFFAGE: [
-                'chauffage', 'chaudière', 'radiateur', 'thermostat',
-                'ballon d\'eau chaude', 'température', 'froid', 'chauffe'
-            ],
-            MetierEnum.CLIMATISATION: [
-                'climatisation', 'clim', 'climatiseur', 'ventilation',
-                'vmc', 'rafraîchissement', 'air conditionné'
-            ],
-            MetierEnum.MENUISIER: [
-                'menuiserie', 'menuisier', 'bois', 'parquet',
-                'porte en bois', 'placard', 'étagère', 'meuble'
-            ],
-            MetierEnum.PEINTURE: [
-                'peinture', 'peintre', 'repeindre', 'ravalement',
-                'mur', 'plafond', 'enduit', 'tapisserie'
-            ],
-            MetierEnum.VITRERIE: [
-                'vitrerie', 'vitrier', 'vitre', 'fenêtre', 'double vitrage',
-                'carreau', 'bris de glace', 'verre'
-            ],
-            MetierEnum.VOLET_STORE: [
-                'volet', 'store', 'persienne', 'rideau métallique',
-                'motorisation', 'manivelle'
-            ],
-            MetierEnum.JARDINAGE: [
-                'jardinage', 'jardinier', 'jardin', 'espaces verts',
-                'tonte', 'pelouse', 'haie', 'taille', 'élagage'
-            ],
-            MetierEnum.MENAGE: [
-                'ménage', 'nettoyage', 'nettoyer', 'entretien',
-                'propreté', 'fin de chantier'
-            ],
-            MetierEnum.NUISIBLE: [
-                'nuisible', 'rat', 'souris', 'cafard', 'punaise',
-                'insecte', 'dératisation', 'désinsectisation'
-            ],
-            MetierEnum.RENOVATION: [
-                'rénovation', 'travaux', 'réfection', 'modernisation',
-                'aménagement', 'transformation'
-            ],
-            MetierEnum.BRICOLAGE: [
-                'bricolage', 'petit travaux', 'divers', 'fixation',
-                'montage', 'installation'
-            ]
-        }
-    
-    def fuzzy_match_score(self, text1: str, text2: str) -> float:
-        """Score de similarité entre deux chaînes"""
-        from difflib import SequenceMatcher
-        return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-    
-    def match_metier(self, extracted_text: str) -> EnumFieldMatch:
-        """
-        Matching intelligent d'un métier
-        Retourne soit une valeur exacte, soit des suggestions
-        """
-        extracted_lower = extracted_text.lower()
-        scores = []
-        
-        # Recherche par mots-clés
-        for metier, keywords in self.metier_keywords.items():
-            score = 0.0
-            
-            # Matching exact du nom
-            if metier.value.lower() in extracted_lower:
-                score = 1.0
-            else:
-                # Matching des mots-clés
-                keyword_scores = [
-                    1.0 if kw in extracted_lower else 
-                    self.fuzzy_match_score(extracted_lower, kw)
-                    for kw in keywords
-                ]
-                score = max(keyword_scores) if keyword_scores else 0.0
-            
-            if score > 0.3:  # Seuil minimum
-                scores.append((metier.value, score))
-        
-        # Tri par score décroissant
-        scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # Décision de matching
-        if scores and scores[0][1] >= 0.85:
-            # Match de haute confiance
-            return EnumFieldMatch(
-                matched_value=scores[0][0],
-                confidence=scores[0][1],
-                original_text=extracted_text,
-                suggestions=scores[:3],
-                requires_validation=False
-            )
-        elif scores and scores[0][1] >= 0.6:
-            # Match moyen - proposer validation
-            return EnumFieldMatch(
-                matched_value=scores[0][0],
-                confidence=scores[0][1],
-                original_text=extracted_text,
-                suggestions=scores[:3],
-                requires_validation=True
-            )
-        else:
-            # Pas de match clair - proposer suggestions
-            return EnumFieldMatch(
-                matched_value=None,
-                confidence=0.0,
-                original_text=extracted_text,
-                suggestions=scores[:5],
-                requires_validation=True
-            )
-    
-    def match_multiple_metiers(self, descriptions: List[str]) -> List[EnumFieldMatch]:
-        """Match plusieurs métiers depuis différentes descriptions"""
-        all_matches = []
-        seen_metiers = set()
-        
-        for desc in descriptions:
-            match = self.match_metier(desc)
-            
-            # Évite les doublons
-            if match.matched_value and match.matched_value not in seen_metiers:
-                all_matches.append(match)
-                seen_metiers.add(match.matched_value)
-            elif not match.matched_value:
-                # Garde les suggestions pour validation manuelle
-                all_matches.append(match)
-        
-        return all_matches
-    
-    def enrich_intervention_data(self, 
-                                  extracted: ExtractedIntervention) -> ExtractedIntervention:
-        """
-        Enrichit les données extraites avec le mapping intelligent
-        """
-        
-        # Détecte les métiers depuis objet + message
-        metier_sources = [
-            extracted.objet_devis.value,
-            extracted.message_principal.value
-        ]
-        
-        extracted.metiers = self.match_multiple_metiers(metier_sources)
-        
-        return extracted
-
-
-# ============================================================================
-# ORCHESTRATEUR PRINCIPAL
-# ============================================================================
-
-class OCRPipeline:
-    """Pipeline complet d'extraction et mapping"""
-    
-    def __init__(self, anthropic_api_key: str):
-        self.extractor = MultimodalOCRExtractor(anthropic_api_key)
-        self.validator = DataValidator()
-        self.mapper = IntelligentMapper()
-    
-    async def process_document(self, 
-                               file_path: str,
-                               file_type: Literal['pdf', 'image']) -> ExtractedIntervention:
-        """
-        Process complet : extraction -> validation -> mapping
-        """
-        
-        # Niveau 1 : Extraction OCR
-        print("📄 Extraction des données...")
-        if file_type == 'pdf':
-            raw_data = await self.extractor.extract_from_pdf(file_path)
-        else:
-            with open(file_path, 'rb') as f:
-                image_data = f.read()
-            raw_data = await self.extractor.extract_from_image(image_data)
-        
-        # Niveau 2 : Validation
-        print("✓ Validation et normalisation...")
-        validated = self.validator.validate_extraction(raw_data)
-        
-        # Niveau 3 : Mapping
-        print("🔗 Mapping avec base de données...")
-        enriched = self.mapper.enrich_intervention_data(validated)
-        
-        print(f"✅ Extraction terminée - Confiance globale: {enriched.overall_confidence:.1%}")
-        
-        return enriched
-    
-    def generate_validation_report(self, 
-                                   extracted: ExtractedIntervention) -> Dict[str, Any]:
-        """
-        Génère un rapport de validation pour l'utilisateur
-        """
-        
-        fields_needing_review = []
-        
-        # Check confiance par champ
-        all_fields = {
-            'Nom client': extracted.nom_client,
-            'Prénom client': extracted.prenom_client,
-            'Adresse': extracted.adresse,
-            'Code postal': extracted.code_postal,
-            'Ville': extracted.ville,
-            'Date demande': extracted.date_demande,
-            'Objet': extracted.objet_devis
-        }
-        
-        for name, field in all_fields.items():
-            if field.confidence_level != ConfidenceLevel.HIGH:
-                fields_needing_review.append({
-                    'field': name,
-                    'value': field.value,
-                    'confidence': field.confidence,
-                    'level': field.confidence_level.value
-                })
-        
-        # Check métiers
-        metiers_validated = []
-        metiers_suggested = []
-        
-        for metier_match in extracted.metiers:
-            if metier_match.requires_validation:
-                metiers_suggested.append(metier_match.to_dict())
-            else:
-                metiers_validated.append(metier_match.to_dict())
-        
-        return {
-            'overall_confidence': extracted.overall_confidence,
-            'ready_for_auto_insert': extracted.overall_confidence >= 0.85,
-            'fields_needing_review': fields_needing_review,
-            'metiers_detected': metiers_validated,
-            'metiers_suggested': metiers_suggested,
-            'extraction_date': extracted.extraction_date.isoformat()
-        }
-
-
-# ============================================================================
-# EXEMPLE D'UTILISATION
-# ============================================================================
-
-async def main():
-    """Exemple d'utilisation du pipeline"""
-    
-    # Initialisation
-    pipeline = OCRPipeline(anthropic_api_key="your-api-key")
-    
-    # Process un document
-    result = await pipeline.process_document(
-        file_path="demande_intervention.pdf",
-        file_type="pdf"
-    )
-    
-    # Génère le rapport de validation
-    report = pipeline.generate_validation_report(result)
-    
-    print("\n" + "="*60)
-    print("RAPPORT D'EXTRACTION")
-    print("="*60)
-    print(f"\nConfiance globale : {report['overall_confidence']:.1%}")
-    print(f"Insertion auto possible : {'OUI' if report['ready_for_auto_insert'] else 'NON'}")
-    
-    if report['fields_needing_review']:
-        print("\n⚠️  Champs nécessitant une revue :")
-        for field in report['fields_needing_review']:
-            print(f"  - {field['field']}: {field['value']} (confiance: {field['confidence']:.1%})")
-    
-    print("\n✅ Métiers détectés avec certitude :")
-    for metier in report['metiers_detected']:
-        print(f"  - {metier['matched']} (confiance: {metier['confidence']:.1%})")
-    
-    if report['metiers_suggested']:
-        print("\n💡 Métiers suggérés (à valider) :")
-        for metier in report['metiers_suggested']:
-            print(f"  - Texte: '{metier['original']}'")
-            print(f"    Suggestions: {', '.join([f'{s[0]} ({s[1]:.1%})' for s in metier['suggestions'][:3]])}")
-
-
-if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Index local code postal -> communes, sans géocodeur réseau
+
+Construit une fois à partir de la base officielle des codes postaux de La
+Poste (laposte_hexasmal.csv, data.gouv.fr), puis ouvert en mémoire partagée
+(mmap) à la première recherche : pas de chargement du CSV au démarrage.
+
+Format du fichier (ordre d'octets natif, c'est un cache local) :
+    en-tête   MAGIC, nombre d'entrées n
+    codes     n x uint32, triés (code postal, nom normalisé)
+    offsets   (n + 1) x uint32 dans le bloc des noms
+    par_nom   n x uint32, permutation triant les entrées par nom normalisé
+    noms      UTF-8, "NOM OFFICIEL\\x1fnom normalisé" par entrée
+
+Recherche par code ou par nom en O(log n) (dichotomie), matching approché
+du nom de commune par distance d'édition bornée.
+
+Usage:
+    python postal_index.py laposte_hexasmal.csv [-o .cache/codes_postaux.idx]
+"""
+
+import argparse
+import csv
+import mmap
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+from fuzzy_matcher import bounded_levenshtein
+from text_normalization import fold_text
+
+DEFAULT_POSTAL_INDEX_PATH = Path(__file__).resolve().parent / ".cache" / "codes_postaux.idx"
+MIN_COMMUNE_SCORE = 0.8
+
+_MAGIC = b"CPIDX01\0"
+_HEADER = struct.Struct("8sI")
+_SEPARATOR = "\x1f"
+_ABBREVIATIONS = [(re.compile(r"\bste\b"), "sainte"), (re.compile(r"\bst\b"), "saint")]
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_commune(name: str) -> str:
+    """Nom de commune comparable : sans casse, accents, tirets ni abréviations St/Ste"""
+    normalized = _NON_ALNUM.sub(" ", fold_text(name or "")).strip()
+    for pattern, replacement in _ABBREVIATIONS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized
+
+
+def commune_score(a: str, b: str) -> float:
+    """Similarité de deux noms normalisés (0 sous MIN_COMMUNE_SCORE)"""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 0.0
+    max_distance = int(longest * (1 - MIN_COMMUNE_SCORE))
+    distance = bounded_levenshtein(a, b, max_distance)
+    return 1 - distance / longest if distance <= max_distance else 0.0
+
+
+def read_laposte_csv(path: Union[str, Path]) -> List[Tuple[str, str]]:
+    """(code postal, nom de commune) depuis le CSV de La Poste (';', UTF-8 ou Latin-1)"""
+    raw = Path(path).read_bytes()
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+    rows = csv.reader(text.splitlines(), delimiter=";")
+    header = [column.strip().lstrip("#").lower() for column in next(rows)]
+    code_col, name_col = header.index("code_postal"), header.index("nom_de_la_commune")
+    return [(row[code_col].strip(), row[name_col].strip()) for row in rows if len(row) > max(code_col, name_col)]
+
+
+def build_postal_index(entries: Iterable[Tuple[str, str]], path: Union[str, Path]) -> int:
+    """Écrit l'index à partir de couples (code postal, commune) ; retourne le nombre d'entrées"""
+    unique = {}
+    for code, name in entries:
+        digits = "".join(c for c in code if c.isdigit())
+        if len(digits) in (4, 5) and name:
+            unique.setdefault((int(digits), normalize_commune(name)), name)
+    ordered = sorted(unique.items())
+
+    codes = array("I", (code for (code, _), _ in ordered))
+    blob = bytearray()
+    offsets = array("I", [0])
+    for (_, normalized), name in ordered:
+        blob += f"{name}{_SEPARATOR}{normalized}".encode("utf-8")
+        offsets.append(len(blob))
+    by_name = array("I", sorted(range(len(ordered)), key=lambda i: ordered[i][0][1]))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(ordered)))
+        for part in (codes, offsets, by_name):
+            part.tofile(f)
+        f.write(blob)
+    return len(ordered)
+
+
+@dataclass
+class PostalCheck:
+    """Résultat du contrôle croisé code postal / ville"""
+    valid: bool
+    code_postal: str
+    ville: str
+    score: float = 0.0
+    corrected: bool = False
+    suggestions: List[Tuple[str, str]] = field(default_factory=list)  # [(code, commune)]
+
+
+class PostalIndex:
+    """Index code postal <-> communes ouvert en mmap à la première recherche"""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_POSTAL_INDEX_PATH):
+        self.path = Path(path)
+        self._mmap = None
+
+    def __getstate__(self):
+        # La projection mémoire est rouverte dans chaque processus
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self._mmap = None
+
+    def _open(self):
+        if self._mmap is not None:
+            return
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} n'est pas un index de codes postaux")
+        view = memoryview(mapped)
+        start = _HEADER.size
+        self._codes = view[start:start + 4 * count].cast("I")
+        start += 4 * count
+        self._offsets = view[start:start + 4 * (count + 1)].cast("I")
+        start += 4 * (count + 1)
+        self._by_name = view[start:start + 4 * count].cast("I")
+        self._names = view[start + 4 * count:]
+        self._mmap = mapped
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._codes)
+
+    def _entry(self, i: int) -> Tuple[str, str, str]:
+        """(code postal, nom officiel, nom normalisé) de la i-ème entrée"""
+        name, normalized = bytes(self._names[self._offsets[i]:self._offsets[i + 1]]) \
+            .decode("utf-8").split(_SEPARATOR)
+        return f"{self._codes[i]:05d}", name, normalized
+
+    def _entries_for_code(self, code: str) -> List[Tuple[str, str, str]]:
+        if not code.isdigit():
+            return []
+        self._open()
+        value = int(code)
+        return [self._entry(i) for i in range(bisect_left(self._codes, value), bisect_right(self._codes, value))]
+
+    def _name_range(self, prefix: str) -> range:
+        """Positions (dans par_nom) des noms normalisés commençant par `prefix`"""
+        self._open()
+        lo, hi = 0, len(self._by_name)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(self._by_name[mid])[2] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start, hi = lo, len(self._by_name)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(self._by_name[mid])[2].startswith(prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return range(start, lo)
+
+    def communes(self, code: str) -> List[str]:
+        """Communes desservies par un code postal"""
+        return [name for _, name, _ in self._entries_for_code(code)]
+
+    def codes(self, commune: str) -> List[Tuple[str, str]]:
+        """(code postal, nom officiel) des communes portant exactement ce nom (normalisé)"""
+        normalized = normalize_commune(commune)
+        if not normalized:
+            return []
+        entries = (self._entry(self._by_name[i]) for i in self._name_range(normalized))
+        return [(code, name) for code, name, found in entries if found == normalized]
+
+    def closest_communes(self, commune: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """Communes de nom proche, parmi celles qui partagent les 2 premières lettres"""
+        normalized = normalize_commune(commune)
+        if len(normalized) < 2:
+            return []
+        scored = []
+        for i in self._name_range(normalized[:2]):
+            code, name, found = self._entry(self._by_name[i])
+            score = commune_score(normalized, found)
+            if score:
+                scored.append((code, name, score))
+        scored.sort(key=lambda item: item[2], reverse=True)
+        return scored[:limit]
+
+    def check(self, code_postal: str, ville: str) -> PostalCheck:
+        """
+        Contrôle croisé et correction d'un couple code postal / ville
+
+        1. la ville (approchée) est desservie par le code : nom officiel ;
+        2. sinon, une commune de ce nom existe : code le plus proche du code
+           lu (chiffre mal reconnu) ;
+        3. sinon, invalide, avec les communes de nom voisin en suggestion.
+        """
+        code = "".join(c for c in code_postal or "" if c.isdigit())
+        code = "0" + code if len(code) == 4 else code
+        normalized = normalize_commune(ville)
+
+        score, name, found = max(
+            ((commune_score(normalized, found), name, found) for _, name, found in self._entries_for_code(code)),
+            default=(0.0, "", ""),
+        )
+        if score:
+            return PostalCheck(True, code, name, score, corrected=found != normalized)
+
+        same_name = self.codes(ville)
+        if same_name:
+            closest = min(same_name, key=lambda entry: bounded_levenshtein(entry[0], code, 5))
+            return PostalCheck(True, closest[0], closest[1], 1.0, corrected=True, suggestions=same_name)
+
+        suggestions = [(c, name) for c, name, _ in self.closest_communes(ville)]
+        return PostalCheck(False, code, ville, suggestions=suggestions)
+
+
+def open_postal_index(path: Union[str, Path] = DEFAULT_POSTAL_INDEX_PATH) -> Optional[PostalIndex]:
+    """Index local s'il a été construit (ouverture différée), sinon None"""
+    path = Path(path)
+    return PostalIndex(path) if path.exists() else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit l'index local des codes postaux")
+    parser.add_argument("csv", type=Path, help="Base officielle des codes postaux (laposte_hexasmal.csv)")
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_POSTAL_INDEX_PATH,
+                        help=f"Fichier d'index (défaut: {DEFAULT_POSTAL_INDEX_PATH})")
+    args = parser.parse_args()
+
+    count = build_postal_index(read_laposte_csv(args.csv), args.output)
+    print(f"✅ {count} couples code postal / commune -> {args.output} "
+          f"({args.output.stat().st_size / 1024:.0f} Ko)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
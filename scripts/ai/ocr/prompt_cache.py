@@ -0,0 +1,96 @@
+"""
+Cache de préfixe de prompt et comptage des tokens d'entrée
+
+Les instructions d'extraction (prompt système, format, exemples) sont
+identiques pour chaque document : placées en tête de requête et marquées
+`cache_control`, elles sont lues depuis le cache du provider au lieu d'être
+retraitées. Le contenu propre au document (texte OCR, image) vient en dernier.
+
+Anthropic exige le marquage explicite (préfixe d'au moins 1024 tokens pour
+Sonnet, sinon le marqueur est ignoré). OpenAI met en cache automatiquement
+les préfixes identiques de plus de 1024 tokens.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Providers acceptant le marqueur `cache_control` sur les blocs de contenu
+CACHE_CONTROL_PROVIDERS = ("anthropic",)
+
+
+def cacheable_text_block(text: str) -> Dict[str, Any]:
+    """Bloc texte marqué comme fin du préfixe à mettre en cache"""
+    return {"type": "text", "text": text, "cache_control": dict(CACHE_CONTROL)}
+
+
+def _get(source: Any, name: str) -> int:
+    value = source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+    return int(value or 0)
+
+
+class TokenUsageStats:
+    """Cumul des tokens d'entrée en cache / non cachés sur un lot (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, usage: Any):
+        """
+        Enregistre l'usage d'un appel Anthropic (`message.usage`).
+
+        `input_tokens` n'inclut pas les tokens lus ou écrits dans le cache.
+        """
+        if usage is None:
+            return
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += _get(usage, "input_tokens")
+            self.cache_creation_input_tokens += _get(usage, "cache_creation_input_tokens")
+            self.cache_read_input_tokens += _get(usage, "cache_read_input_tokens")
+            self.output_tokens += _get(usage, "output_tokens")
+
+    def record_openai(self, usage: Dict[str, Any]):
+        """Enregistre l'usage OpenAI, où `prompt_tokens` inclut les tokens en cache"""
+        cached = _get(usage.get("prompt_tokens_details") or {}, "cached_tokens")
+        self.record({
+            "input_tokens": _get(usage, "prompt_tokens") - cached,
+            "cache_read_input_tokens": cached,
+            "output_tokens": _get(usage, "completion_tokens"),
+        })
+
+    def record_message(self, message: Any):
+        """Enregistre l'usage d'un AIMessage LangChain (métadonnées du provider)"""
+        metadata: Optional[Dict[str, Any]] = getattr(message, "response_metadata", None)
+        if not metadata:
+            return
+        if "usage" in metadata:
+            self.record(metadata["usage"])
+        elif "token_usage" in metadata:
+            self.record_openai(metadata["token_usage"])
+
+    @property
+    def cached_input_tokens(self) -> int:
+        return self.cache_read_input_tokens
+
+    @property
+    def uncached_input_tokens(self) -> int:
+        return self.input_tokens + self.cache_creation_input_tokens
+
+    @property
+    def cached_ratio(self) -> float:
+        total = self.cached_input_tokens + self.uncached_input_tokens
+        return self.cached_input_tokens / total if total else 0.0
+
+    def summary(self) -> str:
+        if not self.calls:
+            return "aucun usage de tokens rapporté"
+        return (f"{self.calls} appel(s): {self.cached_input_tokens} tokens d'entrée en cache, "
+                f"{self.uncached_input_tokens} non cachés dont {self.cache_creation_input_tokens} "
+                f"écrits en cache ({self.cached_ratio:.0%} en cache)")
@@ -0,0 +1,98 @@
+"""
+Analyse incrémentale d'un objet JSON produit en streaming par un LLM
+
+Les tokens sont consommés au fil de l'eau : chaque membre de premier niveau
+de l'objet (`"cle": valeur`) est décodé dès que sa virgule ou l'accolade
+fermante arrive, sans attendre la fin de la réponse. Le texte avant la
+première accolade (prose, balise ```json) est ignoré.
+"""
+
+import json
+from typing import Any, Collection, Iterable, Iterator, List, Optional, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """Décode les membres de premier niveau d'un objet JSON au fur et à mesure"""
+
+    def __init__(self):
+        self.started = False
+        self.done = False
+        self.result = {}
+        self._member: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Ajoute un morceau de texte et retourne les membres complétés par ce morceau"""
+        completed = []
+        start = 0
+        for i, char in enumerate(chunk):
+            if self.done:
+                break
+
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                    self._depth = 1
+                    start = i + 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._member.append(chunk[start:i])
+                    completed.extend(self._close_member())
+                    self.done = True
+            elif char == ',' and self._depth == 1:
+                self._member.append(chunk[start:i])
+                completed.extend(self._close_member())
+                start = i + 1
+
+        if self.started and not self.done:
+            self._member.append(chunk[start:])
+        return completed
+
+    def _close_member(self) -> List[Tuple[str, Any]]:
+        text = "".join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+        member = json.loads("{" + text + "}")
+        self.result.update(member)
+        return list(member.items())
+
+
+def iter_json_members(chunks: Iterable[str],
+                      required: Optional[Collection[str]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Produit (clé, valeur) pour chaque membre complété du flux `chunks`.
+
+    Avec `required`, l'itération s'arrête dès que toutes ces clés sont
+    présentes : le flux amont n'est alors plus consommé.
+    """
+    parser = IncrementalJSONObjectParser()
+    missing = set(required or ())
+    for chunk in chunks:
+        for key, value in parser.feed(chunk):
+            yield key, value
+            missing.discard(key)
+            if required and not missing:
+                return
+        if parser.done:
+            return
+    if not parser.done:
+        raise ValueError("Réponse JSON incomplète")
@@ -0,0 +1,57 @@
+"""
+OCR Tesseract partagé par les scripts d'extraction
+
+Fonction de niveau module (donc sérialisable) pour pouvoir être exécutée
+dans un pool de processus. Le texte OCR peut être mis en cache sur disque,
+indexé par le contenu de l'image, la langue et la configuration Tesseract.
+"""
+
+import hashlib
+import io
+from pathlib import Path
+from typing import Optional, Union
+
+from disk_cache import DiskCache, make_key
+
+try:
+    import pytesseract
+    from PIL import Image
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+
+DEFAULT_OCR_LANGUAGE = "fra"
+DEFAULT_OCR_CONFIG = ""
+DEFAULT_OCR_CACHE_PATH = Path(__file__).resolve().parent / ".cache" / "ocr_text.sqlite"
+
+
+def ocr_cache_key(image_data: bytes, lang: str, config: str) -> str:
+    """Clé de cache : empreinte de l'image + langue + configuration Tesseract"""
+    return make_key("tesseract", hashlib.sha256(image_data).hexdigest(), lang, config)
+
+
+def image_to_text(image_path: Union[str, Path],
+                  lang: str = DEFAULT_OCR_LANGUAGE,
+                  config: str = DEFAULT_OCR_CONFIG,
+                  cache: Optional[DiskCache] = None) -> str:
+    """Exécute Tesseract sur une image et retourne le texte brut"""
+    image_data = None
+    key = None
+    if cache is not None:
+        image_data = Path(image_path).read_bytes()
+        key = ocr_cache_key(image_data, lang, config)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if not OCR_AVAILABLE:
+        raise RuntimeError("Tesseract non disponible. Installez avec: pip install pytesseract pillow")
+
+    source = io.BytesIO(image_data) if image_data is not None else image_path
+    with Image.open(source) as image:
+        text = pytesseract.image_to_string(image, lang=lang, config=config)
+
+    if cache is not None:
+        cache.set(key, text)
+    return text
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests de l'index d'adresses local (normalisation et géocodage hors ligne)
+"""
+
+import json
+
+import pytest
+
+from address_index import AddressIndex, build_address_index, parse_street_address, read_ban_csv
+
+BAN_CSV = """id;id_fantoir;numero;rep;nom_voie;code_postal;code_insee;nom_commune;lon;lat
+93007_0420_00133;93007_0420;133;;Avenue de la République;93150;93007;Le Blanc-Mesnil;2.4632;48.9391
+93007_0420_00135;93007_0420;135;;Avenue de la République;93150;93007;Le Blanc-Mesnil;2.4636;48.9394
+93007_0420_00135_bis;93007_0420;135;bis;Avenue de la République;93150;93007;Le Blanc-Mesnil;2.4637;48.9395
+93007_1200_00004;93007_1200;4;;Rue de l'Église;93150;93007;Le Blanc-Mesnil;2.4580;48.9402
+75111_8158_00133;75111_8158;133;;Avenue de la République;75011;75111;Paris;2.3805;48.8649
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    csv_path = tmp_path / "adresses-93.csv"
+    csv_path.write_text(BAN_CSV, encoding="utf-8")
+    path = tmp_path / "adresses.sqlite"
+    assert build_address_index(read_ban_csv(csv_path), path) == (3, 5)
+    return AddressIndex(path)
+
+
+def test_parse_street_address_in_free_text():
+    """Numéro, répétition, voie et code postal retrouvés dans l'adresse complète"""
+    assert parse_street_address("BAT - 2ND - APT A224 LE CASTELIN 133 avenue de la Republique "
+                                "93150 LE BLANC MESNIL") == (133, "", "avenue de la republique", "93150")
+    assert parse_street_address("135 bis, Av. de la République") == (135, "bis", "avenue de la republique", None)
+
+
+def test_lookup_scoped_by_postal_code_with_repeat_cache(index):
+    """Voie trouvée par trigrammes dans le seul code postal, numéro géocodé, cache LRU"""
+    match = index.lookup("133 av de la Repubique", "93150")
+    assert (match.adresse, match.ville, match.precision) == ("133 Avenue de la République", "Le Blanc-Mesnil", "numero")
+    assert (match.latitude, match.longitude) == (48.9391, 2.4632)
+
+    assert index.lookup("133 avenue de la République", "75011").ville == "Paris"
+    assert index.lookup("135 bis avenue de la republique", "93150").latitude == 48.9395
+    assert index.lookup("99 rue de l'eglise", "93150").precision == "voie"  # centre de la voie
+    assert index.lookup("12 rue inconnue", "93150") is None
+
+    index.lookup("133 Av. de la Repubique", "93 150")
+    assert index.cache_info().hits == 1
+
+
+def test_lookup_restores_leading_zero_of_postal_code(tmp_path):
+    """Codes postaux à 4 chiffres (01000 lu ou exporté en nombre) : zéro initial restitué"""
+    row = {"numero": "12", "rep": "", "nom_voie": "Avenue Alsace-Lorraine", "code_postal": "1000",
+           "nom_commune": "Bourg-en-Bresse", "lon": "5.2250", "lat": "46.2052"}
+    path = tmp_path / "adresses.sqlite"
+    build_address_index([row], path)
+    index = AddressIndex(path)
+
+    for code_postal in (1000, "1000", "01000"):
+        match = index.lookup("12 avenue Alsace Lorraine", code_postal)
+        assert (match.code_postal, match.ville, match.precision) == ("01000", "Bourg-en-Bresse", "numero")
+
+
+def test_extractor_adds_geocoding_after_llm(index, fake_extractor):
+    """extract_with_llm ajoute bien.geocodage depuis l'index, sans toucher au reste"""
+    response = {"bien": {"adresse_complete": "APT A224 LE CASTELIN 133 avenue de la Republique 93150 "
+                                             "LE BLANC MESNIL", "code_postal": "93150"}}
+
+    extractor = fake_extractor([json.dumps(response)], address_index=index)
+    result = extractor.extract_with_llm("texte OCR")
+
+    assert result["bien"]["geocodage"]["adresse"] == "133 Avenue de la République"
+    assert result["bien"]["geocodage"]["code_postal"] == "93150"
+
+
+def test_lookup_bien_accepts_non_string_values(index):
+    """Code postal numérique et adresse non textuelle (sorties LLM) ne font pas échouer la recherche"""
+    match = index.lookup_bien({"adresse": "133 avenue de la Republique", "code_postal": 93150})
+    assert (match.ville, match.code_postal) == ("Le Blanc-Mesnil", "93150")
+
+    assert index.lookup_bien({"adresse": ["133 avenue de la Republique"], "code_postal": 93150}) is None
+    assert index.lookup(None, 93150) is None
+
+
+def test_normalize_address_is_not_fatal(index, monkeypatch, fake_extractor):
+    """Une erreur de géocodage laisse l'extraction inchangée"""
+    def broken_lookup(bien):
+        raise RuntimeError("index corrompu")
+
+    monkeypatch.setattr(index, "lookup_bien", broken_lookup)
+    extractor = fake_extractor([], address_index=index)
+    result = {"bien": {"adresse": "133 avenue de la Republique", "code_postal": 93150}}
+
+    assert extractor.normalize_address(result) == {"bien": {"adresse": "133 avenue de la Republique",
+                                                            "code_postal": 93150}}
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests du moteur de traitement par lot
+"""
+
+import threading
+import time
+
+from batch_engine import BatchStats, run_concurrent, run_pipeline
+
+
+def fake_ocr(n):
+    """OCR factice (niveau module pour être sérialisable)"""
+    if n == 3:
+        raise RuntimeError("image corrompue")
+    return f"texte {n}"
+
+
+def test_run_concurrent_preserves_order():
+    """Les résultats sortent dans l'ordre d'entrée même si les durées varient"""
+    delays = [0.05, 0.01, 0.03, 0.0, 0.02, 0.04]
+
+    def process(delay):
+        time.sleep(delay)
+        return {"delay": delay}
+
+    results = list(run_concurrent(delays, process, concurrency=3))
+
+    assert [r.index for r in results] == list(range(len(delays)))
+    assert [r.extracted["delay"] for r in results] == delays
+
+
+def test_run_concurrent_bounds_parallelism():
+    """Jamais plus de `concurrency` appels simultanés"""
+    lock = threading.Lock()
+    state = {"current": 0, "peak": 0}
+
+    def process(_):
+        with lock:
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+        time.sleep(0.01)
+        with lock:
+            state["current"] -= 1
+        return {}
+
+    list(run_concurrent(range(20), process, concurrency=4))
+
+    assert state["peak"] <= 4
+
+
+def test_run_concurrent_captures_errors_and_stats():
+    """Une erreur sur un document n'interrompt pas le lot"""
+    def process(n):
+        if n == 2:
+            raise ValueError("OCR illisible")
+        return {"n": n}
+
+    stats = BatchStats()
+    results = list(run_concurrent(range(4), process, concurrency=2, stats=stats))
+
+    assert results[2].error == "OCR illisible"
+    assert stats.total == 4
+    assert stats.succeeded == 3
+    assert stats.failed == 1
+    assert stats.docs_per_minute > 0
+
+
+def test_run_pipeline_orders_results_and_isolates_errors():
+    """Le pipeline OCR/LLM restitue l'ordre et isole les erreurs de chaque étape"""
+    def extract(text):
+        n = int(text.split()[1])
+        time.sleep(0.01 * (n % 3))
+        if n == 5:
+            raise ValueError("JSON invalide")
+        return {"text": text}
+
+    stats = BatchStats()
+    results = list(run_pipeline(range(8), fake_ocr, extract, ocr_workers=2,
+                                llm_workers=3, queue_size=2, stats=stats))
+
+    assert [r.index for r in results] == list(range(8))
+    assert results[0].extracted == {"text": "texte 0"}
+    assert results[3].error == "image corrompue"
+    assert results[5].error == "JSON invalide"
+    assert stats.succeeded == 6
+
+
+def test_run_pipeline_stops_cleanly_when_consumer_breaks():
+    """Un arrêt anticipé du consommateur ne bloque pas le pipeline"""
+    batch = run_pipeline(range(50), fake_ocr, lambda text: {"text": text},
+                         ocr_workers=2, llm_workers=2, queue_size=1)
+    first = next(batch)
+    batch.close()
+
+    assert first.index == 0
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests du manifeste de reprise des traitements par lot
+"""
+
+import os
+
+from batch_manifest import BatchManifest
+
+
+def make_images(folder, count):
+    folder.mkdir()
+    images = []
+    for i in range(count):
+        image = folder / f"devis_{i:03d}.jpg"
+        image.write_bytes(f"image {i}".encode())
+        images.append(image)
+    return images
+
+
+def test_restart_skips_completed_and_retries_failed_or_missing(tmp_path):
+    """Reprise : terminés restitués, échecs et nouveaux retraités"""
+    images = make_images(tmp_path / "lot", 4)
+    manifest = BatchManifest(tmp_path / "manifest.sqlite", job="demande_devis:groq")
+    manifest.record(images[0], {"numero_demande": "0"})
+    manifest.record(images[1], error="Timeout du provider")
+    manifest.record(images[2], {"numero_demande": "2"})
+
+    done, pending = manifest.partition(images)
+
+    assert done == [(images[0], {"numero_demande": "0"}), (images[2], {"numero_demande": "2"})]
+    assert pending == [images[1], images[3]]
+    assert manifest.counts() == {"done": 2, "failed": 1}
+    assert BatchManifest(tmp_path / "manifest.sqlite", job="demande_devis:openai").partition(images)[1] == images
+
+
+def test_content_hash_decides_when_size_or_mtime_change(tmp_path):
+    """Fichier touché ou renommé : reconnu ; contenu modifié : retraité"""
+    touched, modified, renamed = make_images(tmp_path / "lot", 3)
+    manifest = BatchManifest(tmp_path / "manifest.sqlite")
+    for image in (touched, modified, renamed):
+        manifest.record(image, {"source": image.name})
+
+    stat = touched.stat()
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    modified.write_bytes(b"nouveau scan")
+    moved = renamed.rename(tmp_path / "lot" / "copie.jpg")
+
+    done, pending = manifest.partition([touched, modified, moved])
+
+    assert [path for path, _ in done] == [touched, moved]
+    assert done[1][1] == {"source": renamed.name}
+    assert pending == [modified]
+
+
+def test_new_documents_are_hashed_once(tmp_path, monkeypatch):
+    """record() reprend l'empreinte calculée par partition, sauf si le fichier a changé"""
+    import batch_manifest
+
+    images = make_images(tmp_path / "scans", 3)
+    hashed = []
+    real_sha256_file = batch_manifest.sha256_file
+    monkeypatch.setattr(batch_manifest, "sha256_file", lambda path: hashed.append(path) or real_sha256_file(path))
+    manifest = BatchManifest(tmp_path / "manifest.sqlite", job="test")
+
+    _, pending = manifest.partition(images)
+    images[2].write_bytes(b"image 2 rescannee")
+    for image in pending:
+        manifest.record(image, {"image": image.name})
+
+    assert [path.name for path in hashed] == ["devis_000.jpg", "devis_001.jpg", "devis_002.jpg", "devis_002.jpg"]
+    assert manifest.completed(images[2]) == {"image": "devis_002.jpg"}
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests de l'analyse des dates françaises (expression régulière unique)
+"""
+
+from datetime import datetime
+
+import pytest
+
+from date_parsing import parse_french_date, parse_french_dates
+from ocr_strategy_alternative import DataValidator
+
+
+@pytest.mark.parametrize("text", [
+    "2025-09-23", "23/09/2025", "23-09-25", "23.09.2025", "23 09 2025", " 23/9/25 ",
+    "23 septembre 2025", "23 Septembre 25", "mardi 23 sept. 2025", "le 23 septembre 2025",
+])
+def test_parses_numeric_and_french_month_formats(text):
+    """Formats numériques et mois en toutes lettres donnent la même date"""
+    assert parse_french_date(text) == datetime(2025, 9, 23)
+
+
+def test_rejects_invalid_dates_and_matches_strptime_pivot():
+    """Dates impossibles et séparateurs mélangés sont refusés ; pivot de %y conservé"""
+    assert parse_french_date("1er août 2025") == datetime(2025, 8, 1)
+    assert parse_french_date("31/12/69") == datetime(1969, 12, 31)
+    assert parse_french_date("01/01/68") == datetime(2068, 1, 1)
+    for text in ("31/02/2025", "23/09-2025", "23 brumaire 2025", "", None, "Orvault"):
+        assert parse_french_date(text) is None
+
+
+def test_validator_uses_dispatcher_and_batch_api():
+    """DataValidator accepte les mois en lettres ; parse_dates traite un lot"""
+    assert DataValidator.parse_date("23 septembre 2025") == (True, datetime(2025, 9, 23))
+    assert DataValidator.parse_date("bientôt") == (False, None)
+    assert parse_french_dates(["23/09/2025", "n/a", "23/09/2025"]) == [
+        datetime(2025, 9, 23), None, datetime(2025, 9, 23),
+    ]
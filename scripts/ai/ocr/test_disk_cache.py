@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests du cache disque et du cache OCR
+"""
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from disk_cache import DiskCache, make_key
+from tesseract_ocr import image_to_text, ocr_cache_key
+
+
+def _write_from_process(cache, n):
+    """Écriture depuis un autre processus (niveau module pour être sérialisable)"""
+    cache.set(f"doc-{n}", f"texte {n}")
+    return cache.get(f"doc-{n}")
+
+
+def test_get_set_and_counters(tmp_path):
+    """Lecture/écriture avec compteurs de hits/misses"""
+    cache = DiskCache(tmp_path / "cache.sqlite")
+
+    assert cache.get("absent") is None
+    cache.set("k", "Demande de devis N° 250923180018907")
+
+    assert cache.get("k") == "Demande de devis N° 250923180018907"
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_make_key_is_unambiguous():
+    """Les composants de clé ne peuvent pas se confondre par concaténation"""
+    assert make_key("ab", "c") != make_key("a", "bc")
+    assert make_key("fra", "--psm 6") == make_key("fra", "--psm 6")
+
+
+def test_lru_eviction_by_size(tmp_path):
+    """Les entrées les moins récemment lues sont évincées en premier"""
+    cache = DiskCache(tmp_path / "cache.sqlite", max_bytes=3000)
+    cache.set("a", "x" * 1000)
+    cache.set("b", "x" * 1000)
+    cache.set("c", "x" * 900)
+    cache.get("a")  # "b" devient la plus ancienne
+
+    cache.set("d", "x" * 1000)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size_bytes <= 3000
+
+
+def test_set_does_not_rescan_table_below_budget(tmp_path):
+    """La taille totale est tenue à jour : pas de SUM(size) à chaque écriture"""
+    cache = DiskCache(tmp_path / "cache.sqlite", max_bytes=10_000)
+    cache.set("a", "x" * 100)
+    statements = []
+    cache._connect().set_trace_callback(statements.append)
+
+    for i in range(50):
+        cache.set(f"k{i % 10}", "x" * 100)  # écrasements compris
+
+    assert not any("SUM(size)" in statement for statement in statements)
+    assert cache._total == cache.size_bytes == 1100
+
+
+def test_cache_is_shared_across_processes(tmp_path):
+    """Le cache se transmet à un pool de processus et reste cohérent"""
+    cache = DiskCache(tmp_path / "cache.sqlite")
+    pickle.dumps(cache)
+
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        values = list(pool.map(_write_from_process, [cache] * 6, range(6)))
+
+    assert values == [f"texte {n}" for n in range(6)]
+    assert len(cache) == 6
+
+
+def test_image_to_text_hit_skips_tesseract(tmp_path):
+    """Un hit retourne le texte sans relancer Tesseract"""
+    image_path = tmp_path / "scan.png"
+    image_path.write_bytes(b"contenu image")
+    cache = DiskCache(tmp_path / "ocr.sqlite")
+    cache.set(ocr_cache_key(b"contenu image", "fra", "--psm 6"), "texte déjà extrait")
+
+    assert image_to_text(image_path, lang="fra", config="--psm 6", cache=cache) == "texte déjà extrait"
+    assert cache.hits == 1
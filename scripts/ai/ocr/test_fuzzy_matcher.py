@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests du matching approché (trigrammes + distance d'édition bornée)
+"""
+
+import random
+
+import pytest
+
+from fuzzy_matcher import FuzzyKeywordMatcher, bounded_levenshtein
+from ocr_strategy_alternative import IntelligentMapper, MetierEnum
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_bounded_levenshtein_matches_exact_distance_up_to_bound():
+    """La distance bornée vaut la distance exacte, ou borne + 1 au-delà"""
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = "".join(rng.choice("abc") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 8)))
+        bound = rng.randint(0, 4)
+        assert bounded_levenshtein(a, b, bound) == min(levenshtein(a, b), bound + 1)
+
+
+def test_best_matches_returns_best_span_with_position():
+    """Le meilleur passage est retourné avec sa position dans le texte"""
+    matcher = FuzzyKeywordMatcher([("canalisation", "plomberie"), ("volet roulant", "volet")])
+    text = "Debouchage canalisatoin cuisine, volets roulant chambre"
+
+    matches = matcher.best_matches(text)
+
+    assert matches["plomberie"].span == "canalisatoin"
+    assert (matches["plomberie"].start, matches["plomberie"].end) == (11, 23)
+    assert matches["volet"].span == "volets roulant"
+    assert 0.75 <= matches["plomberie"].score < 1.0
+    assert matcher.best_matches(text, exclude={"plomberie", "volet"}) == {}
+    assert matcher.best_match("rien à voir", "plomberie") is None
+
+
+def test_elided_words_are_matched_without_their_prefix():
+    """Une élision (d', l', qu') ne pénalise pas le mot qui la suit"""
+    matcher = FuzzyKeywordMatcher([("electricite", "electricite"), ("porte d entree", "porte")])
+    text = "panne d'electricte, porte d'entree bloquee"
+
+    matches = matcher.best_matches(text)
+
+    assert matches["electricite"].span == "electricte"
+    assert matches["electricite"].score == pytest.approx(1 - 1 / 11)
+    assert matches["porte"].span == "porte d'entree" and matches["porte"].score == 1.0
+
+
+@pytest.mark.parametrize("text, metier", [
+    ("Problème dans la cuisine", "MENAGE"),  # 'probleme' ≈ 'proprete'
+    ("Intervention cuisine", "NUISIBLE"),  # 'cuisine' ≈ 'nuisible'
+    ("Fuite sous évier", "NUISIBLE"),  # 'sous' ≈ 'souris'
+    ("Remplacement serure porte", "VITRERIE"),  # 'serure' ≈ 'verre'
+    ("Volet roulant bloqué", "ELECTRICITE"),  # 'roulant' ≈ 'courant'
+])
+def test_short_keywords_do_not_match_unrelated_words(text, metier):
+    """Les mots-clés courts n'acceptent pas un mot voisin à deux éditions près"""
+    mapper = IntelligentMapper()
+    assert MetierEnum(metier) not in mapper.find_metier_spans(text)
+
+
+def test_match_metier_tolerates_typos():
+    """Une faute de frappe dans un titre court suffit encore à reconnaître le métier"""
+    mapper = IntelligentMapper()
+    match = mapper.match_metier("Passage electricien urgent")
+
+    assert match.matched_value == MetierEnum.ELECTRICITE.value
+    assert match.confidence >= 0.85
+    assert mapper.fuzzy_match_score("Plombrie", "Plomberie") > 0.85
+    assert mapper.fuzzy_match_score("Toiture", "Plomberie") == 0.0
+
+
+def test_match_metiers_batch_equals_scalar_path():
+    """Le calcul par lot (numpy) donne exactement les résultats de match_metier"""
+    pytest.importorskip("numpy")
+    mapper = IntelligentMapper()
+    texts = [
+        "Passage electricien urgent", "Debouchage canalisatoin cuisine", "",
+        "Réparation volets roulant chambre", "Devis plombrie fuite sous évier",
+        "Passage electricien urgent", "Nettoyage complet de l'entrée, dératisation de la cave",
+        "Remplacement serure porte palière", "rien de reconnaissable ici",
+    ]
+
+    assert mapper.match_metiers_batch(texts) == [mapper.match_metier(text) for text in texts]
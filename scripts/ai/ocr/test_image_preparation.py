@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests de la préparation des images avant envoi au LLM multimodal
+"""
+
+import io
+import random
+
+from PIL import Image, ImageDraw
+
+from image_preparation import PreparationStats, estimate_image_tokens, prepare_image
+
+
+def photo_bytes(width=4000, height=3000, fmt="JPEG") -> bytes:
+    """Photo de document simulée : fond clair, texte, bruit de capteur"""
+    image = Image.new("RGB", (width, height), (235, 232, 225))
+    draw = ImageDraw.Draw(image)
+    for y in range(200, height - 200, 60):
+        draw.text((200, y), "Demande de devis N° 250923180018907 - NETTOYAGE ENTREE", fill=(20, 20, 20))
+    rng = random.Random(0)
+    for _ in range(20000):
+        image.putpixel((rng.randrange(width), rng.randrange(height)), (rng.randrange(256),) * 3)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=95)
+    return buffer.getvalue()
+
+
+def decode(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+def test_phone_photo_is_downscaled_to_pixel_budget():
+    """Une photo 12 Mpx est réduite au budget et pèse beaucoup moins lourd"""
+    original = photo_bytes()
+    prepared = prepare_image(original, max_pixels=1_000_000)
+
+    assert prepared.width * prepared.height <= 1_000_000
+    assert abs(prepared.width / prepared.height - 4 / 3) < 0.01
+    assert prepared.upload_bytes < len(original) / 4
+    assert prepared.tokens_saved > 0
+    assert decode(prepared.data).size == (prepared.width, prepared.height)
+
+
+def test_smallest_encoding_is_selected():
+    """Le format retenu est le plus compact parmi ceux essayés"""
+    original = photo_bytes(800, 600, fmt="PNG")
+    jpeg_only = prepare_image(original, formats=("JPEG",))
+    png_only = prepare_image(original, formats=("PNG",))
+    best = prepare_image(original, formats=("JPEG", "PNG"))
+
+    assert best.upload_bytes == min(jpeg_only.upload_bytes, png_only.upload_bytes)
+
+
+def test_grayscale_and_crop():
+    """Recadrage explicite et passage en niveaux de gris"""
+    prepared = prepare_image(photo_bytes(800, 600), crop=(100, 100, 500, 400), grayscale=True,
+                             formats=("JPEG", "PNG"))  # WebP n'a pas de mode niveaux de gris
+
+    assert (prepared.width, prepared.height) == (400, 300)
+    assert decode(prepared.data).mode == "L"
+
+
+def test_autocrop_removes_uniform_margins():
+    """Les marges blanches d'un scan sont supprimées"""
+    image = Image.new("RGB", (1000, 1000), "white")
+    ImageDraw.Draw(image).rectangle((300, 200, 700, 800), fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+
+    prepared = prepare_image(buffer.getvalue(), autocrop=True)
+
+    assert (prepared.width, prepared.height) == (401, 601)
+
+
+def test_compact_image_within_budget_is_sent_unchanged():
+    """Une image déjà compacte et dans le budget n'est pas ré-encodée"""
+    image = Image.new("RGB", (200, 100), "white")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    original = buffer.getvalue()
+
+    prepared = prepare_image(original, formats=("PNG",))
+
+    assert prepared.data == original
+    assert prepared.media_type == "image/png"
+
+
+def test_token_estimate_follows_api_resizing_and_stats():
+    """Les tokens estimés plafonnent comme le redimensionnement de l'API"""
+    assert estimate_image_tokens(750, 1000) == 1000
+    assert estimate_image_tokens(4000, 3000) == estimate_image_tokens(1238, 928)
+
+    stats = PreparationStats()
+    stats.record(prepare_image(photo_bytes(), max_pixels=500_000))
+    assert stats.images == 1
+    assert stats.bytes_saved > 0
+    assert stats.tokens_saved > 0
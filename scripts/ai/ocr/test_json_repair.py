@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests de l'extraction et de la réparation locale du JSON des réponses LLM
+"""
+
+import pytest
+
+from json_repair import RepairStats, parse_llm_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Voici le résultat :\n```json\n{"a": 1, "b": [1, 2]}\n```\nBonne journée', {"a": 1, "b": [1, 2]}),
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+    ("{'nom': 'Dupont', 'urgence': True, 'lot': None}", {"nom": "Dupont", "urgence": True, "lot": None}),
+    ('{"objet": "Fuite", "bien": {"ville": "Pantin", "adresse": "12 rue de l\'Église',
+     {"objet": "Fuite", "bien": {"ville": "Pantin", "adresse": "12 rue de l'Église"}}),
+    ('{"numero": "42", "metiers": ["plomberie", "peinture"', {"numero": "42", "metiers": ["plomberie", "peinture"]}),
+    ('{"numero": "42", "description":', {"numero": "42"}),
+    ('{"description": "ligne 1\nligne 2"}', {"description": "ligne 1\nligne 2"}),
+])
+def test_parse_llm_json_repairs_common_defects(text, expected):
+    """Prose, virgules finales, apostrophes et réponses tronquées sont récupérées"""
+    assert parse_llm_json(text) == expected
+
+
+def test_repair_stats_count_avoided_round_trips():
+    """Les réparations réussies sont comptées comme appels LLM évités"""
+    stats = RepairStats()
+    parse_llm_json('{"a": 1}', stats)
+    parse_llm_json('{"a": 1,}', stats)
+    with pytest.raises(ValueError):
+        parse_llm_json("Je ne peux pas lire ce document.", stats)
+
+    assert (stats.parsed, stats.repaired, stats.failed) == (1, 1, 1)
+    assert stats.round_trips_avoided == 1
+
+
+def test_demande_extractor_repairs_instead_of_failing(fake_extractor):
+    """Une réponse avec prose et virgule finale ne fait plus échouer le document"""
+    extractor = fake_extractor([
+        'Voici les données :\n{"numero_demande": "250923180018907", '
+        '"intervention": {"description": "NETTOYAGE ENTREE", "urgence": true,},}'
+    ])
+    result = extractor.extract_with_llm("texte OCR")
+
+    assert result["intervention"]["description"] == "NETTOYAGE ENTREE"
+    assert extractor.repair_stats.round_trips_avoided == 1
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests de la sortie JSONL au fil de l'eau
+"""
+
+import json
+
+from jsonl_output import JSONLWriter, iter_jsonl, jsonl_to_json
+
+RESULTS = [
+    {"source": "devis_001.jpg", "extracted": {"numero_demande": "250923180018907",
+                                              "intervention": {"description": "Fuite\nsous évier ", "urgence": True}}},
+    {"source": "devis_002.jpg", "error": "Tesseract introuvable"},
+    {"source": "devis_003.jpg", "extracted": {"bien": {}, "contact": None, "metiers": []}},
+]
+
+
+def test_lines_are_durable_before_close(tmp_path):
+    """Chaque lot de flush_every résultats est lisible avant la fin du traitement"""
+    path = tmp_path / "results.jsonl"
+    writer = JSONLWriter(path, flush_every=2)
+    for record in RESULTS:
+        writer.write(record)
+        if writer.written == 2:
+            assert list(iter_jsonl(path)) == RESULTS[:2]
+
+    writer.close()
+    assert list(iter_jsonl(path)) == RESULTS
+    assert (writer.succeeded, writer.failed) == (2, 1)
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    """Arrêt brutal en pleine écriture : les lignes complètes restent exploitables"""
+    path = tmp_path / "results.jsonl"
+    with JSONLWriter(path) as writer:
+        writer.write(RESULTS[0])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"source": "devis_002.jpg", "extr')
+
+    assert list(iter_jsonl(path)) == RESULTS[:1]
+
+
+def test_aggregated_json_matches_legacy_output(tmp_path):
+    """Le JSON reconstruit est identique à json.dump(results, indent=2)"""
+    for results in (RESULTS, []):
+        jsonl, aggregated = tmp_path / "results.jsonl", tmp_path / "results.json"
+        with JSONLWriter(jsonl) as writer:
+            for record in results:
+                writer.write(record)
+
+        assert jsonl_to_json(jsonl, aggregated) == len(results)
+        assert aggregated.read_text(encoding="utf-8") == json.dumps(results, ensure_ascii=False, indent=2)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests de l'automate Aho–Corasick et de son usage par IntelligentMapper
+"""
+
+from keyword_automaton import KeywordAutomaton
+from ocr_strategy_alternative import IntelligentMapper, MetierEnum
+
+
+def test_finds_overlapping_keywords_in_one_pass():
+    """Les mots-clés imbriqués ou chevauchants sont tous trouvés"""
+    automaton = KeywordAutomaton([
+        ("porte", "serrurerie"), ("porte en bois", "menuiserie"),
+        ("eau", "plomberie"), ("chasse d'eau", "plomberie"), ("rat", "nuisible"),
+    ])
+    text = "la porte en bois des wc et la chasse d'eau"
+
+    assert automaton.find_labels(text) == {"serrurerie", "menuiserie", "plomberie"}
+    assert sorted(automaton.iter_matches(text)) == [
+        (3, "porte"), (3, "porte en bois"), (30, "chasse d'eau"), (39, "eau"),
+    ]
+    assert automaton.find_labels("réparation") == {"nuisible"}  # sous-chaîne, comme `in`
+
+
+def test_mapper_exact_hits_match_substring_semantics():
+    """Les métiers trouvés par l'automate sont ceux d'un test `in` par mot-clé"""
+    mapper = IntelligentMapper()
+    text = ("Suite état des lieux : robinet qui fuit, volet bloqué, "
+            "ampoule grillée dans l'entrée et cafards sous l'évier").lower()
+
+    expected = {
+        metier for metier, keywords in mapper.metier_keywords.items()
+        if any(kw in text for kw in [metier.value.lower(), *keywords])
+    }
+
+    assert mapper.keyword_automaton.find_labels(text) == expected
+    assert {MetierEnum.PLOMBERIE, MetierEnum.VOLET_STORE, MetierEnum.NUISIBLE} <= expected
+
+
+def test_match_metier_uses_exact_hits():
+    """Un mot-clé présent donne un match de confiance 1.0 sans validation"""
+    match = IntelligentMapper().match_metier("Fuite sous le lavabo de la salle de bain")
+
+    assert match.matched_value == MetierEnum.PLOMBERIE.value
+    assert match.confidence == 1.0
+    assert not match.requires_validation
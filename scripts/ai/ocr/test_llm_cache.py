@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests du cache des extractions LLM
+"""
+
+import json
+import shutil
+
+from disk_cache import DiskCache
+from extract_demande_devis import PROMPT_PATH
+
+RESPONSE = json.dumps({
+    "numero_demande": "250923180018907",
+    "intervention": {"description": "NETTOYAGE ENTREE", "urgence": True}
+})
+
+
+def test_second_extraction_is_served_from_cache(tmp_path, fake_extractor):
+    """La même demande n'est envoyée qu'une fois au provider"""
+    cache = DiskCache(tmp_path / "llm.sqlite")
+    extractor = fake_extractor([RESPONSE] * 5, prompt_path=PROMPT_PATH, llm_cache=cache)
+
+    first = extractor.extract_with_llm("Demande de devis N° 250923180018907")
+    second = extractor.extract_with_llm("Demande de devis N° 250923180018907")
+
+    assert first == second
+    assert extractor.llm.i == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_prompt_change_invalidates_cache(tmp_path, fake_extractor):
+    """Modifier le YAML du prompt invalide les extractions en cache"""
+    prompt_path = tmp_path / "prompt.yaml"
+    shutil.copy(PROMPT_PATH, prompt_path)
+    cache = DiskCache(tmp_path / "llm.sqlite")
+    fake_extractor([RESPONSE] * 5, prompt_path=prompt_path, llm_cache=cache).extract_with_llm("texte OCR")
+
+    prompt_path.write_text(prompt_path.read_text(encoding="utf-8").replace('version: "1.0"', 'version: "1.1"'),
+                           encoding="utf-8")
+    extractor = fake_extractor([RESPONSE] * 5, prompt_path=prompt_path, llm_cache=cache)
+    extractor.extract_with_llm("texte OCR")
+
+    assert extractor.llm.i == 1
+    assert cache.misses == 2
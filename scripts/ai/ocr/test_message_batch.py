@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Tests du mode lot (API Message Batches) contre un serveur HTTP local
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anthropic
+import pytest
+
+from message_batch import BatchRequest, MessageBatchRunner, read_requests_file, split_requests
+
+
+class StubBatchServer(ThreadingHTTPServer):
+    """Imite /v1/messages/batches : création, interrogation, résultats JSONL"""
+
+    def __init__(self, respond, polls_before_end=2):
+        super().__init__(("127.0.0.1", 0), StubBatchHandler)
+        self.respond = respond
+        self.polls_before_end = polls_before_end
+        self.batches = {}
+        self.polls = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def batch_json(self, batch_id):
+        ended = self.polls >= self.polls_before_end
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": "2024-10-01T00:00:00Z",
+            "expires_at": "2024-10-02T00:00:00Z",
+            "ended_at": "2024-10-01T01:00:00Z" if ended else None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+
+class StubBatchHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload, content_type="application/json"):
+        body = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        requests = json.loads(self.rfile.read(length))["requests"]
+        batch_id = f"msgbatch_{len(self.server.batches) + 1}"
+        self.server.batches[batch_id] = requests
+        self.send_json(self.server.batch_json(batch_id))
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        batch_id = parts[3]
+        if parts[-1] == "results":
+            # Résultats volontairement dans l'ordre inverse des requêtes
+            lines = [json.dumps({"custom_id": r["custom_id"], "result": self.server.respond(r)})
+                     for r in reversed(self.server.batches[batch_id])]
+            self.send_json("\n".join(lines) + "\n", content_type="application/binary")
+        else:
+            self.server.polls += 1
+            self.send_json(self.server.batch_json(batch_id))
+
+
+def succeeded(text):
+    return {"type": "succeeded", "message": {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "claude",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn", "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 10},
+    }}
+
+
+def errored(message):
+    return {"type": "errored", "error": {"type": "error", "error": {"type": "overloaded_error", "message": message}}}
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(respond, polls_before_end=2):
+        server = StubBatchServer(respond, polls_before_end)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_split_requests_respects_count_and_size():
+    """Les requêtes sont découpées selon le nombre et la taille maximum d'un lot"""
+    requests = [BatchRequest(f"doc-{i}", f"{i}.jpg", {"text": "x" * 100}) for i in range(10)]
+
+    assert [len(c) for c in split_requests(requests, max_requests=4)] == [4, 4, 2]
+    assert [len(c) for c in split_requests(requests, max_bytes=300)] == [2, 2, 2, 2, 2]
+
+
+def test_runner_maps_results_back_to_sources(stub_server, tmp_path):
+    """Soumission, interrogation et rattachement des résultats, même dans le désordre"""
+    def respond(request):
+        if request["custom_id"] == "doc-1":
+            return errored("surcharge")
+        return succeeded(request["params"]["messages"][0]["content"].upper())
+
+    server = stub_server(respond)
+    requests = [BatchRequest(f"doc-{i}", f"scan_{i}.jpg",
+                             {"model": "claude", "max_tokens": 10,
+                              "messages": [{"role": "user", "content": f"texte {i}"}]})
+                for i in range(4)]
+    polls = []
+
+    async def run():
+        client = anthropic.AsyncAnthropic(api_key="test", base_url=server.url)
+        runner = MessageBatchRunner(client, poll_interval=0.01, max_requests=3, on_poll=polls.append)
+        try:
+            return await runner.run(requests, requests_path=tmp_path / "requests.jsonl")
+        finally:
+            await client.close()
+
+    outcomes = asyncio.run(run())
+
+    assert len(server.batches) == 2
+    assert len(polls) >= 2
+    assert [o.source for o in outcomes] == [f"scan_{i}.jpg" for i in range(4)]
+    assert outcomes[0].text == "TEXTE 0"
+    assert outcomes[1].error == "overloaded_error: surcharge"
+    assert outcomes[3].text == "TEXTE 3"
+    assert [r.source for r in read_requests_file(tmp_path / "requests.jsonl")] == [r.source for r in requests]
+
+
+def test_multimodal_extractor_batch_uses_cache(stub_server, tmp_path):
+    """Le mode lot de l'extracteur multimodal ne resoumet pas les images en cache"""
+    from disk_cache import DiskCache
+    from ocr_strategy_alternative import MultimodalOCRExtractor
+
+    server = stub_server(lambda request: succeeded('```json\n{"ville": {"value": "Lyon", "confidence": 0.9}}\n```'),
+                         polls_before_end=0)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"photo_{i}.jpg"
+        path.write_bytes(f"image {i}".encode())
+        paths.append(path)
+
+    async def run():
+        extractor = MultimodalOCRExtractor("test", cache=DiskCache(tmp_path / "cache.sqlite"),
+                                           max_image_pixels=None)
+        extractor.client = anthropic.AsyncAnthropic(api_key="test", base_url=server.url)
+        first = await extractor.extract_batch(paths[:2], poll_interval=0.01)
+        second = await extractor.extract_batch(paths, poll_interval=0.01)
+        await extractor.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == [{"ville": {"value": "Lyon", "confidence": 0.9}}] * 2
+    assert second == first + [{"ville": {"value": "Lyon", "confidence": 0.9}}]
+    assert [len(requests) for requests in server.batches.values()] == [2, 1]
+    assert server.batches["msgbatch_2"][0]["custom_id"] == "doc-000002"
+
+
+def test_demande_devis_batch_api(stub_server, tmp_path, monkeypatch, fake_extractor):
+    """Le mode lot de DemandeDevisExtractor rattache chaque réponse à son image"""
+    monkeypatch.setattr("extract_demande_devis.image_to_text", lambda path, **kwargs: f"Demande N° {path.stem}")
+
+    def respond(request):
+        text = request["params"]["messages"][-1]["content"]
+        numero = text.rsplit("N° ", 1)[1].split()[0]
+        if numero == "bad":
+            return errored("requête invalide")
+        return succeeded(json.dumps({"numero_demande": numero, "intervention": {"description": "fuite"}}))
+
+    server = stub_server(respond, polls_before_end=1)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+    paths = [tmp_path / name for name in ("1001.jpg", "bad.jpg", "1003.jpg")]
+
+    extractor = fake_extractor(["{}"], provider="anthropic")
+    results = extractor.extract_batch_api(paths, requests_path=tmp_path / "requests.jsonl", poll_interval=0.01)
+
+    request = server.batches["msgbatch_1"][0]["params"]
+    assert request["system"] and request["model"] == extractor.model_name
+    assert [r.index for r in results] == [0, 1, 2]
+    assert results[0].extracted["numero_demande"] == "1001"
+    assert results[1].error == "overloaded_error: requête invalide"
+    assert results[2].extracted["numero_demande"] == "1003"
+    assert [r.source for r in read_requests_file(tmp_path / "requests.jsonl")] == [str(p) for p in paths]
+
+    # Reprise : la liste a changé (1001 déjà traité d'après le manifeste, 1004 ajouté)
+    resumed = extractor.extract_batch_api([paths[2], tmp_path / "1004.jpg"], requests_path=tmp_path / "requests.jsonl",
+                                          poll_interval=0.01, batch_ids=["msgbatch_1"])
+
+    assert list(server.batches) == ["msgbatch_1"]
+    assert resumed[0].extracted["numero_demande"] == "1003"
+    assert resumed[1].error == "absent des lots repris"
+    assert len(read_requests_file(tmp_path / "requests.jsonl")) == 3
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests de la détection des demandes déjà extraites (relances, rescans)
+"""
+
+import json
+
+from near_duplicates import NearDuplicateIndex, find_numero_demande
+
+DEMANDE = """Orvault, le 23 septembre 2025
+Objet : Demande de devis N° 250923180018907
+Gestionnaire référent : MME Nadege MARAUD +33 (0)251775356
+Mandat : N°038349 - M GUARTA TEODORO MME NICAUD MAURICETTE
+Ensemble immobilier : N°E0005981 CASTELIN
+Lot : Numéro commercial N°A224 - Etage : 2nd
+Adresse : BAT - 2ND - APT A224 LE CASTELIN 133 avenue de la Republique 93150 LE BLANC MESNIL
+Devis urgent : Oui
+Date de demande de devis : 23/09/2025
+Objet du devis : DEMANDE DE DEVIS SUITE DEPOT DE GARANTIE
+NETTOYAGE ENTREE Murs, traces noires sur 9m² placard, porte non nettoyée SALLE DE BAIN Sol non nettoyé"""
+
+# Nouveau scan : quelques caractères mal reconnus
+RESCAN = DEMANDE.replace("Murs", "Mnrs").replace("placard", "p1acard").replace("Oui", "0ui")
+# Même agence, même gabarit, autre demande
+AUTRE = DEMANDE.replace("250923180018907", "250923180019112").replace("A224", "B105")
+# Relance : texte différent, même numéro
+RELANCE = "RELANCE - Demande de devis n° 250923180018907 toujours en attente de votre retour."
+
+
+def test_rescan_and_relance_found_but_not_other_demande(tmp_path):
+    """Rescan (similarité) et relance (numéro) retrouvés, autre demande du gabarit écartée"""
+    index = NearDuplicateIndex(tmp_path / "dedup.sqlite")
+    index.add(DEMANDE, json.dumps({"numero_demande": "250923180018907"}), "250923180018907")
+
+    rescan = index.find(RESCAN.replace("250923180018907", "25O923180018907"))  # numéro illisible
+    assert rescan.reason == "similarite" and 0.9 <= rescan.similarity < 1
+    assert index.find(RELANCE).reason == "numero"
+    assert index.find(AUTRE) is None
+    assert index.find(DEMANDE, scope="autre prompt") is None
+    assert (index.numero_hits, index.similar_hits, index.misses) == (1, 1, 2)
+
+    strict = NearDuplicateIndex(tmp_path / "dedup.sqlite", threshold=0.99)
+    assert strict.find(RESCAN.replace("250923180018907", "")) is None
+
+
+def test_find_numero_demande():
+    """Numéro lu dans les tournures usuelles"""
+    assert find_numero_demande(DEMANDE) == "250923180018907"
+    assert find_numero_demande("Numéro de demande : 2509 2318 0018") == "250923180018"
+    assert find_numero_demande("Demande de nettoyage 123456") is None
+
+
+def test_extractor_skips_llm_for_rescan(tmp_path, fake_extractor):
+    """Le rescan d'une demande déjà extraite n'est pas renvoyé au provider"""
+    extractor = fake_extractor([json.dumps({"numero_demande": "250923180018907",
+                                            "intervention": {"description": "NETTOYAGE"}}), "{}"],
+                               dedup_index=NearDuplicateIndex(tmp_path / "dedup.sqlite"))
+    first = extractor.extract_with_llm(DEMANDE)
+    again = extractor.extract_with_llm(RESCAN)
+    relance = extractor.extract_with_llm(RELANCE)
+
+    assert first == again == relance
+    assert extractor.llm.i == 1
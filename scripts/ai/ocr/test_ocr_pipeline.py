@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Tests du pipeline multimodal (appels Anthropic simulés via httpx.MockTransport)
+"""
+
+import asyncio
+import json
+import pickle
+import time
+
+import httpx
+
+from ocr_strategy_alternative import CompactIntervention, OCRPipeline
+
+LATENCY = 0.2
+
+RAW_EXTRACTION = {
+    "nom_client": {"value": "MARAUD", "confidence": 0.95},
+    "prenom_client": {"value": "Nadege", "confidence": 0.95},
+    "adresse": {"value": "133 avenue de la Republique", "confidence": 0.9},
+    "code_postal": {"value": "93150", "confidence": 0.95},
+    "ville": {"value": "LE BLANC MESNIL", "confidence": 0.95},
+    "date_demande": {"value": "23/09/2025", "confidence": 0.9},
+    "objet_devis": {"value": "DEMANDE DE DEVIS SUITE DEPOT DE GARANTIE", "confidence": 0.9},
+    "message_principal": {"value": "NETTOYAGE ENTREE, robinetterie évier mal fixée", "confidence": 0.85},
+}
+
+
+def anthropic_message(text: str, **usage) -> dict:
+    """Réponse minimale de l'API Messages"""
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-20250514",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 100, "output_tokens": 50, **usage},
+    }
+
+
+def make_pipeline(handler) -> OCRPipeline:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return OCRPipeline(anthropic_api_key="test-key", http_client=http_client, postal_index=None)
+
+
+def write_images(tmp_path, count, real=True):
+    from PIL import Image
+
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"scan_{i}.png"
+        if real:
+            Image.new("RGB", (40 + i, 30), "white").save(path)
+        else:
+            path.write_bytes(b"image %d" % i)
+        paths.append((str(path), "image"))
+    return paths
+
+
+def test_process_many_overlaps_provider_calls(tmp_path):
+    """N documents en parallèle prennent ~ la latence d'un seul appel"""
+    async def handler(request):
+        await asyncio.sleep(LATENCY)
+        return httpx.Response(200, json=anthropic_message("```json\n" + json.dumps(RAW_EXTRACTION) + "\n```"))
+
+    async def run():
+        pipeline = make_pipeline(handler)
+        try:
+            start = time.perf_counter()
+            results = await pipeline.process_many(write_images(tmp_path, 8), concurrency=8)
+            return results, time.perf_counter() - start
+        finally:
+            await pipeline.aclose()
+
+    results, elapsed = asyncio.run(run())
+
+    assert len(results) == 8
+    assert all(r.ville.value == "LE BLANC MESNIL" for r in results)
+    assert elapsed < LATENCY * 4
+
+
+def test_process_many_isolates_failures(tmp_path):
+    """Un document en erreur n'interrompt pas le lot"""
+    async def handler(request):
+        body = json.loads(request.content)
+        image_b64 = body["messages"][0]["content"][0]["source"]["data"]
+        if image_b64 == "aW1hZ2UgMQ==":  # b"image 1"
+            return httpx.Response(200, json=anthropic_message("pas du JSON"))
+        return httpx.Response(200, json=anthropic_message(json.dumps(RAW_EXTRACTION)))
+
+    async def run():
+        pipeline = make_pipeline(handler)
+        pipeline.extractor.max_image_pixels = None  # octets envoyés tels quels
+        try:
+            return await pipeline.process_many(write_images(tmp_path, 3, real=False), concurrency=2)
+        finally:
+            await pipeline.aclose()
+
+    results = asyncio.run(run())
+
+    assert isinstance(results[1], Exception)
+    assert results[0].code_postal.value == "93150"
+    assert results[2].code_postal.value == "93150"
+
+
+def fake_pdf2image(monkeypatch, page_count):
+    """Remplace pdf2image (poppler) par des pages blanches"""
+    import sys
+    import types
+
+    from PIL import Image
+
+    rendered = []
+
+    def convert_from_path(path, dpi=200, first_page=1, last_page=None):
+        last_page = last_page or page_count
+        pages = [Image.new("RGB", (20 + i, 20), "white") for i in range(first_page, last_page + 1)]
+        rendered.extend(pages)
+        return pages
+
+    module = types.ModuleType("pdf2image")
+    module.pdfinfo_from_path = lambda path: {"Pages": page_count, "Page size": "595 x 842 pts (A4)"}
+    module.convert_from_path = convert_from_path
+    monkeypatch.setitem(sys.modules, "pdf2image", module)
+    return rendered
+
+
+def test_merge_page_extractions_by_confidence():
+    """Chaque champ garde la valeur la plus sûre, les listes sont unies"""
+    from ocr_strategy_alternative import merge_page_extractions
+
+    page_1 = {
+        "nom_client": {"value": "MARAUD", "confidence": 0.95},
+        "message_principal": {"value": "Voir page suivante", "confidence": 0.3},
+        "email": {"value": None, "confidence": 0.0},
+        "metiers_detectes": ["ménage"],
+    }
+    page_2 = {
+        "nom_client": {"value": "MARAUO", "confidence": 0.6},
+        "message_principal": {"value": "NETTOYAGE ENTREE, robinetterie mal fixée", "confidence": 0.9},
+        "email": {"value": "orpi.loc@gmail.com", "confidence": 0.8},
+        "metiers_detectes": ["plomberie", "ménage"],
+    }
+
+    merged = merge_page_extractions([page_1, page_2])
+
+    assert merged["nom_client"]["value"] == "MARAUD"
+    assert merged["nom_client"]["alternatives"] == ["MARAUO"]
+    assert merged["message_principal"]["value"].startswith("NETTOYAGE")
+    assert merged["message_principal"]["source_page"] == 2
+    assert merged["email"]["value"] == "orpi.loc@gmail.com"
+    assert merged["metiers_detectes"] == ["ménage", "plomberie"]
+
+
+def test_extract_from_pdf_processes_pages_concurrently(tmp_path, monkeypatch):
+    """La latence d'un PDF multi-pages reste proche de celle d'une page"""
+    fake_pdf2image(monkeypatch, page_count=4)
+    page_2 = dict(RAW_EXTRACTION, message_principal={"value": "Fuite sous évier", "confidence": 0.99})
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        body = page_2 if len(calls) == 2 else RAW_EXTRACTION
+        await asyncio.sleep(LATENCY)
+        return httpx.Response(200, json=anthropic_message(json.dumps(body)))
+
+    async def run():
+        pipeline = make_pipeline(handler)
+        try:
+            start = time.perf_counter()
+            result = await pipeline.extractor.extract_from_pdf(str(tmp_path / "annexe.pdf"))
+            return result, time.perf_counter() - start
+        finally:
+            await pipeline.aclose()
+
+    result, elapsed = asyncio.run(run())
+
+    assert len(calls) == 4
+    assert elapsed < LATENCY * 3
+    assert result["message_principal"]["value"] == "Fuite sous évier"
+
+
+def test_extract_from_pdf_tolerates_a_failed_page(tmp_path, monkeypatch):
+    """Une page illisible n'invalide pas les autres"""
+    fake_pdf2image(monkeypatch, page_count=2)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        text = "pas du JSON" if len(calls) == 1 else json.dumps(RAW_EXTRACTION)
+        return httpx.Response(200, json=anthropic_message(text))
+
+    async def run():
+        pipeline = make_pipeline(handler)
+        try:
+            return await pipeline.extractor.extract_from_pdf(str(tmp_path / "annexe.pdf"))
+        finally:
+            await pipeline.aclose()
+
+    assert asyncio.run(run())["ville"]["value"] == "LE BLANC MESNIL"
+
+
+def is_closed(image) -> bool:
+    try:
+        image.getpixel((0, 0))
+        return False
+    except ValueError:
+        return True
+
+
+def test_large_pdf_bounds_pages_in_flight(tmp_path, monkeypatch):
+    """Pages rendues une à une et libérées, nombre de requêtes simultanées borné"""
+    rendered = fake_pdf2image(monkeypatch, page_count=12)
+    state = {"current": 0, "peak": 0}
+
+    async def handler(request):
+        state["current"] += 1
+        state["peak"] = max(state["peak"], state["current"])
+        await asyncio.sleep(0.02)
+        state["current"] -= 1
+        return httpx.Response(200, json=anthropic_message(json.dumps(RAW_EXTRACTION)))
+
+    async def run():
+        pipeline = make_pipeline(handler)
+        pipeline.extractor.max_pdf_pages_in_flight = 2
+        try:
+            return [page async for page in pipeline.extractor.iter_pdf_extractions(str(tmp_path / "bail.pdf"))]
+        finally:
+            await pipeline.aclose()
+
+    pages = asyncio.run(run())
+
+    assert sorted(number for number, _ in pages) == list(range(1, 13))
+    assert state["peak"] <= 2
+    assert len(rendered) == 12
+    assert all(is_closed(image) for image in rendered)  # images décodées libérées
+
+
+def test_page_over_budget_lowers_dpi(tmp_path, monkeypatch):
+    """Une page plus grosse que le budget est rasterisée à plus basse résolution"""
+    fake_pdf2image(monkeypatch, page_count=1)
+    import ocr_strategy_alternative
+
+    dpis = []
+    original = ocr_strategy_alternative.render_pdf_page
+
+    def spy(path, page_number, dpi):
+        dpis.append(dpi)
+        return original(path, page_number, dpi)
+
+    monkeypatch.setattr(ocr_strategy_alternative, "render_pdf_page", spy)
+
+    async def handler(request):
+        return httpx.Response(200, json=anthropic_message(json.dumps(RAW_EXTRACTION)))
+
+    async def run():
+        pipeline = make_pipeline(handler)
+        pipeline.extractor.max_pdf_memory_mb = 8
+        try:
+            return await pipeline.extractor.extract_from_pdf(str(tmp_path / "plan.pdf"))
+        finally:
+            await pipeline.aclose()
+
+    asyncio.run(run())
+
+    assert 100 <= dpis[0] < 200
+
+
+def test_enrich_many_in_process_pool_keeps_order():
+    """Validation + mapping répartis sur des processus, résultats dans l'ordre"""
+    pipeline = make_pipeline(lambda request: httpx.Response(500))
+    raws = [
+        dict(RAW_EXTRACTION, objet_devis={"value": f"Fuite sous évier n°{i}", "confidence": 0.9})
+        for i in range(12)
+    ]
+    raws[5] = {"nom_client": {"value": "INCOMPLET"}}
+
+    pooled = pipeline.enrich_many(raws, workers=2, chunk_size=3)
+    inline = pipeline.enrich_many(raws, workers=1)
+
+    assert [r.objet_devis.value for i, r in enumerate(pooled) if i != 5] == \
+        [f"Fuite sous évier n°{i}" for i in range(12) if i != 5]
+    assert isinstance(pooled[5], RuntimeError) and isinstance(inline[5], KeyError)
+    for pooled_result, inline_result in zip(pooled[:5], inline[:5]):
+        assert pooled_result.metiers == inline_result.metiers
+        assert pooled_result.code_postal.value == inline_result.code_postal.value == "93150"
+
+
+def test_compact_intervention_matches_model():
+    """Variante à slots : mêmes valeurs, même JSON des métiers, pickle compact"""
+    pipeline = make_pipeline(lambda request: httpx.Response(500))
+    enriched, compact = (pipeline.enrich_many([RAW_EXTRACTION], workers=1, compact=flag)[0]
+                         for flag in (False, True))
+
+    assert isinstance(compact, CompactIntervention) and not hasattr(compact, "__dict__")
+    assert compact.date_demande.value == enriched.date_demande.value
+    assert compact.code_postal.confidence_level == enriched.code_postal.confidence_level
+    assert [m.to_dict() for m in compact.metiers] == [m.to_dict() for m in enriched.metiers]
+    assert compact.metiers[0].to_match() == enriched.metiers[0]
+
+    decoded = json.loads(compact.to_json())
+    assert decoded["date_demande"]["value"] == "2025-09-23T00:00:00"
+    assert decoded["ville"]["value"] == enriched.ville.value and decoded["lot"] is None
+
+    restored = pickle.loads(pickle.dumps(compact))
+    assert restored.to_dict() == compact.to_dict()
+    assert len(pickle.dumps(compact)) < len(pickle.dumps(enriched))
+
+
+def test_compact_intervention_round_trip():
+    """to_model restitue l'ExtractedIntervention d'origine"""
+    pipeline = make_pipeline(lambda request: httpx.Response(500))
+    enriched = pipeline.enrich_many([RAW_EXTRACTION], workers=1)[0]
+
+    restored = CompactIntervention.from_model(enriched).to_model()
+
+    assert restored == enriched
+    assert restored.lot is None and restored.metiers == enriched.metiers
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests de l'index local code postal -> communes
+"""
+
+import pickle
+
+import pytest
+
+from ocr_strategy_alternative import DataValidator, OCRPipeline
+from postal_index import PostalIndex, build_postal_index, read_laposte_csv
+from test_ocr_pipeline import RAW_EXTRACTION
+
+LAPOSTE_CSV = """#Code_commune_INSEE;Nom_de_la_commune;Code_postal;Ligne_5;Libellé_d_acheminement;coordonnees_gps
+93007;LE BLANC MESNIL;93150;;LE BLANC MESNIL;48.9386,2.4614
+44114;ORVAULT;44700;;ORVAULT;47.2711,-1.6225
+93066;ST DENIS;93200;;ST DENIS;48.9295,2.3592
+93066;ST DENIS;93210;;ST DENIS;48.9295,2.3592
+93066;ST DENIS;93210;LA PLAINE ST DENIS;ST DENIS;48.9295,2.3592
+97411;ST DENIS;97400;;ST DENIS;-20.9329,55.4471
+93055;PANTIN;93500;;PANTIN;48.8965,2.4017
+93008;BOBIGNY;93000;;BOBIGNY;48.9077,2.4397
+77288;MEAUX;77100;;MEAUX;48.9601,2.8788
+77284;MAREUIL LES MEAUX;77100;;MAREUIL LES MEAUX;48.9263,2.8624
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    csv_path = tmp_path / "laposte_hexasmal.csv"
+    csv_path.write_text(LAPOSTE_CSV, encoding="utf-8")
+    path = tmp_path / "codes_postaux.idx"
+    assert build_postal_index(read_laposte_csv(csv_path), path) == 9  # lieu-dit LA PLAINE ST DENIS fusionné avec ST DENIS/93210
+    return PostalIndex(path)
+
+
+def test_lookup_by_code_and_by_name(index):
+    """Recherche par code postal et par nom normalisé (accents, tirets, St)"""
+    assert index.communes("77100") == ["MAREUIL LES MEAUX", "MEAUX"]
+    assert index.communes("12345") == []
+    assert index.codes("Saint-Denis") == [("93200", "ST DENIS"), ("93210", "ST DENIS"), ("97400", "ST DENIS")]
+    assert index.closest_communes("Orvaul")[0][:2] == ("44700", "ORVAULT")
+
+
+def test_check_corrects_city_spelling_and_misread_code(index):
+    """Ville mal orthographiée corrigée ; code d'une autre commune remplacé"""
+    check = index.check("93150", "Le Blanc-Mesnill")
+    assert (check.valid, check.code_postal, check.ville, check.corrected) == (True, "93150", "LE BLANC MESNIL", True)
+
+    check = index.check("93050", "Pantin")  # 0 lu à la place du 5
+    assert (check.valid, check.code_postal, check.ville) == (True, "93500", "PANTIN")
+
+    check = index.check("44700", "Nantes")
+    assert not check.valid and check.suggestions == []
+
+
+def test_validator_cross_checks_and_index_pickles(index):
+    """DataValidator corrige le couple code/ville ; l'index traverse un pool de processus"""
+    validator = pickle.loads(pickle.dumps(DataValidator(postal_index=index)))
+    raw = dict(RAW_EXTRACTION, code_postal={"value": "93510", "confidence": 0.95},
+               ville={"value": "Le Blanc Mesnil", "confidence": 0.95})
+
+    validated = validator.validate_extraction(raw)
+
+    assert validated.code_postal.value == "93150"
+    assert validated.code_postal.alternatives == ["93510"]
+    assert validated.ville.value == "LE BLANC MESNIL"
+    assert validated.code_postal.confidence < 0.95
+
+
+def test_pipeline_uses_only_the_given_index(index):
+    """Le pipeline n'ouvre pas implicitement l'index du cache local"""
+    assert OCRPipeline(anthropic_api_key="test-key").validator.postal_index is None
+    assert OCRPipeline(anthropic_api_key="test-key", postal_index=index).validator.postal_index is index
+
+
+def test_validator_skips_cross_check_without_city(index):
+    """Sans ville, le code postal n'est ni pénalisé ni recoupé"""
+    validator = DataValidator(postal_index=index)
+    raw = dict(RAW_EXTRACTION, code_postal={"value": "93150", "confidence": 0.95},
+               ville={"value": None, "confidence": 0.2})
+
+    validated = validator.validate_extraction(raw)
+
+    assert (validated.code_postal.value, validated.code_postal.confidence) == ("93150", 0.95)
+    assert validated.ville.value is None and validated.ville.alternatives == []
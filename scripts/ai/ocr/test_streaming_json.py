@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests de l'analyse JSON incrémentale et des modes streaming des extracteurs
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from extract_demande_devis import REQUIRED_SECTIONS
+from ocr_strategy_alternative import ExtractedField, MultimodalOCRExtractor
+from streaming_json import IncrementalJSONObjectParser, iter_json_members
+from test_ocr_pipeline import RAW_EXTRACTION
+
+RESPONSE = (
+    'Voici les données extraites :\n```json\n'
+    '{"nom_client": {"value": "MARAUD", "confidence": 0.95, "source_text": "Mme MARAUD, {bât. B}"},\n'
+    ' "metiers_detectes": ["plomberie", "nettoyage"],\n'
+    ' "message_principal": {"value": "Robinet \\"cassé\\", fuite", "confidence": 0.8}}\n'
+    '```\nN\'hésitez pas si besoin.'
+)
+
+
+def test_parser_emits_members_as_soon_as_complete():
+    """Chaque membre est décodé dès sa virgule, sans attendre la fin de la réponse"""
+    parser = IncrementalJSONObjectParser()
+    emitted_at = {}
+    for position, char in enumerate(RESPONSE):
+        for key, _ in parser.feed(char):
+            emitted_at[key] = position
+
+    assert parser.done
+    assert parser.result == json.loads(RESPONSE.split("```json")[1].split("```")[0])
+    assert list(emitted_at) == ["nom_client", "metiers_detectes", "message_principal"]
+    assert emitted_at["nom_client"] < RESPONSE.index('"metiers_detectes"')
+    assert parser.result["nom_client"]["source_text"] == "Mme MARAUD, {bât. B}"
+
+
+def test_required_keys_stop_consuming_the_stream():
+    """Une fois les clés requises reçues, le flux amont n'est plus lu"""
+    consumed = []
+
+    def chunks():
+        for i in range(0, len(RESPONSE), 5):
+            consumed.append(i)
+            yield RESPONSE[i:i + 5]
+
+    members = list(iter_json_members(chunks(), required=["nom_client"]))
+
+    assert [key for key, _ in members] == ["nom_client"]
+    assert len(consumed) < len(RESPONSE) // 5 / 2
+
+
+def test_truncated_response_raises():
+    """Une réponse coupée avant l'accolade fermante est signalée"""
+    with pytest.raises(ValueError):
+        list(iter_json_members(['{"a": 1, "b": {"c"']))
+
+
+def sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def streaming_handler(text: str, sent: list, chunk_size: int = 20):
+    """Transport simulant l'API Messages en streaming (server-sent events)"""
+    async def events():
+        yield sse("message_start", {"type": "message_start", "message": {
+            "id": "msg_1", "type": "message", "role": "assistant", "model": "claude", "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 100, "output_tokens": 1}}})
+        yield sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                          "content_block": {"type": "text", "text": ""}})
+        for i in range(0, len(text), chunk_size):
+            sent.append(i)
+            yield sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                              "delta": {"type": "text_delta", "text": text[i:i + chunk_size]}})
+        yield sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield sse("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn",
+                                                                       "stop_sequence": None},
+                                    "usage": {"output_tokens": 200}})
+        yield sse("message_stop", {"type": "message_stop"})
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events())
+
+    return handler
+
+
+def test_multimodal_stream_yields_fields_and_cancels_early():
+    """Le streaming multimodal produit des ExtractedField et s'arrête aux champs requis"""
+    text = json.dumps(RAW_EXTRACTION)
+    sent_full, sent_partial = [], []
+
+    async def collect(sent, required):
+        extractor = MultimodalOCRExtractor(
+            "test", max_image_pixels=None,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(streaming_handler(text, sent)))
+        )
+        fields = [item async for item in extractor.stream_from_image(b"image", required_fields=required)]
+        await extractor.aclose()
+        return fields, extractor.token_usage
+
+    full, usage = asyncio.run(collect(sent_full, None))
+    partial, _ = asyncio.run(collect(sent_partial, ["nom_client", "prenom_client"]))
+
+    assert [name for name, _ in full] == list(RAW_EXTRACTION)
+    assert isinstance(full[0][1], ExtractedField) and full[0][1].value == "MARAUD"
+    assert usage.calls == 1
+    assert [name for name, _ in partial] == ["nom_client", "prenom_client"]
+    assert len(sent_partial) < len(sent_full)
+
+
+def test_demande_stream_yields_sections(fake_extractor):
+    """Les sections de DemandeDevisData sont produites une à une"""
+    response = json.dumps({
+        "numero_demande": "250923180018907",
+        "intervention": {"description": "fuite", "metiers": ["plomberie"]},
+        "bien": {"code_postal": "93150"},
+    })
+
+    extractor = fake_extractor([response] * 2)
+    sections = list(extractor.stream_with_llm("texte OCR"))
+    early = list(extractor.stream_with_llm("texte OCR", required_sections=REQUIRED_SECTIONS))
+
+    assert [name for name, _ in sections] == ["numero_demande", "intervention", "bien"]
+    assert dict(sections)["intervention"]["metiers"] == ["plomberie"]
+    assert [name for name, _ in early] == ["numero_demande", "intervention"]
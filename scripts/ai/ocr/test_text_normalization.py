@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests de la normalisation (casse, accents) et du cache de match_metier
+"""
+
+import pickle
+
+from ocr_strategy_alternative import IntelligentMapper, MetierEnum
+from text_normalization import fold_text, fold_with_offsets
+
+
+def test_fold_text_removes_case_accents_and_ligatures():
+    """Casse, accents et ligatures de compatibilité sont repliés"""
+    assert fold_text("Électricité") == fold_text("ELECTRICITE") == "electricite"
+    assert fold_text("Chaudière ﬁoul") == "chaudiere fioul"
+
+    text = "Évier ﬁssuré"
+    normalized, offsets = fold_with_offsets(text)
+    assert normalized == "evier fissure"
+    start = normalized.index("fissure")
+    assert text[offsets[start]:offsets[start + len("fissure")]] == "ﬁssuré"
+
+
+def test_match_metier_ignores_accents_and_is_memoized():
+    """Sans accents, le match reste exact ; les titres répétés viennent du cache"""
+    mapper = IntelligentMapper()
+
+    first = mapper.match_metier("Panne ELECTRICITE")
+    second = mapper.match_metier("panne électricité")
+
+    assert first.matched_value == second.matched_value == MetierEnum.ELECTRICITE.value
+    assert first.confidence == 1.0
+    assert second.original_text == "panne électricité"
+    assert mapper.match_cache_info().hits == 1
+
+    # Le résultat mémorisé n'est pas partagé avec l'appelant
+    second.suggestions.clear()
+    assert mapper.match_metier("Panne électricité").suggestions
+
+
+def test_mapper_pickles_and_rebuilds_cache():
+    """Le mapper traverse un pool de processus, avec un cache neuf"""
+    mapper = IntelligentMapper()
+    mapper.match_metier("Fuite évier")
+
+    clone = pickle.loads(pickle.dumps(mapper))
+
+    assert clone.match_metier("Fuite évier").matched_value == MetierEnum.PLOMBERIE.value
+    assert clone.match_cache_info().misses == 1
@@ -0,0 +1,50 @@
+"""
+Normalisation des textes pour le matching
+
+Casse et accents repliés (casefold + décomposition NFKD sans diacritiques) :
+'Électricité', 'ELECTRICITE' et 'électricité' ont la même forme normalisée,
+ce qui évite de passer par le matching approché pour une simple différence
+d'accent. Les ligatures de compatibilité sont aussi décomposées ('ﬁ' -> 'fi').
+"""
+
+import unicodedata
+from typing import List, Tuple
+
+
+class _FoldTable(dict):
+    """Table pour str.translate, complétée au premier passage de chaque caractère"""
+
+    def __missing__(self, code: int) -> str:
+        decomposed = unicodedata.normalize('NFKD', chr(code))
+        folded = ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+        self[code] = folded
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def fold_text(text: str) -> str:
+    """Forme normalisée de `text` (sans casse ni accents)"""
+    if text.isascii():
+        return text.lower()
+    return text.translate(_FOLD_TABLE)
+
+
+def fold_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """
+    Forme normalisée et table de correspondance des positions
+
+    offsets[i] est la position dans `text` du caractère qui a produit le
+    i-ème caractère normalisé ; offsets[len(normalisé)] vaut len(text).
+    """
+    if text.isascii():
+        return text.lower(), list(range(len(text) + 1))
+    parts = []
+    offsets = []
+    for position, char in enumerate(text):
+        folded = _FOLD_TABLE[ord(char)]
+        parts.append(folded)
+        offsets.extend([position] * len(folded))
+    offsets.append(len(text))
+    return ''.join(parts), offsets